@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the decode, orbit, geometry and storage hot paths.
+
+    python -m benchmarks.bench_hotpaths                      # run all, print table
+    python -m benchmarks.bench_hotpaths --save base.json     # store a baseline
+    python -m benchmarks.bench_hotpaths --compare base.json  # fail on regressions
+    python -m benchmarks.bench_hotpaths --capture captures/  # decode recorded frames
+
+Each case reports throughput (calls/s, or items/s for the ring buffer),
+per-call latency percentiles and the tracemalloc peak of a separate pass (so
+allocation tracing does not distort the timings). Inputs are synthetic
+(`core.rtcm_synth`) at a fixed GPS time and receiver position, so runs are
+comparable across machines and commits; `--capture` substitutes recorded
+frames for the decode cases.
+
+Requires `config.py`; TARGET_SYSTEMS and APPROX_REC_POS are overridden in
+process for the run.
+"""
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pyrtcm
+from pyrtcm import RTCMReader
+
+import config
+import core.BE2pos as BE2pos
+from core.data_store import GnssIrStore
+from core.geo_utils import calculate_az_el
+from core.ring_buffer import RingBuffer
+from core.rtcm_handler import RTCMHandler
+from core.rtcm_synth import DEFAULT_REC_POS, SyntheticStation
+
+BASELINE_VERSION = 1
+
+# 2025-01-01 12:00:00 GPST, fixed so inputs are identical between runs.
+BENCH_GPS_SECONDS = 1419768000.0
+IR_CFG = {"MIN_ELEVATION_DEG": 5.0, "MAX_ELEVATION_DEG": 30.0, "AZ_WINDOWS_DEG": [[0, 360]]}
+
+# Typical GLONASS 1020 content (km, km/s, km/s^2) as stored by RTCMHandler.
+GLO_EPH = {
+    "SatType": "GLO", "PRN": 1, "FreqChannel": 1, "Tb": 43200.0, "tk": 43200.0,
+    "X": -14532.5, "Y": 7380.1, "Z": 20112.9,
+    "Vx": -1.7235, "Vy": -2.8854, "Vz": -0.1813,
+    "Ax": 0.0, "Ay": 0.0, "Az": -1.86e-9,
+    "TauN": 1.2e-5, "GammaN": 9.1e-13, "Health": 0,
+}
+
+
+# -----------------------------------------------------------------------------
+# Measurement
+# -----------------------------------------------------------------------------
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def measure(fn: Callable[[int], object], n: int, warmup: int = 10, setup: Optional[Callable] = None,
+            repeat: int = 3) -> Dict:
+    """
+    Time `fn(i)` for i in range(n), one sample per call, `repeat` times, then
+    once more under tracemalloc for the allocation peak. Throughput is taken
+    from the fastest round (least disturbed by the rest of the machine);
+    percentiles pool all rounds. `setup` (if given) resets state before each
+    round.
+    """
+    if setup:
+        setup()
+    for i in range(min(warmup, n)):
+        fn(i)
+
+    samples = []
+    best_wall = math.inf
+    perf = time.perf_counter_ns
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t_start = perf()
+        for i in range(n):
+            t0 = perf()
+            fn(i)
+            samples.append(perf() - t0)
+        best_wall = min(best_wall, (perf() - t_start) / 1e9)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    for i in range(n):
+        fn(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _summary(n, best_wall, samples, peak)
+
+
+def _summary(n: int, wall: float, samples: List[int], peak: int) -> Dict:
+    samples.sort()
+    return {
+        "calls": n,
+        "ops_per_s": n / wall if wall > 0 else 0.0,
+        "mean_us": statistics.fmean(samples) / 1e3,
+        "p50_us": _percentile(samples, 50) / 1e3,
+        "p90_us": _percentile(samples, 90) / 1e3,
+        "p99_us": _percentile(samples, 99) / 1e3,
+        "peak_kb": peak / 1024.0,
+    }
+
+
+# -----------------------------------------------------------------------------
+# Inputs
+# -----------------------------------------------------------------------------
+def synthetic_frames(n_epochs: int, n_sats: int, n_signals: int) -> Dict[str, List[bytes]]:
+    station = SyntheticStation(rec_pos=config.APPROX_REC_POS, n_sats=n_sats, n_signals=n_signals)
+    obs = []
+    for k in range(n_epochs):
+        obs.extend(station.epoch_frames(BENCH_GPS_SECONDS + k))
+    return {"eph": station.ephemeris_frames(BENCH_GPS_SECONDS), "obs": obs}
+
+
+def capture_frames(capture_dir: str, limit: int) -> Dict[str, List[bytes]]:
+    from core.rtcm_recorder import frame_msg_type, iter_frames
+    eph_types = {1019, 1020, 1042, 1045, 1046}
+    frames = {"eph": [], "obs": []}
+    for raw, _ in iter_frames(capture_dir):
+        kind = "eph" if frame_msg_type(raw) in eph_types else "obs"
+        frames[kind].append(raw)
+        if len(frames["obs"]) >= limit:
+            break
+    return frames
+
+
+def parse_all(frames: List[bytes]) -> list:
+    return [RTCMReader.parse(raw) for raw in frames]
+
+
+# -----------------------------------------------------------------------------
+# Cases
+# -----------------------------------------------------------------------------
+def bench_decode(frames: Dict[str, List[bytes]], n: int) -> Dict[str, Dict]:
+    eph_msgs = parse_all(frames["eph"])
+    obs_msgs = parse_all(frames["obs"])
+    results = {}
+
+    results["rtcm_parse_msm7"] = measure(lambda i: RTCMReader.parse(frames["obs"][i % len(frames["obs"])]), n)
+
+    handler = RTCMHandler()
+    results["process_message_eph"] = measure(lambda i: handler.process_message(eph_msgs[i % len(eph_msgs)]),
+                                             max(n, len(eph_msgs)))
+
+    for msg in eph_msgs:
+        handler.process_message(msg)
+    results["process_message_msm7"] = measure(lambda i: handler.process_message(obs_msgs[i % len(obs_msgs)]), n)
+    return results
+
+
+def bench_orbits(n: int) -> Dict[str, Dict]:
+    """Keplerian orbit and az/el run `5 n` calls; the GLONASS RK4 integration is ~100x slower, so `n // 2`."""
+    station = SyntheticStation(rec_pos=config.APPROX_REC_POS)
+    eph = station._ephemeris("G", 1, BENCH_GPS_SECONDS)
+    tow = BENCH_GPS_SECONDS % 604800
+    sat_pos = BE2pos.SatPos_brdc(tow, eph)[0]
+    rec_pos = config.APPROX_REC_POS
+    return {
+        "satpos_brdc": measure(lambda i: BE2pos.SatPos_brdc(tow + i, eph), n * 5),
+        "satpos_brdc_glo": measure(lambda i: BE2pos.SatPos_brdc_glo(GLO_EPH["Tb"] + (i % 900), GLO_EPH),
+                                   max(10, n // 2)),
+        "calculate_az_el": measure(lambda i: calculate_az_el(sat_pos, rec_pos), n * 5),
+    }
+
+
+def _epoch_arrays(satellites: Dict) -> tuple:
+    """(sats, signals, sat_idx, sig_idx, az, el, snr, pseudorange, phase) for `add_epoch_arrays`."""
+    sats = list(satellites)
+    signals: Dict[str, int] = {}
+    sat_idx, sig_idx, snr, pr, ph = [], [], [], [], []
+    for i, sat in enumerate(satellites.values()):
+        for sig_id, sig in sat.signals.items():
+            sat_idx.append(i)
+            sig_idx.append(signals.setdefault(sig_id, len(signals)))
+            snr.append(sig.snr or 0.0)
+            pr.append(sig.pseudorange or 0.0)
+            ph.append(sig.phase or 0.0)
+    az = [s.azimuth or 0.0 for s in satellites.values()]
+    el = [s.elevation or 0.0 for s in satellites.values()]
+    return (sats, list(signals), np.array(sat_idx), np.array(sig_idx), np.array(az), np.array(el),
+            np.array(snr), np.array(pr), np.array(ph))
+
+
+def bench_ir_store(frames: Dict[str, List[bytes]], n: int) -> Dict[str, Dict]:
+    handler = RTCMHandler()
+    for msg in parse_all(frames["eph"]):
+        handler.process_message(msg)
+    epochs = [e for e in (handler.process_message(m) for m in parse_all(frames["obs"])) if e]
+    # About one MSM message per system and epoch: advance time once per group.
+    per_second = max(1, len({key[0] for e in epochs for key in e.satellites}))
+    systems = set(config.TARGET_SYSTEMS)
+    state = {}
+
+    def reset():
+        state["store"] = GnssIrStore(keep_seconds=900)
+
+    def add(i):
+        e = epochs[i % len(epochs)]
+        state["store"].add_epoch(BENCH_GPS_SECONDS + i // per_second, e.satellites, IR_CFG, systems)
+
+    results = {"ir_add_epoch": measure(add, n, setup=reset)}
+
+    # Whole epochs (all systems merged) in the array form of `add_epoch_arrays`.
+    whole = [_epoch_arrays({k: v for e in epochs[j:j + per_second] for k, v in e.satellites.items()})
+             for j in range(0, max(1, len(epochs) - per_second + 1), per_second)]
+
+    def add_arrays(i):
+        state["store"].add_epoch_arrays(BENCH_GPS_SECONDS + i, *whole[i % len(whole)],
+                                        cfg=IR_CFG, active_systems=systems)
+
+    results["ir_add_epoch_arrays"] = measure(add_arrays, n, setup=reset)
+    results["ir_add_epoch_arrays"]["observations"] = len(whole[0][2])
+
+    # Query a store holding a full retention window (900 s).
+    reset()
+    for i in range(900 * per_second):
+        add(i)
+    prns = sorted(set(state["store"].get_series().prn)) or ["G01"]
+    results["ir_get_series_prn"] = measure(lambda i: state["store"].get_series(prn=prns[i % len(prns)]),
+                                           max(50, n // 20))
+    results["ir_get_series_all"] = measure(lambda i: state["store"].get_series(), max(20, n // 50))
+    # One (PRN, signal) track over the last 5 minutes, as a per-track GNSS-IR pass would query it.
+    tracks = state["store"].tracks() or [("G01", "1C")]
+    t_end = BENCH_GPS_SECONDS + 899
+    results["ir_get_series_track"] = measure(
+        lambda i: state["store"].get_series(prn=tracks[i % len(tracks)][0], signal_id=tracks[i % len(tracks)][1],
+                                            start_tow=t_end - 300, end_tow=t_end),
+        max(50, n // 20))
+    results["ir_get_series_prn"]["store_size"] = state["store"].size()
+    return results
+
+
+def bench_ring_buffer(n: int, producers: int = 2, maxsize: int = 1000) -> Dict[str, Dict]:
+    """`producers` threads put `n` items each while one consumer drains."""
+    def run(traced: bool):
+        rb = RingBuffer(maxsize=maxsize)
+        latencies = [[] for _ in range(producers)]
+        received = [0]
+
+        def producer(k):
+            perf = time.perf_counter_ns
+            lat = latencies[k]
+            for i in range(n):
+                t0 = perf()
+                rb.put((b"", i))
+                lat.append(perf() - t0)
+
+        def consumer():
+            while True:
+                item = rb.get(block=True, timeout=0.5)
+                if item is None:
+                    return
+                received[0] += 1
+
+        if traced:
+            tracemalloc.start()
+        c = threading.Thread(target=consumer)
+        ps = [threading.Thread(target=producer, args=(k,)) for k in range(producers)]
+        t0 = time.perf_counter()
+        c.start()
+        for p in ps:
+            p.start()
+        for p in ps:
+            p.join()
+        while rb.qsize():
+            time.sleep(0.001)
+        wall = time.perf_counter() - t0
+        rb.close()
+        c.join()
+        peak = 0
+        if traced:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return wall, sorted(x for lat in latencies for x in lat), received[0], rb.dropped, peak
+
+    wall, samples, received, dropped, _ = run(traced=False)
+    _, _, _, _, peak = run(traced=True)
+    result = _summary(producers * n, wall, samples, peak)
+    result.update({"received": received, "dropped": dropped, "producers": producers})
+    return {"ring_buffer_contention": result}
+
+
+# -----------------------------------------------------------------------------
+# Baselines
+# -----------------------------------------------------------------------------
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "pyrtcm": getattr(pyrtcm, "version", getattr(pyrtcm, "__version__", "?")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float,
+            p99_tolerance: float) -> List[str]:
+    """Cases whose throughput fell by more than `tolerance` or p99 latency rose by more than `p99_tolerance`."""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["ops_per_s"] > 0 and cur["ops_per_s"] < base["ops_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {cur['ops_per_s']:.0f}/s vs {base['ops_per_s']:.0f}/s")
+        if base["p99_us"] > 0 and cur["p99_us"] > base["p99_us"] * (1 + p99_tolerance):
+            regressions.append(f"{name}: p99 {cur['p99_us']:.1f}us vs {base['p99_us']:.1f}us")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]] = None):
+    print(f"{'case':<24}{'ops/s':>12}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'peak KB':>10}"
+          + (f"{'vs base':>10}" if baseline else ""))
+    for name, r in results.items():
+        line = (f"{name:<24}{r['ops_per_s']:>12.0f}{r['p50_us']:>10.1f}{r['p90_us']:>10.1f}"
+                f"{r['p99_us']:>10.1f}{r['peak_kb']:>10.1f}")
+        if baseline and name in baseline and baseline[name]["ops_per_s"] > 0:
+            line += f"{r['ops_per_s'] / baseline[name]['ops_per_s'] - 1:>+10.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decode/orbit/geometry/storage hot paths")
+    parser.add_argument("--only", nargs="+", choices=["decode", "orbits", "ir", "ring"],
+                        help="run only these groups")
+    parser.add_argument("-n", "--iterations", type=int, default=2000)
+    parser.add_argument("--quick", action="store_true", help="one tenth of the iterations")
+    parser.add_argument("--sats", type=int, default=10, help="satellites per constellation (synthetic)")
+    parser.add_argument("--signals", type=int, default=2, help="signals per satellite (synthetic)")
+    parser.add_argument("--capture", help="capture directory (RtcmRecorder) to decode instead of synthetic")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a JSON baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative throughput drop")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5,
+                        help="allowed relative p99 increase (tails are noisier than throughput)")
+    args = parser.parse_args()
+
+    config.TARGET_SYSTEMS = ["G", "R", "E", "C"]
+    config.APPROX_REC_POS = list(DEFAULT_REC_POS)
+    n = max(10, args.iterations // 10 if args.quick else args.iterations)
+    groups = args.only or ["decode", "orbits", "ir", "ring"]
+
+    if args.capture:
+        frames = capture_frames(args.capture, limit=n)
+    else:
+        frames = synthetic_frames(n_epochs=30, n_sats=args.sats, n_signals=args.signals)
+
+    results = {}
+    if "decode" in groups:
+        results.update(bench_decode(frames, n))
+    if "orbits" in groups:
+        results.update(bench_orbits(n))
+    if "ir" in groups:
+        results.update(bench_ir_store(frames, n))
+    if "ring" in groups:
+        results.update(bench_ring_buffer(n * 50))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"version": BASELINE_VERSION, "environment": environment(),
+                       "params": {"iterations": n, "sats": args.sats, "signals": args.signals,
+                                  "capture": args.capture},
+                       "results": results}, f, indent=2)
+        print(f"[Bench] Baseline written to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance, args.p99_tolerance)
+        for r in regressions:
+            print(f"[Bench] REGRESSION {r}")
+        if regressions:
+            return 1
+        print(f"[Bench] No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
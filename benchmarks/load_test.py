@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: MockCaster -> NtripClient/IOThread -> RingBuffer ->
+DataProcessingThread -> Qt epoch_signal delivered on the main thread.
+
+The epoch rate is stepped up until the pipeline loses data, i.e. fewer epochs
+reach the main thread than MSM messages the caster sent, the ring buffer drops
+frames, or the caster itself cannot keep its schedule.
+
+    python -m benchmarks.load_test --stations 4 --sats 12 --signals 2 --rates 1 2 5 10 20 50
+
+Requires `config.py` (TARGET_SYSTEMS / APPROX_REC_POS are used by the handler).
+The caster runs in the same interpreter as the pipeline, so the breaking point
+found here is a conservative one.
+"""
+import argparse
+import sys
+import time
+
+from PyQt6.QtCore import QCoreApplication
+
+import config
+from core.instrumentation import PIPELINE, EPOCH_LATENCY
+from core.mock_caster import MockCaster
+from core.ring_buffer import RingBuffer
+from core.rtcm_handler import RTCMHandler
+from ui.workers import DataProcessingThread, IOThread, StreamSignals
+
+
+class Pipeline:
+    """One stream wired exactly like `GNSSMonitorWindow.restart_streams`."""
+    def __init__(self, caster: MockCaster, mountpoint: str, buffer_size: int = 1000):
+        self.delivered = 0
+        self.signals = StreamSignals()
+        self.signals.epoch_signal.connect(self._on_epoch)
+        self.ring_buffer = RingBuffer(maxsize=buffer_size)
+        settings = {"host": caster.host, "port": caster.port, "mountpoint": mountpoint,
+                    "user": "load", "password": "test"}
+        self.io_thread = IOThread(mountpoint, settings, self.ring_buffer, self.signals)
+        self.proc_thread = DataProcessingThread(mountpoint, self.ring_buffer, RTCMHandler(), self.signals)
+
+    def _on_epoch(self, epoch_data):
+        if PIPELINE.enabled and epoch_data.emit_time is not None:
+            PIPELINE.record("qt_delivery", time.perf_counter() - epoch_data.emit_time)
+            EPOCH_LATENCY.record_epoch(epoch_data)  # delivery on the main thread counts as "render"
+        self.delivered += 1
+
+    def start(self):
+        self.proc_thread.start()
+        self.io_thread.start()
+
+    def stop(self):
+        self.io_thread.stop()
+        self.proc_thread.stop()
+        self.ring_buffer.close()
+
+
+def pump(app, seconds: float):
+    """Run the Qt event loop on this thread for `seconds`."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def drain(app, pipelines):
+    """Pump events until no more epochs arrive (the caster must be paused)."""
+    last = -1
+    while last != sum(p.delivered for p in pipelines):
+        last = sum(p.delivered for p in pipelines)
+        pump(app, 0.5)
+
+
+def run_step(app, caster: MockCaster, pipelines, rate: float, duration: float, warmup: float) -> dict:
+    caster.rate_hz = rate
+    caster.paused = False
+    pump(app, warmup)
+    caster.paused = True
+    drain(app, pipelines)
+
+    caster.reset_stats()
+    for p in pipelines:
+        p.delivered = 0
+    dropped0 = sum(p.ring_buffer.dropped for p in pipelines)
+    caster.paused = False
+    t0 = time.monotonic()
+    pump(app, duration)
+    caster.paused = True
+    elapsed = time.monotonic() - t0
+    pump(app, 0.1)  # epochs already being generated still count as sent
+    sent = caster.stats()
+    backlog = sum(p.ring_buffer.qsize() for p in pipelines)
+    drain(app, pipelines)
+
+    delivered = sum(p.delivered for p in pipelines)
+    return {
+        "rate_hz": rate,
+        "msm_sent": sent["msm_sent"],
+        "delivered": delivered,
+        "ratio": delivered / sent["msm_sent"] if sent["msm_sent"] else 0.0,
+        "msgs_per_s": sent["frames_sent"] / elapsed,
+        "mbit_per_s": sent["bytes_sent"] * 8 / elapsed / 1e6,
+        "ring_dropped": sum(p.ring_buffer.dropped for p in pipelines) - dropped0,
+        "backlog": backlog,
+        "late_fraction": sent["late_epochs"] / max(rate * elapsed * len(pipelines), 1.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step the mock caster rate until the pipeline loses data")
+    parser.add_argument("--stations", type=int, default=1)
+    parser.add_argument("--systems", default="GREC")
+    parser.add_argument("--sats", type=int, default=10)
+    parser.add_argument("--signals", type=int, default=2)
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 5, 10, 20, 50, 100])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per step")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--buffer", type=int, default=1000, help="RingBuffer size per stream")
+    parser.add_argument("--min-ratio", type=float, default=0.99,
+                        help="delivered/sent below this counts as loss")
+    parser.add_argument("--max-late", type=float, default=0.01,
+                        help="fraction of late caster epochs above which the generator is the limit")
+    parser.add_argument("--perf", action="store_true", help="print per-stage latency histograms per step")
+    args = parser.parse_args()
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    PIPELINE.set_enabled(args.perf)
+    config.TARGET_SYSTEMS = list(args.systems)
+    caster = MockCaster(stations=args.stations, systems=args.systems, n_sats=args.sats,
+                        n_signals=args.signals, rate_hz=args.rates[0], rec_pos=config.APPROX_REC_POS,
+                        user="load", password="test").start()
+    pipelines = [Pipeline(caster, mp, args.buffer) for mp in caster.mountpoints]
+    for p in pipelines:
+        p.start()
+    deadline = time.monotonic() + 10.0
+    while caster.stats()["clients"] < len(pipelines) and time.monotonic() < deadline:
+        pump(app, 0.1)
+
+    results = []
+    breaking_point = None
+    generator_limited = False
+    try:
+        for rate in args.rates:
+            PIPELINE.reset()
+            EPOCH_LATENCY.reset()
+            r = run_step(app, caster, pipelines, rate, args.duration, args.warmup)
+            results.append(r)
+            print(f"[LoadTest] {rate:6.1f} Hz  sent={r['msm_sent']:7d}  delivered={r['delivered']:7d}  "
+                  f"ratio={r['ratio']:.3f}  {r['msgs_per_s']:8.0f} msg/s  {r['mbit_per_s']:6.2f} Mbit/s  "
+                  f"dropped={r['ring_dropped']}  backlog={r['backlog']}  late={r['late_fraction']:.1%}")
+            if PIPELINE.enabled:
+                print(PIPELINE.format_summary())
+                print(EPOCH_LATENCY.format_summary())
+            if r["late_fraction"] > args.max_late:
+                print(f"[LoadTest] Caster cannot sustain {rate:g} Hz; stopping (generator-limited).")
+                generator_limited = True
+                break
+            if r["ratio"] < args.min_ratio or r["ring_dropped"]:
+                breaking_point = rate
+                break
+    finally:
+        for p in pipelines:
+            p.stop()
+        caster.stop()
+
+    if breaking_point is None:
+        print("[LoadTest] No pipeline loss at any tested rate"
+              + (" (stopped early: generator-limited)." if generator_limited else "."))
+    else:
+        ok = [r["rate_hz"] for r in results if r["rate_hz"] < breaking_point]
+        print(f"[LoadTest] Loss at {breaking_point:g} Hz; last clean rate: {ok[-1] if ok else 'none'} Hz "
+              f"({args.stations} stations, {args.sats} sats x {len(args.systems)} systems, {args.signals} signals)")
+    return 0 if breaking_point is None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -68,6 +68,7 @@ def main():
         "--hidden-import=ui.dialogs",
         "--hidden-import=ui.workers",
         "--hidden-import=ui.color_def",
+        "--hidden-import=ui.table_model",
         # 隐藏导入 - core 包及其所有模块
         "--hidden-import=core",
         "--hidden-import=core.rtcm_handler",
@@ -77,6 +78,24 @@ def main():
         "--hidden-import=core.display_info",
         "--hidden-import=core.BE2pos",
         "--hidden-import=core.process",
+        "--hidden-import=core.output_sinks",
+        "--hidden-import=core.gnss_time",
+        "--hidden-import=core.rtcm_recorder",
+        "--hidden-import=core.replay",
+        "--hidden-import=core.instrumentation",
+        "--hidden-import=core.metrics_server",
+        "--hidden-import=core.profiler",
+        "--hidden-import=cProfile",
+        "--hidden-import=pstats",
+        "--hidden-import=core.memory_report",
+        "--hidden-import=core.memory_budget",
+        "--hidden-import=core.reflection_zones",
+        "--hidden-import=core.ir_archive",
+        "--hidden-import=core.history_tiers",
+        "--hidden-import=core.sat_snapshot",
+        "--hidden-import=core.sat_expiry",
+        "--hidden-import=core.sat_history",
+        "--hidden-import=tracemalloc",
         # 隐藏导入 - config
         "--hidden-import=config",
         # 收集所有相关数据
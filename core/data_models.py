@@ -1,10 +1,17 @@
 """
 Data models for storing GNSS observations and satellite states.
+
+Hundreds of these are created per epoch, so they are slotted (no per-instance
+`__dict__`) on Python 3.10+; only the declared fields can be set.
 """
+import sys
 from dataclasses import dataclass, field
 from typing import Dict, Optional
 
-@dataclass
+_model = dataclass(slots=True) if sys.version_info >= (3, 10) else dataclass
+
+
+@_model
 class SignalData:
     """
     Holds observation data for a specific frequency/signal.
@@ -17,7 +24,7 @@ class SignalData:
     half_cycle: int
     doppler: float
 
-@dataclass
+@_model
 class SatelliteState:
     """
     Represents the state of a single satellite at a specific epoch.
@@ -33,10 +40,19 @@ class SatelliteState:
     # Signal Data: Key is signal_id (e.g., "1C")
     signals: Dict[str, SignalData] = field(default_factory=dict)
 
-@dataclass
+@_model
 class EpochObservation:
     """
     Container for all data in a single time epoch.
     """
     gps_time: float       # GPS Time of Week (seconds)
-    satellites: Dict[str, SatelliteState] = field(default_factory=dict)
\ No newline at end of file
+    satellites: Dict[str, SatelliteState] = field(default_factory=dict)
+    sys_id: Optional[str] = None       # constellation of the MSM message
+    stream: Optional[str] = None       # stream / processing thread name
+
+    # Instrumentation stamps (set only while instrumentation is enabled)
+    epoch_utc: Optional[float] = None    # MSM epoch converted to UTC (unix seconds)
+    recv_time: Optional[float] = None    # unix time the frame was read from the stream
+    decode_time: Optional[float] = None  # unix time decoding finished
+    render_time: Optional[float] = None  # unix time the epoch was drawn / output
+    emit_time: Optional[float] = None    # perf_counter() when handed to the GUI thread
\ No newline at end of file
@@ -2,13 +2,38 @@
 store for GNSS-IR focused observations.
 
 The store keeps only the data that matches a configurable elevation/azimuth
-window and automatically drops old samples to control memory usage.
+window and automatically drops old samples to control memory usage. Several
+named windows (reflection zones, see `core.reflection_zones`) can be active
+at once: each sample is stored once with a bitmask of the zones it falls in.
+
+Samples are held column-wise in preallocated circular NumPy arrays (tow,
+azimuth, elevation, snr, pseudorange, phase) with small integer codes for
+system, PRN and signal. The ring grows in chunks when full and expires old
+samples by advancing its head index.
+
+Every sample also gets an absolute sequence number; a per-(PRN, signal)
+index of sequence numbers lets `get_series` gather one track without
+scanning the whole store, and time ranges are found by bisection. Samples
+are in arrival order, which may lag GPS time order by up to
+`ARRIVAL_DISORDER` seconds (several streams/constellations; tows must all be
+GPST, see `core.gnss_time.epoch_gps_tow`), so the bisection is widened by
+that margin and the samples near the ends are masked. The index is brought up to date on the
+next query, so ingestion only appends columns.
+
+Epochs can be ingested from `SatelliteState` objects (`add_epoch`) or, when
+the producer already holds arrays, with `add_epoch_arrays`, which applies the
+masks as vectorized boolean operations.
 """
-from collections import deque
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import sys
 import threading
 
+import numpy as np
+
+from core.gnss_time import ARRIVAL_DISORDER, SECONDS_PER_WEEK
+from core.reflection_zones import ReflectionZones, in_windows
+
 
 @dataclass
 class IrSample:
@@ -24,29 +49,342 @@ class IrSample:
     phase: float
 
 
+# column name -> dtype; angles and SNR do not need double precision
+_COLUMNS = {
+    "tow": np.float64,
+    "azimuth": np.float32,
+    "elevation": np.float32,
+    "snr": np.float32,
+    "pseudorange": np.float64,
+    "phase": np.float64,
+    "sys_code": np.uint8,
+    "prn_code": np.uint16,
+    "sig_code": np.uint16,
+    "zone_mask": np.uint32,
+}
+
+
+class _Codes:
+    """Interning table: string <-> small integer code."""
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        c = self.index.get(value)
+        if c is None:
+            c = self.index[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(self.values, dtype=object)[codes] if len(codes) else np.empty(0, dtype=object)
+
+
+class _SeqIndex:
+    """Growable, sorted int64 array of sample sequence numbers for one (PRN, signal) track."""
+    __slots__ = ("seqs", "start", "n")
+
+    def __init__(self, capacity: int = 256):
+        self.seqs = np.empty(capacity, dtype=np.int64)
+        self.start = 0
+        self.n = 0
+
+    def extend(self, seqs: np.ndarray, oldest: int):
+        k = len(seqs)
+        if self.n + k > len(self.seqs):
+            self.trim(oldest)
+            live = self.n - self.start
+            if live + k > len(self.seqs) // 2:
+                grown = np.empty(max(2 * len(self.seqs), 2 * (live + k)), dtype=np.int64)
+                grown[:live] = self.seqs[self.start:self.n]
+                self.seqs = grown
+            else:
+                self.seqs[:live] = self.seqs[self.start:self.n]
+            self.n = live
+            self.start = 0
+        self.seqs[self.n:self.n + k] = seqs
+        self.n += k
+
+    def trim(self, oldest: int):
+        """Forget sequence numbers below `oldest` (already expired from the ring)."""
+        self.start += int(np.searchsorted(self.seqs[self.start:self.n], oldest))
+
+    def live(self, oldest: int) -> np.ndarray:
+        self.trim(oldest)
+        return self.seqs[self.start:self.n]
+
+    def __len__(self) -> int:
+        return self.n - self.start
+
+
+class IrSeries:
+    """
+    Columnar result of `GnssIrStore.get_series`.
+
+    `tow`, `azimuth`, `elevation`, `snr`, `pseudorange` and `phase` are NumPy
+    arrays in time order; `sys`, `prn` and `signal_id` decode the integer
+    codes to string arrays on access; `in_zone(name)` tests the zone bitmask.
+    Unfiltered queries return read-only views into the store (valid until
+    the ring wraps over them: `.copy()` anything kept beyond the current
+    call). Iterating yields `IrSample` rows.
+    """
+    def __init__(self, columns: Dict[str, np.ndarray], codes: Tuple["_Codes", "_Codes", "_Codes", "_Codes"]):
+        self.columns = columns
+        self._codes = codes
+
+    def __len__(self) -> int:
+        return len(self.columns["tow"])
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns")
+        if columns is not None and name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @property
+    def sys(self) -> np.ndarray:
+        return self._codes[0].decode(self.columns["sys_code"])
+
+    @property
+    def prn(self) -> np.ndarray:
+        return self._codes[1].decode(self.columns["prn_code"])
+
+    @property
+    def signal_id(self) -> np.ndarray:
+        return self._codes[2].decode(self.columns["sig_code"])
+
+    def in_zone(self, zone: str) -> np.ndarray:
+        """Boolean array: which samples lie in reflection zone `zone`."""
+        bit = self._codes[3].index.get(zone)
+        if bit is None:
+            return np.zeros(len(self), dtype=bool)
+        return (self.columns["zone_mask"] & np.uint32(1 << bit)) != 0
+
+    def copy(self) -> "IrSeries":
+        return IrSeries({k: v.copy() for k, v in self.columns.items()}, self._codes)
+
+    def __iter__(self) -> Iterator[IrSample]:
+        cols = self.columns
+        sys_ids, prns, sigs = self.sys, self.prn, self.signal_id
+        for i in range(len(self)):
+            yield IrSample(
+                tow=float(cols["tow"][i]), sys=sys_ids[i], prn=prns[i],
+                azimuth=float(cols["azimuth"][i]), elevation=float(cols["elevation"][i]),
+                signal_id=sigs[i], snr=float(cols["snr"][i]),
+                pseudorange=float(cols["pseudorange"][i]), phase=float(cols["phase"][i]),
+            )
+
+    def __getitem__(self, i: int) -> IrSample:
+        cols = self.columns
+        return IrSample(
+            tow=float(cols["tow"][i]), sys=self._codes[0].values[cols["sys_code"][i]],
+            prn=self._codes[1].values[cols["prn_code"][i]],
+            azimuth=float(cols["azimuth"][i]), elevation=float(cols["elevation"][i]),
+            signal_id=self._codes[2].values[cols["sig_code"][i]], snr=float(cols["snr"][i]),
+            pseudorange=float(cols["pseudorange"][i]), phase=float(cols["phase"][i]),
+        )
+
+
 class GnssIrStore:
     """
     Keep a rolling window of filtered GNSS observations for IR/LSP analysis.
 
     Notes on memory:
-    - `keep_seconds` controls how long data is retained.
-    - Data is stored as small dataclasses inside a deque; at 1 Hz with tens of
-      satellites this typically stays in the low tens of MB.
+    - `keep_seconds` controls how long data is retained; pass an
+      `IrArchiveWriter` as `archive` to keep everything on disk as well.
+    - Each sample costs 45 bytes of column storage (float64 tow/pseudorange/
+      phase, float32 az/el/snr, integer codes, zone bitmask) plus 8 bytes in
+      the per-track index; the ring grows by `chunk` samples (or half its
+      capacity) when full and never shrinks except through `shrink`.
     """
-    def __init__(self, keep_seconds: int = 900):
+    def __init__(self, keep_seconds: int = 900, chunk: int = 16384, archive=None):
         self.keep_seconds = keep_seconds
-        self._data: deque[IrSample] = deque()
+        self.chunk = chunk
+        self.archive = archive   # optional IrArchiveWriter: every appended block is also archived
+        self._cols = {name: np.empty(0, dtype=dt) for name, dt in _COLUMNS.items()}
+        self._cap = 0
+        self._head = 0   # physical index of the oldest sample
+        self._count = 0
+        self._sys_codes, self._prn_codes, self._sig_codes = _Codes(), _Codes(), _Codes()
+        self._zone_codes = _Codes()   # zone name -> bit, stable across recompiles
+        self._zones_key: Optional[str] = None
+        self._zones: Optional[ReflectionZones] = None
+        self._seq0 = 0   # sequence number of the sample at the head
+        self._indexed = 0   # samples below this sequence number are in the track index
+        self._sat_cache: Dict[tuple, Tuple[np.ndarray, np.ndarray]] = {}   # satellite list -> (prn, sys) codes
+        self._index: Dict[Tuple[int, int], _SeqIndex] = {}   # (prn_code, sig_code) -> sequence numbers
+        self._prn_sys: Dict[int, int] = {}                   # prn_code -> sys_code
         self._lock = threading.Lock()
 
-    def _az_allowed(self, az: float, az_windows: Iterable[Iterable[float]]) -> bool:
-        """Check if azimuth is inside any configured window."""
-        if not az_windows:
-            return True
-        for start, end in az_windows:
-            if start <= az <= end:
-                return True
-        return False
+    # -- ring management (caller holds the lock) ---------------------------
+    def _ordered(self, name: str, lo: int = 0, hi: Optional[int] = None) -> np.ndarray:
+        """
+        Logical range [lo, hi) of a column in time order: a view when it is
+        contiguous in the ring, else a concatenated copy of just that range.
+        """
+        hi = self._count if hi is None else hi
+        col = self._cols[name]
+        start = (self._head + lo) % self._cap if self._cap else 0
+        end = start + (hi - lo)
+        if end <= self._cap:
+            return col[start:end]
+        return np.concatenate((col[start:], col[: end - self._cap]))
+
+    def _tow_offset(self, tow, newest: float):
+        """Signed seconds from `newest` to `tow`, wrapped at the week boundary (<= 0 inside the window)."""
+        half = SECONDS_PER_WEEK / 2
+        return (tow - newest + half) % SECONDS_PER_WEEK - half
+
+    def _bisect(self, lo: int, hi: int, pred, positions: Optional[np.ndarray] = None) -> int:
+        """
+        First index in [lo, hi) for which `pred(tow)` is False (pred must be
+        monotonic); indexes logical positions, or entries of `positions`.
+        """
+        tow, head, cap = self._cols["tow"], self._head, self._cap
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = mid if positions is None else positions[mid]
+            if pred(float(tow[(head + pos) % cap])):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _reserve(self, extra: int):
+        needed = self._count + extra
+        if needed <= self._cap:
+            return
+        new_cap = max(needed, self._cap + max(self.chunk, self._cap // 2))
+        for name, dt in _COLUMNS.items():
+            col = np.empty(new_cap, dtype=dt)
+            col[: self._count] = self._ordered(name)
+            self._cols[name] = col
+        self._cap = new_cap
+        self._head = 0
+
+    def _expire(self, now_tow: float):
+        """
+        Advance the head past samples older than `keep_seconds` relative to
+        `now_tow`. Ages wrap at the week boundary, so retention keeps working
+        across a GPS week rollover; samples are in arrival order, so the first
+        one to keep is found by bisection.
+        """
+        def expired(t):
+            return -self._tow_offset(t, now_tow) > self.keep_seconds
 
+        if not self._count or not expired(float(self._cols["tow"][self._head])):
+            return
+        n = self._bisect(1, self._count, expired)
+        if n:
+            self._head = (self._head + n) % self._cap
+            self._count -= n
+            self._seq0 += n
+
+    def _append(self, values: Dict[str, np.ndarray]):
+        """Append equally long arrays or lists (or a scalar), one per column, at the ring tail."""
+        n = len(values["snr"])
+        if not n:
+            return
+        self._reserve(n)
+        start = (self._head + self._count) % self._cap
+        first = min(n, self._cap - start)
+        for name, col in self._cols.items():
+            v = values[name]
+            if not isinstance(v, (list, np.ndarray)):
+                col[start:start + first] = v
+                if first < n:
+                    col[: n - first] = v
+            else:
+                col[start:start + first] = v[:first]
+                if first < n:
+                    col[: n - first] = v[first:]
+        self._count += n
+        if self.archive is not None:
+            self.archive.submit(values, self._prn_codes.values, self._sig_codes.values)
+
+    def _sync_index(self):
+        """
+        Add samples appended since the last query to the track index: one
+        stable sort of the new (PRN, signal) keys, then one slice per track,
+        so ingestion itself never touches the index.
+        """
+        end = self._seq0 + self._count
+        start = max(self._indexed, self._seq0)
+        self._indexed = end
+        if start >= end:
+            return
+        lo = start - self._seq0
+        keys = (self._ordered("prn_code", lo).astype(np.int64) << 16) | self._ordered("sig_code", lo)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        seqs = order + start
+        bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        index, oldest = self._index, self._seq0
+        for a, b in zip(np.concatenate(([0], bounds)).tolist(), np.concatenate((bounds, [len(keys)])).tolist()):
+            key = int(keys[a])
+            key = (key >> 16, key & 0xFFFF)
+            idx = index.get(key)
+            if idx is None:
+                idx = index[key] = _SeqIndex()
+            idx.extend(seqs[a:b], oldest)
+
+    def _sat_codes(self, sats: tuple, sys_ids: Optional[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        PRN and system codes for a satellite list (system = first character of
+        the key unless `sys_ids` is given); successive epochs usually repeat it.
+        """
+        key = (sats, sys_ids)
+        cached = self._sat_cache.get(key)
+        if cached is None:
+            if sys_ids is None:
+                sys_ids = tuple(s[0] for s in sats)
+            prn_codes = np.fromiter((self._prn_codes.code(s) for s in sats), dtype=np.uint16, count=len(sats))
+            sys_codes = np.fromiter((self._sys_codes.code(s) for s in sys_ids), dtype=np.uint8, count=len(sats))
+            self._prn_sys.update(zip(prn_codes.tolist(), sys_codes.tolist()))
+            if len(self._sat_cache) >= 64:
+                self._sat_cache.clear()
+            cached = self._sat_cache[key] = (prn_codes, sys_codes)
+        return cached
+
+    def _select(self, prn: Optional[str], sys: Optional[str], signal_id: Optional[str]) -> Optional[np.ndarray]:
+        """
+        Logical positions (time order) of the samples matching the filters,
+        gathered from the per-track index; None when no filter is given.
+        """
+        if prn is None and sys is None and signal_id is None:
+            return None
+        self._sync_index()
+        want = []
+        for value, table in ((prn, self._prn_codes), (sys, self._sys_codes), (signal_id, self._sig_codes)):
+            code = table.index.get(value) if value is not None else None
+            if value is not None and code is None:
+                return np.empty(0, dtype=np.int64)
+            want.append(code)
+        prn_code, sys_code, sig_code = want
+        if prn_code is not None and sig_code is not None:
+            idx = self._index.get((prn_code, sig_code))
+            if idx is None or (sys_code is not None and self._prn_sys.get(prn_code) != sys_code):
+                return np.empty(0, dtype=np.int64)
+            return idx.live(self._seq0) - self._seq0
+        parts = [idx.live(self._seq0) for (p, g), idx in self._index.items()
+                 if (prn_code is None or p == prn_code)
+                 and (sig_code is None or g == sig_code)
+                 and (sys_code is None or self._prn_sys.get(p) == sys_code)]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        seqs = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts), kind="mergesort")
+        return seqs - self._seq0
+
+    def _zones_for(self, cfg: Optional[dict]) -> ReflectionZones:
+        """Compiled zones of a `GNSS_IR` dict, recompiled only when its content changes."""
+        key = repr(cfg)
+        if key != self._zones_key:
+            self._zones = ReflectionZones.from_config(cfg, bit_of=self._zone_codes.code)
+            self._zones_key = key
+        return self._zones
+
+    # -- public API ----------------------------------------------------------
     def add_epoch(self, tow: float, satellites: Dict[str, object], cfg: dict, active_systems: set):
         """
         Filter and append observations from one epoch.
@@ -54,74 +392,253 @@ class GnssIrStore:
         Args:
             tow: time-of-week in seconds.
             satellites: mapping like {'G01': SatelliteState, ...}
-            cfg: configuration dict with min/max elevation, azimuth ranges.
+            cfg: configuration dict with min/max elevation, azimuth ranges
+                 (or named `ZONES` of them).
             active_systems: systems currently enabled
         """
-        min_el = cfg.get("MIN_ELEVATION_DEG", 0)
-        max_el = cfg.get("MAX_ELEVATION_DEG", 90)
-        az_windows = cfg.get("AZ_WINDOWS_DEG", [])
-
+        # Objects have to be visited one by one anyway, so the zone lookup is
+        # done inline and the accepted rows are collected per column and
+        # appended as one block (see `add_epoch_arrays` for array input).
+        cols = {name: [] for name in _COLUMNS if name != "tow"}
+        az_col, el_col, snr_col = cols["azimuth"], cols["elevation"], cols["snr"]
+        pr_col, ph_col = cols["pseudorange"], cols["phase"]
+        sys_col, prn_col, sig_col = cols["sys_code"], cols["prn_code"], cols["sig_code"]
+        zone_col = cols["zone_mask"]
         with self._lock:
             # Drop expired samples
-            cutoff = tow - self.keep_seconds
-            while self._data and self._data[0].tow < cutoff:
-                self._data.popleft()
+            self._expire(tow)
+            zones = self._zones_for(cfg)
+            min_el, max_el = zones.min_el, zones.max_el
 
             for sat_key, sat in satellites.items():
                 sys_id = getattr(sat, "sys_id", sat_key[0])
                 if sys_id not in active_systems:
                     continue
-
                 el = getattr(sat, "el", None) or getattr(sat, "elevation", 0.0) or 0.0
-                az = getattr(sat, "az", None) or getattr(sat, "azimuth", 0.0) or 0.0
-
                 if el < min_el or el > max_el:
                     continue
-                if not self._az_allowed(az, az_windows):
+                az = getattr(sat, "az", None) or getattr(sat, "azimuth", 0.0) or 0.0
+                zone_mask = zones.lookup_one(az, el)
+                if not zone_mask:
                     continue
 
+                sys_code = self._sys_codes.code(sys_id)
+                prn_code = self._prn_codes.code(sat_key)
+                self._prn_sys[prn_code] = sys_code
                 for sig_id, sig in getattr(sat, "signals", {}).items():
                     if not sig:
                         continue
                     snr = getattr(sig, "snr", 0.0) or 0.0
                     if snr <= 0:
                         continue
-                    pr = getattr(sig, "pseudorange", 0.0) or 0.0
-                    ph = getattr(sig, "phase", 0.0) or 0.0
-
-                    self._data.append(
-                        IrSample(
-                            tow=tow,
-                            sys=sys_id,
-                            prn=sat_key,
-                            azimuth=az,
-                            elevation=el,
-                            signal_id=sig_id,
-                            snr=snr,
-                            pseudorange=pr,
-                            phase=ph,
-                        )
-                    )
+                    az_col.append(az)
+                    el_col.append(el)
+                    snr_col.append(snr)
+                    pr_col.append(getattr(sig, "pseudorange", 0.0) or 0.0)
+                    ph_col.append(getattr(sig, "phase", 0.0) or 0.0)
+                    sys_col.append(sys_code)
+                    prn_col.append(prn_code)
+                    sig_col.append(self._sig_codes.code(sig_id))
+                    zone_col.append(zone_mask)
+
+            cols["tow"] = tow
+            self._append(cols)
+
+    def add_epoch_arrays(
+        self,
+        tow: float,
+        sats: Sequence[str],
+        signals: Sequence[str],
+        sat_idx,
+        sig_idx,
+        az,
+        el,
+        snr,
+        pseudorange=None,
+        phase=None,
+        cfg: Optional[dict] = None,
+        active_systems: Optional[set] = None,
+        sys_ids: Optional[Sequence[str]] = None,
+    ):
+        """
+        Filter and append one epoch given as arrays.
+
+        Args:
+            tow: time-of-week in seconds.
+            sats: satellite keys ('G01', ...); `az`/`el` hold one value per satellite.
+            signals: signal ids ('1C', ...).
+            sat_idx, sig_idx: per observation, index into `sats` / `signals`.
+            snr, pseudorange, phase: per observation (missing pseudorange/phase = 0).
+            cfg: GNSS_IR mask (MIN/MAX_ELEVATION_DEG, AZ_WINDOWS_DEG or ZONES);
+                 None = elevation 0-90 deg, any azimuth.
+            active_systems: systems to keep; None = all.
+            sys_ids: system per satellite (default: first character of the key).
+
+        The zone grid lookup and the system test are evaluated per satellite
+        and the SNR > 0 test per observation as array operations; surviving
+        rows are appended to the columns in one block.
+        """
+        sats = tuple(sats)
+        sys_ids = tuple(sys_ids) if sys_ids is not None else None
+        az = np.asarray(az, dtype=np.float64)
+        el = np.asarray(el, dtype=np.float64)
+        sat_idx = np.asarray(sat_idx, dtype=np.intp)
+        snr = np.asarray(snr, dtype=np.float64)
+
+        with self._lock:
+            # Drop expired samples
+            self._expire(tow)
+            if not len(sat_idx):
+                return
+            sat_zones = self._zones_for(cfg).lookup(az, el)
+            sat_ok = sat_zones != 0
+            prn_codes, sys_codes = self._sat_codes(sats, sys_ids)
+            if active_systems is not None:
+                index = self._sys_codes.index
+                active = np.zeros(256, dtype=bool)
+                active[[index[s] for s in active_systems if s in index]] = True
+                sat_ok &= active[sys_codes]
+            keep = (snr > 0) & sat_ok[sat_idx]
+            if not keep.any():
+                return
+            sig_codes = np.fromiter((self._sig_codes.code(s) for s in signals), dtype=np.uint16, count=len(signals))
+            rows = sat_idx[keep]
+            self._append({
+                "tow": tow,
+                "azimuth": az[rows],
+                "elevation": el[rows],
+                "snr": snr[keep],
+                "pseudorange": np.asarray(pseudorange, dtype=np.float64)[keep] if pseudorange is not None else 0.0,
+                "phase": np.asarray(phase, dtype=np.float64)[keep] if phase is not None else 0.0,
+                "sys_code": sys_codes[rows],
+                "prn_code": prn_codes[rows],
+                "sig_code": sig_codes[np.asarray(sig_idx, dtype=np.intp)[keep]],
+                "zone_mask": sat_zones[rows],
+            })
 
     def get_series(
         self,
         prn: Optional[str] = None,
         sys: Optional[str] = None,
         signal_id: Optional[str] = None,
-    ) -> List[IrSample]:
+        start_tow: Optional[float] = None,
+        end_tow: Optional[float] = None,
+        min_el: Optional[float] = None,
+        max_el: Optional[float] = None,
+        az_windows: Optional[Iterable[Iterable[float]]] = None,
+        zone: Optional[str] = None,
+    ) -> IrSeries:
         """
-        Return filtered samples for downstream processing (e.g., Lomb–Scargle).
+        Return filtered samples for downstream processing (e.g., Lomb–Scargle)
+        as an `IrSeries` of column arrays.
+
+        `prn`/`sys`/`signal_id` are resolved through the per-track index and
+        `start_tow`/`end_tow` (inclusive, week-wrap aware) by bisection, so the
+        cost follows the size of the result rather than the store. `min_el`,
+        `max_el`, `az_windows` (inclusive, start > end wraps through north, as in
+        the config) and `zone` (a reflection zone name) narrow the
+        stored mask further and are applied to the selected samples only.
         """
+        codes = (self._sys_codes, self._prn_codes, self._sig_codes, self._zone_codes)
+        with self._lock:
+            positions = self._select(prn, sys, signal_id)
+            lo, hi = 0, self._count
+            timed = (start_tow is not None or end_tow is not None) and self._count
+            if timed:
+                newest = float(self._cols["tow"][(self._head + self._count - 1) % self._cap])
+                if positions is not None:
+                    hi = len(positions)
+                start_off = self._tow_offset(start_tow, newest) if start_tow is not None else None
+                end_off = self._tow_offset(end_tow, newest) if end_tow is not None else None
+                if start_off is not None:
+                    bound = start_off - ARRIVAL_DISORDER
+                    lo = self._bisect(0, hi, lambda t: self._tow_offset(t, newest) < bound, positions)
+                if end_off is not None:
+                    bound = end_off + ARRIVAL_DISORDER
+                    hi = self._bisect(lo, hi, lambda t: self._tow_offset(t, newest) <= bound, positions)
+                if positions is not None:
+                    positions = positions[lo:hi]
+            if positions is None:
+                columns = {name: self._ordered(name, lo, hi) for name in _COLUMNS}
+            else:
+                phys = (self._head + positions) % self._cap if self._cap else positions
+                columns = {name: col[phys] for name, col in self._cols.items()}
+
+        if timed:
+            # out-of-order samples inside the widened bisection range
+            off = self._tow_offset(columns["tow"], newest)
+            inside = np.ones(len(off), dtype=bool)
+            if start_off is not None:
+                inside &= off >= start_off
+            if end_off is not None:
+                inside &= off <= end_off
+            if not inside.all():
+                columns = {name: c[inside] for name, c in columns.items()}
+
+        if min_el is not None or max_el is not None or az_windows or zone is not None:
+            el, az = columns["elevation"], columns["azimuth"]
+            mask = np.ones(len(el), dtype=bool)
+            if zone is not None:
+                bit = self._zone_codes.index.get(zone)
+                mask &= ((columns["zone_mask"] & np.uint32(1 << bit)) != 0) if bit is not None else False
+            if min_el is not None:
+                mask &= el >= min_el
+            if max_el is not None:
+                mask &= el <= max_el
+            if az_windows:
+                mask &= in_windows(az, list(az_windows))
+            return IrSeries({name: c[mask] for name, c in columns.items()}, codes)
+        for c in columns.values():
+            if c.base is not None:
+                c.flags.writeable = False
+        return IrSeries(columns, codes)
+
+    def zones(self) -> List[str]:
+        """Names of the reflection zones of the current mask."""
+        with self._lock:
+            return list(self._zones.names) if self._zones is not None else []
+
+    def tracks(self) -> List[Tuple[str, str]]:
+        """(prn, signal_id) pairs that currently have samples in the window."""
         with self._lock:
-            return [
-                s
-                for s in list(self._data)
-                if (prn is None or s.prn == prn)
-                and (sys is None or s.sys == sys)
-                and (signal_id is None or s.signal_id == signal_id)
-            ]
+            self._sync_index()
+            prns, sigs = self._prn_codes.values, self._sig_codes.values
+            return sorted((prns[p], sigs[g]) for (p, g), idx in self._index.items() if len(idx.live(self._seq0)))
 
     def size(self) -> int:
         with self._lock:
-            return len(self._data)
+            return self._count
 
+    def shrink(self, fraction: float, min_keep_seconds: float = 60.0) -> float:
+        """
+        Shorten the retention window by `fraction` (not below `min_keep_seconds`,
+        never above the current window),
+        drop samples that fall outside it now and release unused capacity.
+        Returns the new `keep_seconds`.
+        """
+        with self._lock:
+            self.keep_seconds = min(self.keep_seconds, max(min_keep_seconds, self.keep_seconds * (1.0 - fraction)))
+            if self._count:
+                self._expire(self._cols["tow"][(self._head + self._count - 1) % self._cap])
+            for key, idx in list(self._index.items()):
+                if not len(idx.live(self._seq0)):
+                    del self._index[key]
+            if self._cap > self._count + self.chunk:
+                new_cap = self._count + self.chunk
+                for name, dt in _COLUMNS.items():
+                    col = np.empty(new_cap, dtype=dt)
+                    col[: self._count] = self._ordered(name)
+                    self._cols[name] = col
+                self._cap = new_cap
+                self._head = 0
+            return self.keep_seconds
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the column arrays (allocated capacity), the track index and the code tables."""
+        with self._lock:
+            total = sum(col.nbytes for col in self._cols.values())
+            total += sum(idx.seqs.nbytes for idx in self._index.values())
+            for table in (self._sys_codes, self._prn_codes, self._sig_codes):
+                total += sys.getsizeof(table.index) + sys.getsizeof(table.values)
+                total += sum(sys.getsizeof(v) for v in table.values)
+            return total
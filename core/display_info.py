@@ -1,9 +1,9 @@
 
-def print_epoch_header(epoch_data):
-    print("=" * 68)
-    print(f" EPOCH TIME : {epoch_data.gps_time}")
-    print(f" NUM SATS   : {len(epoch_data.satellites)}")
-    print("-" * 68)
+def print_epoch_header(epoch_data, out=print):
+    out("=" * 68)
+    out(f" EPOCH TIME : {epoch_data.gps_time}")
+    out(f" NUM SATS   : {len(epoch_data.satellites)}")
+    out("-" * 68)
 
 
 def group_satellites_by_system(epoch_data):
@@ -25,10 +25,10 @@ def group_satellites_by_system(epoch_data):
     return sats_by_sys, sys_map
 
 
-def print_satellite_block(sys_char, sat_list, sys_map):
-    print(f"\n [{sys_map.get(sys_char, 'UNKNOWN')}] ({len(sat_list)} sats)\n")
-    print("  PRN   Signal  |  El(°)  Az(°)  |   SNR(dB)   Pseudorange(m)     CarrierPhase(cyc)")
-    print(" ---------------------------------------------------------------------------------------")
+def print_satellite_block(sys_char, sat_list, sys_map, out=print):
+    out(f"\n [{sys_map.get(sys_char, 'UNKNOWN')}] ({len(sat_list)} sats)\n")
+    out("  PRN   Signal  |  El(°)  Az(°)  |   SNR(dB)   Pseudorange(m)     CarrierPhase(cyc)")
+    out(" ---------------------------------------------------------------------------------------")
 
     valid_count = 0
 
@@ -48,14 +48,29 @@ def print_satellite_block(sys_char, sat_list, sys_map):
             pr  = f"{sig.pseudorange:14.3f}" if getattr(sig, "pseudorange", None) else "      N/A"
             cp  = f"{sig.phase:16.3f}"       if getattr(sig, "phase", None)       else "        N/A"
 
-            print(f"  {key:4}   {sig_code:4}   |  {el_str}  {az_str}  |   {snr}     {pr}     {cp}")
+            out(f"  {key:4}   {sig_code:4}   |  {el_str}  {az_str}  |   {snr}     {pr}     {cp}")
 
     return valid_count
 
 
-def print_epoch_footer(epoch_data, valid_count):
-    print(
+def print_epoch_footer(epoch_data, valid_count, out=print):
+    out(
         "\n--- EPOCH PROCESSED: "
         f"{epoch_data.gps_time} | Valid SNR sats = {valid_count} ---"
     )
-    print("=" * 87 + "\n")
+    out("=" * 87 + "\n")
+
+
+def format_epoch_table(epoch_data):
+    """Render the full per-signal table for one epoch as a single string."""
+    lines = []
+    print_epoch_header(epoch_data, out=lines.append)
+
+    sats_by_sys, sys_map = group_satellites_by_system(epoch_data)
+
+    total_valid = 0
+    for sys_char, sat_list in sats_by_sys.items():
+        total_valid += print_satellite_block(sys_char, sat_list, sys_map, out=lines.append)
+
+    print_epoch_footer(epoch_data, total_valid, out=lines.append)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,100 @@
+"""
+GNSS time helpers: GPS seconds, week rollover resolution and MSM epoch times.
+"""
+import time
+from typing import Optional
+
+GPS_EPOCH_UNIX = 315964800     # 1980-01-06 00:00:00 UTC
+LEAP_SECONDS = 18              # GPST - UTC
+BDT_OFFSET = 14                # GPST - BDT
+SECONDS_PER_DAY = 86400
+SECONDS_PER_WEEK = 604800
+# Epochs of different constellations/streams reach the GUI in arrival order,
+# which may run up to this many seconds behind GPS time order.
+ARRIVAL_DISORDER = 30.0
+
+# MSM message prefix -> (system, epoch time DF)
+MSM_TIME_FIELDS = {
+    "107": ("G", "DF004"),
+    "108": ("R", "DF034"),
+    "109": ("E", "DF248"),
+    "111": ("J", "DF428"),
+    "112": ("C", "DF427"),
+}
+
+
+def unix_to_gps_seconds(unix_time: float) -> float:
+    """Continuous GPS seconds since the GPS epoch."""
+    return unix_time - GPS_EPOCH_UNIX + LEAP_SECONDS
+
+
+def gps_seconds_to_unix(gps_seconds: float) -> float:
+    return gps_seconds + GPS_EPOCH_UNIX - LEAP_SECONDS
+
+
+def gps_seconds_now() -> float:
+    return unix_to_gps_seconds(time.time())
+
+
+def epoch_gps_tow(tow: float, sys_id: Optional[str]) -> float:
+    """
+    GPS time of week of an `EpochObservation.gps_time` as set by `RTCMHandler`,
+    which keeps each constellation's timescale: BeiDou epochs are BDT time of
+    week, GLONASS epochs UTC seconds of the week (without leap seconds).
+    """
+    if sys_id == "C":
+        tow += BDT_OFFSET
+    elif sys_id == "R":
+        tow += LEAP_SECONDS
+    else:
+        return tow
+    return tow % SECONDS_PER_WEEK
+
+
+def resolve_periodic(value: float, period: float, ref: float) -> float:
+    """
+    Resolve a time given modulo `period` (time of week / time of day) to the
+    absolute time closest to `ref`.
+    """
+    base = ref - (ref % period)
+    t = base + (value % period)
+    if t - ref > period / 2:
+        t -= period
+    elif ref - t > period / 2:
+        t += period
+    return t
+
+
+def msm_epoch_gps_seconds(msg, ref_gps_seconds: Optional[float] = None) -> Optional[float]:
+    """
+    Absolute GPS seconds of an MSM message epoch, or None for non-MSM messages.
+
+    GLONASS epochs are time of day in UTC(SU) (UTC + 3 h) and BeiDou epochs are
+    BDT time of week; both are converted to GPST. The week/day ambiguity is
+    resolved against `ref_gps_seconds` (default: now).
+    """
+    fields = MSM_TIME_FIELDS.get(msg.identity[:3])
+    if fields is None:
+        return None
+    sys_id, time_df = fields
+    raw = getattr(msg, time_df, None)
+    if raw is None:
+        return None
+    if ref_gps_seconds is None:
+        ref_gps_seconds = gps_seconds_now()
+
+    t = raw / 1000.0
+    if sys_id == "R":
+        gps_tod = t - 3 * 3600 + LEAP_SECONDS
+        return resolve_periodic(gps_tod, SECONDS_PER_DAY, ref_gps_seconds)
+    if sys_id == "C":
+        t += BDT_OFFSET
+    return resolve_periodic(t, SECONDS_PER_WEEK, ref_gps_seconds)
+
+
+def msm_epoch_unix(msg, ref_unix: Optional[float] = None) -> Optional[float]:
+    """UTC (unix seconds) of an MSM message epoch, or None for non-MSM messages."""
+    if ref_unix is None:
+        ref_unix = time.time()
+    gps_seconds = msm_epoch_gps_seconds(msg, unix_to_gps_seconds(ref_unix))
+    return None if gps_seconds is None else gps_seconds_to_unix(gps_seconds)
@@ -0,0 +1,258 @@
+"""
+Multi-resolution per-satellite SNR/elevation history.
+
+`HistoryTiers` keeps, per PRN, min/mean/max SNR per signal and mean elevation
+aggregated into fixed time buckets at several resolutions (default 30 s kept
+for 12 h and 5 min kept for 3 days). It is maintained incrementally: each
+sample updates the open bucket of the finest tier; when a bucket closes it is
+written to that tier's ring and folded into the open bucket of the next
+(coarser) tier, so the cost per sample does not depend on the number of tiers.
+
+The raw samples of the last minutes stay in the GUI's `sat_history`;
+`tier_for_span` picks the coarsest bucket still needed for a visible span, and
+`query` returns that tier (including the bucket still being filled) as arrays.
+"""
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_TIERS = ((30, 12 * 3600), (300, 3 * 86400))   # (bucket seconds, retention seconds)
+
+
+class _Acc:
+    """Open bucket: elevation sum/count and per-signal min/max/sum/count."""
+    __slots__ = ("start", "el_sum", "el_n", "snr")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.el_sum = 0.0
+        self.el_n = 0
+        self.snr: Dict[str, List[float]] = {}   # sig -> [min, max, sum, count]
+
+    def add(self, el: Optional[float], snr_map: Dict[str, float]):
+        if el is not None:
+            self.el_sum += el
+            self.el_n += 1
+        for sig, v in snr_map.items():
+            s = self.snr.get(sig)
+            if s is None:
+                self.snr[sig] = [v, v, v, 1]
+            else:
+                if v < s[0]:
+                    s[0] = v
+                if v > s[1]:
+                    s[1] = v
+                s[2] += v
+                s[3] += 1
+
+    def merge(self, other: "_Acc"):
+        self.el_sum += other.el_sum
+        self.el_n += other.el_n
+        for sig, (lo, hi, total, n) in other.snr.items():
+            s = self.snr.get(sig)
+            if s is None:
+                self.snr[sig] = [lo, hi, total, n]
+            else:
+                s[0] = min(s[0], lo)
+                s[1] = max(s[1], hi)
+                s[2] += total
+                s[3] += n
+
+
+class _TierRing:
+    """Closed buckets of one PRN and tier: time, mean elevation and SNR (min, mean, max) per signal slot."""
+    def __init__(self, max_rows: int):
+        self.max_rows = max_rows
+        self.cap = 0
+        self.head = 0
+        self.count = 0
+        self.slots: Dict[str, int] = {}
+        self.t = np.empty(0)
+        self.el = np.empty(0, dtype=np.float32)
+        self.snr = np.empty((0, 0, 3), dtype=np.float32)
+
+    def _grow(self, cap: int, n_slots: int):
+        order = (self.head + np.arange(self.count)) % self.cap if self.cap else np.arange(0)
+        t = np.empty(cap)
+        el = np.empty(cap, dtype=np.float32)
+        snr = np.full((cap, n_slots, 3), np.nan, dtype=np.float32)
+        t[:self.count] = self.t[order]
+        el[:self.count] = self.el[order]
+        snr[:self.count, :self.snr.shape[1]] = self.snr[order]
+        self.t, self.el, self.snr = t, el, snr
+        self.cap, self.head = cap, 0
+
+    def append(self, acc: _Acc):
+        for sig in acc.snr:
+            if sig not in self.slots:
+                self.slots[sig] = len(self.slots)
+        n_slots = len(self.slots)
+        if self.count == self.cap and self.cap < self.max_rows:
+            self._grow(min(self.max_rows, max(16, 2 * self.cap)), max(n_slots, self.snr.shape[1]))
+        elif n_slots > self.snr.shape[1]:
+            self._grow(self.cap, n_slots)
+        i = (self.head + self.count) % self.cap
+        if self.count == self.cap:
+            self.head = (self.head + 1) % self.cap   # full: overwrite the oldest bucket
+        else:
+            self.count += 1
+        self.t[i] = acc.start
+        self.el[i] = acc.el_sum / acc.el_n if acc.el_n else np.nan
+        self.snr[i] = np.nan
+        for sig, (lo, hi, total, n) in acc.snr.items():
+            self.snr[i, self.slots[sig]] = (lo, total / n, hi)
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self.head + self.count <= self.cap:
+            sl = slice(self.head, self.head + self.count)
+            return self.t[sl], self.el[sl], self.snr[sl]
+        order = (self.head + np.arange(self.count)) % self.cap
+        return self.t[order], self.el[order], self.snr[order]
+
+    def nbytes(self) -> int:
+        return self.t.nbytes + self.el.nbytes + self.snr.nbytes
+
+
+class HistoryTiers:
+    """
+    Aggregated per-PRN history at the resolutions in `tiers` ((bucket s,
+    retention s), finest first; each bucket must divide the next one).
+    Times are unix seconds. `add` and `query` may be called from different
+    threads.
+    """
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS):
+        self.tiers = [(int(b), int(r)) for b, r in tiers]
+        for (b1, _), (b2, _) in zip(self.tiers, self.tiers[1:]):
+            if b2 % b1:
+                raise ValueError(f"bucket {b2} s is not a multiple of {b1} s")
+        self._rings: Dict[str, List[_TierRing]] = {}
+        self._open: Dict[str, List[Optional[_Acc]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def buckets(self) -> List[int]:
+        return [b for b, _ in self.tiers]
+
+    def add(self, prn: str, t: float, el: Optional[float], snr_map: Dict[str, float]):
+        """Fold one sample (elevation in deg, {signal: SNR}) into the open buckets of `prn`."""
+        with self._lock:
+            opened = self._open.get(prn)
+            if opened is None:
+                opened = self._open[prn] = [None] * len(self.tiers)
+                self._rings[prn] = [_TierRing(max(1, r // b)) for b, r in self.tiers]
+            bucket = self.tiers[0][0]
+            start = t - t % bucket
+            acc = opened[0]
+            if acc is None or acc.start != start:
+                if acc is not None:
+                    self._close(prn, 0, acc)
+                acc = opened[0] = _Acc(start)
+            acc.add(el, snr_map)
+
+    def _close(self, prn: str, level: int, acc: _Acc):
+        """Store a finished bucket and fold it into the next tier (closing that one if it moved on)."""
+        self._rings[prn][level].append(acc)
+        if level + 1 >= len(self.tiers):
+            return
+        opened = self._open[prn]
+        bucket = self.tiers[level + 1][0]
+        start = acc.start - acc.start % bucket
+        parent = opened[level + 1]
+        if parent is None or parent.start != start:
+            if parent is not None:
+                self._close(prn, level + 1, parent)
+            parent = opened[level + 1] = _Acc(start)
+        parent.merge(acc)
+
+    def tier_for_span(self, span_seconds: float) -> int:
+        """Index of the finest tier whose retention covers `span_seconds` (the coarsest if none does)."""
+        for i, (_, retention) in enumerate(self.tiers):
+            if span_seconds <= retention:
+                return i
+        return len(self.tiers) - 1
+
+    def query(self, prn: str, t0: Optional[float] = None, t1: Optional[float] = None,
+              tier: Optional[int] = None) -> Optional[Dict[str, object]]:
+        """
+        Buckets of `prn` starting in [t0, t1] at `tier` (default: chosen from
+        the span), including the open bucket. Returns {'bucket', 'time', 'el',
+        'signals', 'snr_min', 'snr_mean', 'snr_max'} (SNR arrays: rows x
+        signals, NaN where a signal had no samples), or None for an unknown PRN.
+        """
+        with self._lock:
+            rings = self._rings.get(prn)
+            if rings is None:
+                return None
+            if tier is None:
+                tier = self.tier_for_span((t1 - t0) if t0 is not None and t1 is not None else float("inf"))
+            ring = rings[tier]
+            t, el, snr = (a.copy() for a in ring.ordered())
+            signals = sorted(ring.slots, key=ring.slots.get)
+            # Open buckets of this tier and the finer ones are disjoint (a bucket is
+            # folded upwards only when it closes): regroup them at this resolution.
+            bucket = self.tiers[tier][0]
+            partial: Dict[float, _Acc] = {}
+            for acc in self._open[prn][:tier + 1]:
+                if acc is not None:
+                    start = acc.start - acc.start % bucket
+                    partial.setdefault(start, _Acc(start)).merge(acc)
+
+        for start in sorted(partial):
+            acc = partial[start]
+            for sig in acc.snr:
+                if sig not in signals:
+                    signals.append(sig)
+            if snr.shape[1] < len(signals):
+                snr = np.concatenate([snr, np.full((len(snr), len(signals) - snr.shape[1], 3), np.nan,
+                                                   dtype=np.float32)], axis=1)
+            row = np.full((1, len(signals), 3), np.nan, dtype=np.float32)
+            for sig, (lo, hi, total, n) in acc.snr.items():
+                row[0, signals.index(sig)] = (lo, total / n, hi)
+            t = np.append(t, start)
+            el = np.append(el, np.float32(acc.el_sum / acc.el_n) if acc.el_n else np.float32(np.nan))
+            snr = np.concatenate([snr, row])
+
+        if len(t):
+            retention = self.tiers[tier][1]
+            lo = max(t0 if t0 is not None else -np.inf, t[-1] - retention)
+            hi = t1 if t1 is not None else np.inf
+            keep = (t >= lo - self.tiers[tier][0]) & (t <= hi)
+            t, el, snr = t[keep], el[keep], snr[keep]
+        return {"bucket": self.tiers[tier][0], "time": t, "el": el, "signals": signals,
+                "snr_min": snr[:, :, 0], "snr_mean": snr[:, :, 1], "snr_max": snr[:, :, 2]}
+
+    def remove(self, prn: str):
+        with self._lock:
+            self._rings.pop(prn, None)
+            self._open.pop(prn, None)
+
+    def clear(self):
+        with self._lock:
+            self._rings.clear()
+            self._open.clear()
+
+    def prns(self) -> List[str]:
+        with self._lock:
+            return sorted(self._rings)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(r.nbytes() for rings in self._rings.values() for r in rings)
+
+    def shrink(self, fraction: float, min_retention: int = 3600) -> List[Tuple[int, int]]:
+        """
+        Shorten every tier's retention by `fraction` (not below `min_retention`,
+        never above the current retention) and drop the excess.
+        """
+        with self._lock:
+            self.tiers = [(b, min(r, max(min_retention, int(r * (1.0 - fraction))))) for b, r in self.tiers]
+            for rings in self._rings.values():
+                for ring, (b, r) in zip(rings, self.tiers):
+                    ring.max_rows = max(1, r // b)
+                    if ring.cap > ring.max_rows:
+                        keep = min(ring.count, ring.max_rows)
+                        ring.head = (ring.head + ring.count - keep) % ring.cap
+                        ring.count = keep
+                        ring._grow(ring.max_rows, ring.snr.shape[1])
+            return list(self.tiers)
@@ -0,0 +1,327 @@
+"""
+Per-stage pipeline timing with HDR-style latency histograms.
+
+Stages (recorded by the code that owns them):
+
+    io_parse      pyrtcm frame parse on the I/O thread
+    ring_wait     time a frame spent in the RingBuffer
+    decode        RTCMHandler.process_message
+    orbit_azel    satellite position + az/el for one satellite
+    ir_add_epoch  GnssIrStore.add_epoch
+    qt_delivery   epoch_signal emit -> GUI slot start
+    refresh       refresh_all_widgets
+
+`EPOCH_LATENCY` relates the same pipeline to GNSS time: each MSM epoch is
+stamped (unix seconds) when its frame arrives, after decode and when it is
+drawn, and compared with the epoch time itself converted to UTC, giving per
+stream / constellation distributions of
+
+    caster   frame arrival - epoch   (receiver, caster and network)
+    queue    decoded - frame arrival (ring buffer wait + decode)
+    render   drawn - decoded         (Qt delivery, refresh throttling, drawing)
+    total    drawn - epoch
+
+Instrumentation is off unless `PIPELINE.enabled` is set (config
+`INSTRUMENTATION = {"ENABLED": True}` or the GUI Perf dialog). Hot paths use
+
+    t0 = PIPELINE.start()
+    ...
+    PIPELINE.stop("decode", t0)
+
+which costs one attribute check when disabled.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from core.gnss_time import msm_epoch_unix
+
+STAGES = ("io_parse", "ring_wait", "decode", "orbit_azel", "ir_add_epoch", "qt_delivery", "refresh")
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram over integer microseconds (HdrHistogram layout).
+
+    Values below 2**sub_bits are counted exactly; above that each power-of-two
+    range is split into 2**(sub_bits-1) equal buckets, so every recorded value
+    is reproduced within 1 / 2**(sub_bits-1) relative error (~1.6% for the
+    default 7 bits) with a fixed, small number of buckets.
+    """
+    def __init__(self, highest_seconds: float = 3600.0, sub_bits: int = 7):
+        self.sub_bits = sub_bits
+        self._sub_count = 1 << sub_bits
+        self._half = self._sub_count >> 1
+        self.highest_us = int(highest_seconds * 1e6)
+        self._counts = [0] * (self._index(self.highest_us) + 1)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def _index(self, v: int) -> int:
+        if v < self._sub_count:
+            return v
+        exp = v.bit_length() - self.sub_bits
+        return self._sub_count + (exp - 1) * self._half + ((v >> exp) - self._half)
+
+    def _value_at(self, index: int) -> int:
+        """Highest value that maps to `index`."""
+        if index < self._sub_count:
+            return index
+        exp, offset = divmod(index - self._sub_count, self._half)
+        exp += 1
+        return ((offset + self._half + 1) << exp) - 1
+
+    def record(self, seconds: float):
+        v = int(seconds * 1e6)
+        if v < 0:
+            v = 0
+        elif v > self.highest_us:
+            v = self.highest_us
+        idx = self._index(v)
+        with self._lock:
+            self._counts[idx] += 1
+            self.count += 1
+            self.total_us += v
+            if v < self.min_us:
+                self.min_us = v
+            if v > self.max_us:
+                self.max_us = v
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = 0
+            self.total_us = 0
+            self.min_us = self.highest_us
+            self.max_us = 0
+
+    def merge(self, other: "LatencyHistogram"):
+        with other._lock:
+            counts = list(other._counts)
+            count, total, lo, hi = other.count, other.total_us, other.min_us, other.max_us
+        with self._lock:
+            for i, c in enumerate(counts[: len(self._counts)]):
+                self._counts[i] += c
+            self.count += count
+            self.total_us += total
+            self.min_us = min(self.min_us, lo)
+            self.max_us = max(self.max_us, hi)
+
+    def percentiles(self, qs: List[float]) -> List[float]:
+        """Values in seconds at the given percentiles (0-100)."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self.count
+            hi = self.max_us
+        if total == 0:
+            return [0.0] * len(qs)
+        out = []
+        for q in qs:
+            target = max(1, int(round(q / 100.0 * total)))
+            seen = 0
+            value = hi
+            for i, c in enumerate(counts):
+                seen += c
+                if c and seen >= target:
+                    value = min(self._value_at(i), hi)
+                    break
+            out.append(value / 1e6)
+        return out
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean and p50/p90/p99/p99.9/max in milliseconds."""
+        p50, p90, p99, p999 = self.percentiles([50, 90, 99, 99.9])
+        return {
+            "count": self.count,
+            "mean_ms": self.total_us / self.count / 1e3 if self.count else 0.0,
+            "p50_ms": p50 * 1e3,
+            "p90_ms": p90 * 1e3,
+            "p99_ms": p99 * 1e3,
+            "p999_ms": p999 * 1e3,
+            "max_ms": self.max_us / 1e3 if self.count else 0.0,
+        }
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class PipelineInstrumentation:
+    """Registry of named stage histograms shared by all pipeline threads."""
+    def __init__(self):
+        self.enabled = False
+        self._hists: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.since = time.time()
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        hist = self._hists.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self._hists.setdefault(stage, LatencyHistogram())
+        return hist
+
+    def record(self, stage: str, seconds: float):
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def start(self) -> Optional[float]:
+        """perf_counter() when enabled, else None (pass the result to `stop`)."""
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage: str, t0: Optional[float]):
+        if t0 is not None:
+            self.histogram(stage).record(time.perf_counter() - t0)
+
+    def span(self, stage: str):
+        """Context manager timing a block; a shared no-op when disabled."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(stage)
+
+    @contextmanager
+    def _span(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).record(time.perf_counter() - t0)
+
+    def timed(self, stage: str, fn):
+        """Wrap `fn` so each call is recorded under `stage` while enabled."""
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.histogram(stage).record(time.perf_counter() - t0)
+        return wrapper
+
+    def set_enabled(self, enabled: bool):
+        if enabled and not self.enabled:
+            self.since = time.time()
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            hists = list(self._hists.values())
+        for hist in hists:
+            hist.reset()
+        self.since = time.time()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Stage -> histogram summary, pipeline stages first in pipeline order."""
+        with self._lock:
+            names = list(self._hists)
+        ordered = [s for s in STAGES if s in names] + sorted(n for n in names if n not in STAGES)
+        return {name: self._hists[name].summary() for name in ordered}
+
+    def format_summary(self) -> str:
+        """Fixed-width text table of `summary()`."""
+        rows = self.summary()
+        lines = [f"{'stage':<22}{'count':>9}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'p99.9':>9}{'max':>9}  (ms)"]
+        for name, s in rows.items():
+            lines.append(f"{name:<22}{s['count']:>9}{s['mean_ms']:>9.3f}{s['p50_ms']:>9.3f}{s['p90_ms']:>9.3f}"
+                         f"{s['p99_ms']:>9.3f}{s['p999_ms']:>9.3f}{s['max_ms']:>9.3f}")
+        if not rows:
+            lines.append("(no samples" + ("" if self.enabled else "; instrumentation disabled") + ")")
+        return "\n".join(lines)
+
+
+PIPELINE = PipelineInstrumentation()
+
+
+class EpochLatencyTracker:
+    """Per (stream, system) histograms of the epoch-to-display latency components."""
+    COMPONENTS = ("caster", "queue", "render", "total")
+
+    def __init__(self):
+        self._hists: Dict[tuple, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.negative = 0  # epochs stamped before their own GNSS time (local clock behind)
+
+    def _hist(self, key: tuple) -> LatencyHistogram:
+        hist = self._hists.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._hists.setdefault(key, LatencyHistogram())
+        return hist
+
+    @staticmethod
+    def stamp(epoch_data, msg, stream: str, recv_time: float):
+        """Set the decode-side stamps on a freshly decoded epoch (processing thread)."""
+        epoch_data.stream = stream
+        epoch_data.recv_time = recv_time
+        epoch_data.decode_time = time.time()
+        epoch_data.epoch_utc = msm_epoch_unix(msg, recv_time)
+
+    def record_epoch(self, epoch_data, render_time: Optional[float] = None):
+        """
+        Record one epoch whose `epoch_utc`, `recv_time` and `decode_time`
+        stamps were set by the processing thread. `render_time` defaults to now.
+        """
+        epoch_utc = getattr(epoch_data, "epoch_utc", None)
+        recv, decoded = epoch_data.recv_time, epoch_data.decode_time
+        if epoch_utc is None or recv is None or decoded is None:
+            return
+        if render_time is None:
+            render_time = time.time()
+        epoch_data.render_time = render_time
+        stream = epoch_data.stream or "-"
+        sys_id = epoch_data.sys_id or "-"
+        if recv < epoch_utc:
+            self.negative += 1
+        for component, value in (("caster", recv - epoch_utc), ("queue", decoded - recv),
+                                 ("render", render_time - decoded), ("total", render_time - epoch_utc)):
+            self._hist((stream, sys_id, component)).record(value)
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+        self.negative = 0
+
+    def summary(self) -> Dict[tuple, Dict[str, Dict[str, float]]]:
+        """(stream, system) -> component -> histogram summary."""
+        with self._lock:
+            items = sorted(self._hists.items())
+        out: Dict[tuple, Dict[str, Dict[str, float]]] = {}
+        for (stream, sys_id, component), hist in items:
+            out.setdefault((stream, sys_id), {})[component] = hist.summary()
+        return out
+
+    def format_summary(self) -> str:
+        rows = self.summary()
+        lines = [f"{'stream':<10}{'sys':<5}{'epochs':>8}"
+                 + "".join(f"{c + ' p50/p99':>20}" for c in self.COMPONENTS) + "  (ms)"]
+        for (stream, sys_id), comps in rows.items():
+            count = comps.get("total", {}).get("count", 0)
+            cells = "".join(
+                f"{comps[c]['p50_ms']:>10.1f}/{comps[c]['p99_ms']:<9.1f}" if c in comps else f"{'-':>20}"
+                for c in self.COMPONENTS
+            )
+            lines.append(f"{stream:<10}{sys_id:<5}{count:>8}{cells}")
+        if not rows:
+            lines.append("(no epochs" + ("" if PIPELINE.enabled else "; instrumentation disabled") + ")")
+        if self.negative:
+            lines.append(f"{self.negative} epochs arrived before their GNSS time: check the local clock (NTP).")
+        return "\n".join(lines)
+
+
+EPOCH_LATENCY = EpochLatencyTracker()
+
+
+def configure_from(config_module) -> PipelineInstrumentation:
+    """Apply `config.INSTRUMENTATION` ({"ENABLED": bool}) to the global registry."""
+    cfg = getattr(config_module, "INSTRUMENTATION", {}) or {}
+    PIPELINE.set_enabled(bool(cfg.get("ENABLED", False)))
+    return PIPELINE
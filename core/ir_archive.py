@@ -0,0 +1,311 @@
+"""
+Append-only on-disk archive of GNSS-IR samples.
+
+`IrArchiveWriter` receives the blocks appended to a `GnssIrStore` and writes
+them on its own thread, batched, into one directory per GPS day
+(`<dir>/ir_<YYYYmmdd>/`). Every column is a raw little-endian file
+(`<column>.bin`, dtype in `ARCHIVE_COLUMNS`), so a day is read back by
+memory-mapping the files; `index.bin` holds one `INDEX_DTYPE` record
+(first gps_time, row) per written batch:
+
+    gps_time     f8  absolute GPS seconds
+    azimuth      f4  deg
+    elevation    f4  deg
+    snr          f4  dB-Hz
+    pseudorange  f8  m
+    phase        f8  cycles
+    prn          S4  'G01', ...
+    signal_id    S4  '1C', ...
+    zone_mask    u4  reflection zone bits (see core.reflection_zones)
+
+`IrArchive.query` picks the day directories by name, bisects the small index
+and then the mapped gps_time column, and returns slices of the mapped arrays,
+so a range over weeks touches only the pages it returns. Rows are in arrival
+order, which may lag GPS time order by up to `ARRIVAL_DISORDER` seconds
+(several streams/constellations): the bisection is widened by that margin and
+the rows near the ends are masked. Columns are written
+one after another, so after a crash the shortest column bounds the readable
+rows.
+"""
+import glob
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.gnss_time import ARRIVAL_DISORDER, SECONDS_PER_DAY, SECONDS_PER_WEEK, gps_seconds_now, resolve_periodic
+
+ARCHIVE_COLUMNS = {
+    "gps_time": np.dtype("<f8"),
+    "azimuth": np.dtype("<f4"),
+    "elevation": np.dtype("<f4"),
+    "snr": np.dtype("<f4"),
+    "pseudorange": np.dtype("<f8"),
+    "phase": np.dtype("<f8"),
+    "prn": np.dtype("S4"),
+    "signal_id": np.dtype("S4"),
+    "zone_mask": np.dtype("<u4"),
+}
+INDEX_DTYPE = np.dtype([("gps_time", "<f8"), ("row", "<u8")])
+_GPS_EPOCH = datetime(1980, 1, 6)
+
+
+def day_name(gps_seconds: float) -> str:
+    """Directory name of the GPS day containing `gps_seconds`."""
+    return "ir_" + (_GPS_EPOCH + timedelta(days=int(gps_seconds // SECONDS_PER_DAY))).strftime("%Y%m%d")
+
+
+def day_start(name: str) -> float:
+    """GPS seconds at the start of the day directory `name`."""
+    return (datetime.strptime(name[3:], "%Y%m%d") - _GPS_EPOCH).days * float(SECONDS_PER_DAY)
+
+
+class IrArchiveWriter(threading.Thread):
+    """
+    Background writer for the GNSS-IR archive.
+
+    `submit` only enqueues (safe to call from `GnssIrStore` under its lock);
+    decoding, day rotation and file writes happen on this thread, which
+    flushes every `flush_interval` seconds or `batch_rows` rows. Samples carry
+    time of week; it is resolved to absolute GPS seconds against the previous
+    sample, or against `reference()` (default: now) for the first one.
+    Samples must be GPST; rows more than `ARRIVAL_DISORDER` seconds older
+    than the newest one written are counted in `late_rows` (range queries
+    may miss them).
+    """
+    def __init__(self, archive_dir: str, flush_interval: float = 5.0, batch_rows: int = 50000,
+                 max_pending: int = 10000, reference: Callable[[], float] = gps_seconds_now):
+        super().__init__(name="IrArchiveWriter")
+        self.daemon = True
+        self.archive_dir = archive_dir
+        self.flush_interval = flush_interval
+        self.batch_rows = batch_rows
+        self.reference = reference
+        self.running = True
+        self.dropped = 0
+        self.rows_written = 0
+        self.late_rows = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending: List[Dict[str, np.ndarray]] = []
+        self._pending_rows = 0
+        self._last_gps: Optional[float] = None
+        self._day: Optional[str] = None
+        self._files: Dict[str, object] = {}
+        self._index_file = None
+        self._rows = 0
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def submit(self, values: Dict[str, object], prn_values: List[str], sig_values: List[str]):
+        """
+        Queue one block as appended to the store: `values` maps store column
+        names to arrays/lists (tow may be a scalar), PRN/signal as codes into
+        `prn_values`/`sig_values` (append-only tables, so no copy is needed).
+        """
+        try:
+            self._queue.put_nowait((values, prn_values, sig_values))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        last_flush = time.monotonic()
+        while self.running or not self._queue.empty():
+            try:
+                self._add(*self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                print(f"[{self.name}] Encode error: {e}")
+
+            now = time.monotonic()
+            if self._pending_rows >= self.batch_rows or (self._pending and now - last_flush >= self.flush_interval):
+                self._write_pending()
+                last_flush = now
+        self._write_pending()
+        self._close_files()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the writer after writing everything queued so far."""
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def _add(self, values, prn_values, sig_values):
+        n = len(values["snr"])
+        if not n:
+            return
+        tow = float(np.asarray(values["tow"]).flat[0])
+        ref = self._last_gps if self._last_gps is not None else self.reference()
+        gps = resolve_periodic(tow, SECONDS_PER_WEEK, ref)
+        if self._last_gps is not None and gps < self._last_gps - ARRIVAL_DISORDER:
+            self.late_rows += n
+        self._last_gps = gps if self._last_gps is None else max(gps, self._last_gps)
+        prn_table = np.asarray(prn_values, dtype="S4")
+        sig_table = np.asarray(sig_values, dtype="S4")
+        block = {"gps_time": np.full(n, gps, dtype=ARCHIVE_COLUMNS["gps_time"])}
+        for name in ("azimuth", "elevation", "snr", "pseudorange", "phase", "zone_mask"):
+            block[name] = np.broadcast_to(np.asarray(values[name], dtype=ARCHIVE_COLUMNS[name]), (n,))
+        block["prn"] = prn_table[np.asarray(values["prn_code"], dtype=np.intp)]
+        block["signal_id"] = sig_table[np.asarray(values["sig_code"], dtype=np.intp)]
+        self._pending.append(block)
+        self._pending_rows += n
+
+    def _write_pending(self):
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+        if not pending:
+            return
+        # Split the batch at GPS day boundaries (blocks are single epochs).
+        days = [int(b["gps_time"][0] // SECONDS_PER_DAY) for b in pending]
+        start = 0
+        for i in range(1, len(pending) + 1):
+            if i == len(pending) or days[i] != days[start]:
+                try:
+                    self._write_day(pending[start:i])
+                except OSError as e:
+                    self.dropped += sum(len(b["snr"]) for b in pending[start:i])
+                    print(f"[{self.name}] Write error: {e}")
+                start = i
+
+    def _write_day(self, blocks: List[Dict[str, np.ndarray]]):
+        day = day_name(blocks[0]["gps_time"][0])
+        if day != self._day:
+            self._open_day(day)
+        rows = sum(len(b["snr"]) for b in blocks)
+        self._index_file.write(np.array([(blocks[0]["gps_time"][0], self._rows)], dtype=INDEX_DTYPE).tobytes())
+        for name, f in self._files.items():
+            f.write(np.concatenate([b[name] for b in blocks]).tobytes())
+            f.flush()
+        self._index_file.flush()
+        self._rows += rows
+        self.rows_written += rows
+
+    def _open_day(self, day: str):
+        self._close_files()
+        path = os.path.join(self.archive_dir, day)
+        os.makedirs(path, exist_ok=True)
+        # Append so a restart on the same day continues the same files.
+        self._files = {name: open(os.path.join(path, name + ".bin"), "ab") for name in ARCHIVE_COLUMNS}
+        self._index_file = open(os.path.join(path, "index.bin"), "ab")
+        # A crash can leave columns of different length: cut them back to the shortest
+        self._rows = min(_rows_on_disk(path, name) for name in ARCHIVE_COLUMNS)
+        for name, f in self._files.items():
+            f.truncate(self._rows * ARCHIVE_COLUMNS[name].itemsize)
+        self._day = day
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        if self._index_file is not None:
+            self._index_file.close()
+        self._files, self._index_file, self._day = {}, None, None
+
+
+def _rows_on_disk(day_path: str, column: str) -> int:
+    path = os.path.join(day_path, column + ".bin")
+    return os.path.getsize(path) // ARCHIVE_COLUMNS[column].itemsize if os.path.exists(path) else 0
+
+
+class IrArchive:
+    """Read side: memory-mapped range queries over the day directories."""
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+
+    def days(self) -> List[str]:
+        return sorted(os.path.basename(p) for p in glob.glob(os.path.join(self.archive_dir, "ir_????????")))
+
+    def open_day(self, day: str) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Mapped columns (equal length) and time index of one day."""
+        path = os.path.join(self.archive_dir, day)
+        n = min(_rows_on_disk(path, name) for name in ARCHIVE_COLUMNS)
+        columns = {name: (np.memmap(os.path.join(path, name + ".bin"), dtype=dt, mode="r", shape=(n,))
+                          if n else np.zeros(0, dtype=dt))
+                   for name, dt in ARCHIVE_COLUMNS.items()}
+        index_path = os.path.join(path, "index.bin")
+        k = os.path.getsize(index_path) // INDEX_DTYPE.itemsize if os.path.exists(index_path) else 0
+        index = np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", shape=(k,)) if k else np.zeros(0, INDEX_DTYPE)
+        return columns, index
+
+    @staticmethod
+    def _row_range(columns, index, start_gps: Optional[float], end_gps: Optional[float]) -> Tuple[int, int]:
+        """
+        Rows that can lie inside [start_gps, end_gps]: bisect the batch index,
+        then the gps_time column within it, both widened by `ARRIVAL_DISORDER`.
+        """
+        t = columns["gps_time"]
+        if start_gps is not None:
+            start_gps -= ARRIVAL_DISORDER
+        if end_gps is not None:
+            end_gps += ARRIVAL_DISORDER
+        n = len(t)
+        lo, hi = 0, n
+        if start_gps is not None:
+            b = int(np.searchsorted(index["gps_time"], start_gps, "right")) - 1 if len(index) else -1
+            first = min(int(index["row"][b]), n) if b >= 0 else 0
+            lo = first + int(np.searchsorted(t[first:], start_gps, "left"))
+        if end_gps is not None:
+            b = int(np.searchsorted(index["gps_time"], end_gps, "right")) if len(index) else len(index)
+            last = min(int(index["row"][b]), n) if b < len(index) else n
+            hi = lo + int(np.searchsorted(t[lo:last], end_gps, "right")) if last > lo else lo
+        return lo, max(lo, hi)
+
+    def iter_ranges(self, start_gps: Optional[float] = None,
+                    end_gps: Optional[float] = None) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+        """
+        Yield `(day, columns)` per day, the columns being slices of the mapped
+        files (copies of the selected rows when out-of-order rows at the ends
+        of the range fall outside it).
+        """
+        for day in self.days():
+            t0 = day_start(day)
+            if (end_gps is not None and t0 > end_gps) or (start_gps is not None and t0 + SECONDS_PER_DAY <= start_gps):
+                continue
+            columns, index = self.open_day(day)
+            lo, hi = self._row_range(columns, index, start_gps, end_gps)
+            if hi <= lo:
+                continue
+            cols = {name: col[lo:hi] for name, col in columns.items()}
+            t = cols["gps_time"]
+            inside = np.ones(len(t), dtype=bool)
+            if start_gps is not None:
+                inside &= t >= start_gps
+            if end_gps is not None:
+                inside &= t <= end_gps
+            if not inside.all():
+                if not inside.any():
+                    continue
+                cols = {name: col[inside] for name, col in cols.items()}
+            yield day, cols
+
+    def query(
+        self,
+        start_gps: Optional[float] = None,
+        end_gps: Optional[float] = None,
+        prn: Optional[str] = None,
+        signal_id: Optional[str] = None,
+        zone_bit: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Columns of the archived samples inside [start_gps, end_gps] (absolute
+        GPS seconds, inclusive), optionally for one PRN / signal / zone bit.
+        A range within one day without filters returns mapped slices; otherwise
+        only the selected rows are copied.
+        """
+        parts = []
+        for _, cols in self.iter_ranges(start_gps, end_gps):
+            mask = None
+            for value, name in ((prn, "prn"), (signal_id, "signal_id")):
+                if value is not None:
+                    m = cols[name] == value.encode()
+                    mask = m if mask is None else mask & m
+            if zone_bit is not None:
+                m = (cols["zone_mask"] & np.uint32(1 << zone_bit)) != 0
+                mask = m if mask is None else mask & m
+            parts.append(cols if mask is None else {name: c[mask] for name, c in cols.items()})
+        if not parts:
+            return {name: np.zeros(0, dtype=dt) for name, dt in ARCHIVE_COLUMNS.items()}
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([p[name] for p in parts]) for name in ARCHIVE_COLUMNS}
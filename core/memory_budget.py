@@ -0,0 +1,140 @@
+"""
+Process-wide memory budget with coordinated, priority-ordered eviction.
+
+Stores register a cheap size estimate and a `shrink(fraction)` action; the
+budget compares the process RSS (or, where RSS is unavailable, the sum of the
+registered estimates) with the limit on every `check()`. Above the limit it
+asks stores to shrink, lowest priority value first, until the estimated
+excess down to `low_water * limit` has been released:
+
+    budget = MemoryBudget(1500 * 2**20)
+    budget.register("log", log_size, trim_log, priority=10)
+    budget.register("ir_store", store.memory_bytes, store.shrink, priority=30)
+    ...
+    budget.check()   # periodically, on the thread that owns the stores
+
+Shrinking lowers the store's own retention limit (maxlen, KEEP_SECONDS,
+max_log_lines) as well as discarding data, so stores do not simply grow back
+to the same size. Freed memory is not always returned to the OS at once, so
+after an eviction further evictions wait `cooldown` seconds.
+
+Configured by `config.MEMORY_BUDGET = {"LIMIT_MB": 1500, "LOW_WATER": 0.85,
+"CHECK_INTERVAL": 10, "COOLDOWN": 60}`.
+"""
+import time
+from typing import Callable, Dict, List, Optional
+
+from core.memory_report import process_rss
+
+
+class _Registrant:
+    __slots__ = ("name", "size", "shrink", "priority", "evictions")
+
+    def __init__(self, name, size, shrink, priority):
+        self.name = name
+        self.size = size
+        self.shrink = shrink
+        self.priority = priority
+        self.evictions = 0
+
+
+class MemoryBudget:
+    def __init__(self, limit_bytes: int, low_water: float = 0.85, cooldown: float = 60.0,
+                 log: Optional[Callable[[str], None]] = None):
+        self.limit_bytes = int(limit_bytes)
+        self.low_water = low_water
+        self.cooldown = cooldown
+        self.log = log or print
+        self.evictions = 0
+        self.last_usage = 0
+        self.last_eviction = 0.0
+        self._stores: Dict[str, _Registrant] = {}
+        self._warned = False
+
+    def register(self, name: str, size: Callable[[], int], shrink: Callable[[float], object], priority: int = 50):
+        """
+        `size()` returns the store's estimated bytes; `shrink(fraction)` should
+        release about that fraction of it. Lower `priority` is evicted first.
+        """
+        self._stores[name] = _Registrant(name, size, shrink, priority)
+
+    def unregister(self, name: str):
+        self._stores.pop(name, None)
+
+    def sizes(self) -> Dict[str, int]:
+        out = {}
+        for name, r in list(self._stores.items()):
+            try:
+                out[name] = int(r.size())
+            except Exception:
+                out[name] = 0
+        return out
+
+    def usage(self, sizes: Optional[Dict[str, int]] = None) -> int:
+        rss = process_rss()
+        if rss is not None:
+            return rss
+        return sum((sizes if sizes is not None else self.sizes()).values())
+
+    def check(self) -> List[str]:
+        """Evict if over budget; returns the names of the stores that were shrunk."""
+        sizes = self.sizes()
+        usage = self.last_usage = self.usage(sizes)
+        if usage <= self.limit_bytes:
+            self._warned = False
+            return []
+        now = time.monotonic()
+        if self.last_eviction and now - self.last_eviction < self.cooldown:
+            return []
+
+        excess = usage - self.low_water * self.limit_bytes
+        shrunk = []
+        for r in sorted(self._stores.values(), key=lambda r: r.priority):
+            if excess <= 0:
+                break
+            size = sizes.get(r.name, 0)
+            if size <= 0:
+                continue
+            fraction = min(1.0, excess / size)
+            try:
+                r.shrink(fraction)
+            except Exception as e:
+                self.log(f"[MemoryBudget] {r.name}: shrink failed: {e}")
+                continue
+            try:
+                freed = max(size - int(r.size()), 0)
+            except Exception:
+                freed = int(size * fraction)
+            if freed <= 0:
+                continue  # already at its floor
+            r.evictions += 1
+            excess -= freed
+            shrunk.append(r.name)
+            self.log(f"[MemoryBudget] {r.name}: released ~{freed / 2**20:.1f} MB ({fraction:.0%} requested)")
+
+        if shrunk:
+            self.evictions += 1
+            self.last_eviction = now
+        elif not self._warned:
+            self.log(f"[MemoryBudget] {usage / 2**20:.0f} MB over the {self.limit_bytes / 2**20:.0f} MB budget "
+                     f"and no registered store can shrink further")
+            self._warned = True
+        return shrunk
+
+    def format_status(self) -> str:
+        sizes = self.sizes()
+        lines = [f"budget {self.limit_bytes / 2**20:.0f} MB, usage {self.usage(sizes) / 2**20:.1f} MB, "
+                 f"{self.evictions} eviction rounds"]
+        for r in sorted(self._stores.values(), key=lambda r: r.priority):
+            lines.append(f"  [{r.priority:>3}] {r.name:<20}{sizes.get(r.name, 0) / 2**20:>9.1f} MB"
+                         f"  shrunk {r.evictions}x")
+        return "\n".join(lines)
+
+
+def from_config(config_module, log: Optional[Callable[[str], None]] = None) -> Optional[MemoryBudget]:
+    """A `MemoryBudget` from `config.MEMORY_BUDGET`, or None when no LIMIT_MB is set."""
+    cfg = getattr(config_module, "MEMORY_BUDGET", {}) or {}
+    if not cfg.get("LIMIT_MB"):
+        return None
+    return MemoryBudget(int(float(cfg["LIMIT_MB"]) * 2**20), low_water=float(cfg.get("LOW_WATER", 0.85)),
+                        cooldown=float(cfg.get("COOLDOWN", 60.0)), log=log)
@@ -0,0 +1,298 @@
+"""
+Memory accounting for long-running sessions.
+
+`MEMORY` is a registry of named structures (sat_history, GnssIrStore,
+merged_satellites, ephemeris cache, ...) measured on demand by a deep
+`sys.getsizeof` walk; sequences longer than `sample` items are estimated from
+an evenly spaced sample so a report stays cheap even for large stores.
+
+`TRACEMALLOC` takes tracemalloc snapshots on demand and diffs the latest one
+against the previous or the first (baseline) snapshot, so growth over hours or
+weeks can be traced to the allocating source lines. Snapshots can be dumped
+and compared offline:
+
+    python -m core.memory_report diff old.snap new.snap [--traceback] [--limit 20]
+
+Configured by `config.MEMORY` ({"TRACEMALLOC": bool, "FRAMES": 25, "DIR": ...,
+"LOG_INTERVAL": s}); tracing started at launch sees every allocation, tracing
+started later only what is allocated afterwards.
+"""
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.profiler import default_output_dir
+
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType, types.CodeType, types.FrameType)
+
+
+def deep_sizeof(obj, sample: int = 256, seen: Optional[set] = None) -> Tuple[int, int]:
+    """
+    (bytes, objects) reachable from `obj`, each object counted once.
+
+    Lists, tuples, deques and sets longer than `sample` are extrapolated from
+    `sample` evenly spaced items. Classes, modules and functions are shared
+    and not counted; numpy arrays count their data buffer.
+    """
+    if seen is None:
+        seen = set()
+    total_bytes = 0
+    total_objs = 0
+    stack = [(obj, 1.0)]
+    while stack:
+        o, weight = stack.pop()
+        if id(o) in seen or isinstance(o, _SHARED_TYPES):
+            continue
+        seen.add(id(o))
+        size = sys.getsizeof(o, 0)
+        if isinstance(o, np.ndarray) and o.base is None:
+            size = max(size, o.nbytes)
+        total_bytes += size * weight
+        total_objs += weight
+
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, complex, np.ndarray)) or o is None:
+            continue
+        if isinstance(o, dict):
+            children = [x for kv in list(o.items()) for x in kv]
+        elif isinstance(o, (list, tuple, deque, set, frozenset)):
+            children = list(o)  # C-level copy; safe while other threads append
+        else:
+            children = []
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                children.append(d)
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    children.append(getattr(o, slot))
+
+        if len(children) > sample:
+            step = len(children) / sample
+            scale = weight * len(children) / sample
+            children = [children[int(i * step)] for i in range(sample)]
+        else:
+            scale = weight
+        stack.extend((c, scale) for c in children)
+    return int(total_bytes), int(total_objs)
+
+
+def process_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, if the platform exposes it."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _fmt_bytes(n: Optional[float]) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class MemoryReport:
+    """
+    Named structures measured on demand.
+
+    `register(name, getter, count=None)`: `getter()` returns the object to walk
+    (or None to skip); `count(obj)` gives the item count shown in the report
+    (default `len`). Sources that cannot be walked (Qt C++ objects) register
+    `sizer` instead, returning (items, bytes or None).
+    """
+    def __init__(self):
+        self._sources: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, getter: Callable[[], object],
+                 count: Optional[Callable[[object], int]] = None, sample: int = 256):
+        with self._lock:
+            self._sources[name] = ("walk", getter, count or len, sample)
+
+    def register_sizer(self, name: str, sizer: Callable[[], Tuple[int, Optional[int]]]):
+        with self._lock:
+            self._sources[name] = ("sizer", sizer)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._sources.pop(name, None)
+
+    def collect(self) -> List[Dict[str, object]]:
+        """One row per source: name, items, objects, bytes (and error when measuring failed)."""
+        with self._lock:
+            sources = list(self._sources.items())
+        rows = []
+        for name, source in sources:
+            row = {"name": name, "items": None, "objects": None, "bytes": None}
+            try:
+                if source[0] == "sizer":
+                    row["items"], row["bytes"] = source[1]()
+                else:
+                    _, getter, count, sample = source
+                    obj = getter()
+                    if obj is None:
+                        continue
+                    row["bytes"], row["objects"] = deep_sizeof(obj, sample)
+                    row["items"] = count(obj)
+            except Exception as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+            rows.append(row)
+        return rows
+
+    def format_report(self) -> str:
+        t0 = time.perf_counter()
+        rows = self.collect()
+        elapsed = time.perf_counter() - t0
+        lines = [f"{'structure':<28}{'items':>10}{'objects':>12}{'size':>12}"]
+        for r in sorted(rows, key=lambda r: -(r["bytes"] or 0)):
+            items = "-" if r["items"] is None else f"{r['items']:,}"
+            objs = "-" if r["objects"] is None else f"{r['objects']:,}"
+            lines.append(f"{r['name']:<28}{items:>10}{objs:>12}{_fmt_bytes(r['bytes']):>12}"
+                         + (f"  ({r['error']})" if "error" in r else ""))
+        accounted = sum(r["bytes"] or 0 for r in rows)
+        lines.append(f"{'accounted':<50}{_fmt_bytes(accounted):>12}")
+        lines.append(f"{'process RSS':<50}{_fmt_bytes(process_rss()):>12}")
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"{'tracemalloc current / peak':<38}{_fmt_bytes(current):>12}{_fmt_bytes(peak):>12}")
+        lines.append(f"gc objects: {len(gc.get_objects()):,}  (report took {elapsed * 1e3:.0f} ms)")
+        return "\n".join(lines)
+
+
+MEMORY = MemoryReport()
+
+
+class SnapshotTracker:
+    """tracemalloc snapshots on demand: the first one is kept as baseline plus the last `keep`."""
+    _FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, keep: int = 4):
+        self.keep = keep
+        self.baseline: Optional[Tuple[float, tracemalloc.Snapshot]] = None
+        self.snapshots: deque = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 25):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """Stop tracing; tracemalloc frees its traces, snapshots already taken stay usable."""
+        tracemalloc.stop()
+
+    def take(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start() first")
+        snap = tracemalloc.take_snapshot().filter_traces(self._FILTERS)
+        with self._lock:
+            if self.baseline is None:
+                self.baseline = (time.time(), snap)
+            self.snapshots.append((time.time(), snap))
+        return snap
+
+    def reset(self):
+        with self._lock:
+            self.baseline = None
+            self.snapshots.clear()
+
+    def diff(self, against: str = "previous", key_type: str = "lineno", limit: int = 15) -> str:
+        """Top allocation growth of the latest snapshot vs the previous one or the baseline."""
+        with self._lock:
+            if not self.snapshots:
+                return "(no snapshots)"
+            t_new, new = self.snapshots[-1]
+            if against == "baseline":
+                ref = self.baseline
+            else:
+                ref = self.snapshots[-2] if len(self.snapshots) > 1 else None
+        if ref is None or ref[1] is new:
+            return f"(need a second snapshot to diff against the {against})"
+        t_old, old = ref
+        header = f"tracemalloc diff vs {against} ({t_new - t_old:.0f} s apart, by {key_type})"
+        return header + "\n" + format_diff(new.compare_to(old, key_type), limit)
+
+    def dump_latest(self, out_dir: Optional[str] = None) -> str:
+        """Write the latest snapshot to `<out_dir>/memory_<UTC>.snap` for offline diffs."""
+        with self._lock:
+            if not self.snapshots:
+                raise RuntimeError("no snapshot taken")
+            t, snap = self.snapshots[-1]
+        out_dir = out_dir or default_output_dir()
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(t, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(out_dir, f"memory_{stamp}.snap")
+        snap.dump(path)
+        return path
+
+
+def format_diff(stats: List[tracemalloc.StatisticDiff], limit: int = 15) -> str:
+    lines = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size_diff / 1024:+10.1f} KB {stat.count_diff:+9d} blocks  "
+                     f"{_fmt_bytes(stat.size):>10}  {frame.filename}:{frame.lineno}")
+        if len(stat.traceback) > 1:
+            lines.extend("        " + line for line in stat.traceback.format()[1:])
+    total = sum(s.size_diff for s in stats)
+    lines.append(f"total {total / 1024:+.1f} KB over {len(stats)} entries")
+    return "\n".join(lines)
+
+
+TRACEMALLOC = SnapshotTracker()
+
+
+def configure_from(config_module):
+    """Start tracemalloc at launch if `config.MEMORY["TRACEMALLOC"]` is set."""
+    cfg = getattr(config_module, "MEMORY", {}) or {}
+    if cfg.get("TRACEMALLOC"):
+        TRACEMALLOC.start(int(cfg.get("FRAMES", 25)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dumped tracemalloc snapshots")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_diff = sub.add_parser("diff", help="allocation growth from OLD to NEW")
+    p_diff.add_argument("old")
+    p_diff.add_argument("new")
+    p_diff.add_argument("--traceback", action="store_true", help="group by full traceback instead of line")
+    p_diff.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    old = tracemalloc.Snapshot.load(args.old)
+    new = tracemalloc.Snapshot.load(args.new)
+    key_type = "traceback" if args.traceback else "lineno"
+    print(format_diff(new.compare_to(old, key_type), args.limit))
+
+
+if __name__ == "__main__":
+    main()
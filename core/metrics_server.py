@@ -0,0 +1,311 @@
+"""
+Local metrics endpoint in the Prometheus text exposition format.
+
+    GET http://127.0.0.1:<PORT>/metrics
+
+Enabled by `config.METRICS = {"PORT": 9108}` (optional "HOST", default
+127.0.0.1) in both headless `main.py` and the GUI. Nothing is computed on the
+pipeline threads beyond a few integer increments in `StreamStats`; gauges
+(ring buffer occupancy, ephemeris age, satellites, GnssIrStore size) are read
+from the live objects when the endpoint is scraped.
+
+Exposed families:
+
+    gnss_messages_total{stream,type}            RTCM messages decoded
+    gnss_stream_bytes_total{stream}             raw RTCM bytes received
+    gnss_stream_connected{stream}               1 while the caster connection is up
+    gnss_stream_reconnects_total{stream}        successful connects after the first
+    gnss_epochs_total{stream}                   MSM epochs produced
+    gnss_decode_seconds{stream}                 summary (_sum/_count) of process_message time
+    gnss_ring_buffer_items{stream}              frames waiting in the RingBuffer
+    gnss_ring_buffer_capacity{stream}
+    gnss_ring_buffer_dropped_total{stream}      frames discarded because the buffer was full
+    gnss_output_pending / gnss_output_dropped_total   headless SinkWriter queue
+    gnss_ephemeris_count{system}
+    gnss_ephemeris_age_seconds{system,stat}     min / max age of the cached ephemerides
+    gnss_satellites_tracked{system}
+    gnss_ir_store_samples / gnss_ir_store_bytes
+    gnss_memory_budget_bytes / gnss_memory_usage_bytes / gnss_memory_evictions_total
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional
+
+from core.gnss_time import BDT_OFFSET, LEAP_SECONDS, SECONDS_PER_WEEK, gps_seconds_now
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name, type ("counter" / "gauge" / "summary"), help text, [(labels dict, value), ...];
+# a "__suffix__" label is appended to the sample name (summary _sum / _count).
+Metric = namedtuple("Metric", "name type help samples")
+
+
+class StreamStats:
+    """
+    Cumulative per-stream counters, updated by the stream's I/O and processing
+    threads (each field has a single writer) and read by the metrics scrape.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.bytes = 0
+        self.connects = 0
+        self.connected = False
+        self.messages: Dict[str, int] = {}
+        self.epochs = 0
+        self.decode_seconds = 0.0
+        self.decode_count = 0
+        self.sat_last_seen: Dict[str, float] = {}
+
+    def on_connect(self):
+        self.connects += 1
+        self.connected = True
+
+    def on_disconnect(self):
+        self.connected = False
+
+    def on_frame(self, raw: bytes):
+        self.bytes += len(raw)
+
+    def on_message(self, msg_id: str, decode_seconds: float):
+        self.messages[msg_id] = self.messages.get(msg_id, 0) + 1
+        self.decode_seconds += decode_seconds
+        self.decode_count += 1
+
+    def on_epoch(self, epoch_data, now: Optional[float] = None):
+        self.epochs += 1
+        now = time.time() if now is None else now
+        for sat_key in epoch_data.satellites:
+            self.sat_last_seen[sat_key] = now
+
+    def satellites_tracked(self, max_age: float = 10.0) -> Dict[str, int]:
+        """Satellites seen within `max_age` seconds, per system."""
+        cutoff = time.time() - max_age
+        counts: Dict[str, int] = {}
+        for sat_key, seen in list(self.sat_last_seen.items()):
+            if seen >= cutoff:
+                counts[sat_key[0]] = counts.get(sat_key[0], 0) + 1
+        return counts
+
+
+class MetricsRegistry:
+    """Named collectors called at scrape time; re-adding a name replaces it."""
+    def __init__(self):
+        self._collectors: Dict[str, Callable[[], Iterable[Metric]]] = {}
+        self._lock = threading.Lock()
+
+    def set_collector(self, name: str, collector: Callable[[], Iterable[Metric]]):
+        with self._lock:
+            self._collectors[name] = collector
+
+    def remove_collector(self, name: str):
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def collect(self) -> List[Metric]:
+        with self._lock:
+            collectors = list(self._collectors.items())
+        metrics: List[Metric] = []
+        for name, collector in collectors:
+            try:
+                metrics.extend(collector())
+            except Exception as e:
+                metrics.append(Metric("gnss_metrics_collector_errors", "gauge",
+                                      "Collector raised during this scrape",
+                                      [({"collector": name, "error": type(e).__name__}, 1)]))
+        return metrics
+
+    def render(self) -> str:
+        """All collected metrics as Prometheus text, samples of one family grouped together."""
+        families: Dict[str, Metric] = {}
+        for m in self.collect():
+            if m.name in families:
+                families[m.name].samples.extend(m.samples)
+            else:
+                families[m.name] = Metric(m.name, m.type, m.help, list(m.samples))
+        lines = []
+        for m in families.values():
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            for labels, value in m.samples:
+                suffix = labels.get("__suffix__", "")
+                if suffix:
+                    labels = {k: v for k, v in labels.items() if k != "__suffix__"}
+                lines.append(f"{m.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if value.is_integer() and abs(value) < 2 ** 53 else repr(value)
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ---------------------------------------------------------------------------
+# Collectors
+# ---------------------------------------------------------------------------
+def stream_metrics(stats_list: Iterable[StreamStats]) -> List[Metric]:
+    stats_list = list(stats_list)
+    msgs, bytes_, connected, reconnects, epochs, decode = [], [], [], [], [], []
+    for s in stats_list:
+        lbl = {"stream": s.name}
+        for msg_id, n in sorted(dict(s.messages).items()):
+            msgs.append(({"stream": s.name, "type": msg_id}, n))
+        bytes_.append((lbl, s.bytes))
+        connected.append((lbl, 1 if s.connected else 0))
+        reconnects.append((lbl, max(s.connects - 1, 0)))
+        epochs.append((lbl, s.epochs))
+        decode.append(({**lbl, "__suffix__": "_sum"}, s.decode_seconds))
+        decode.append(({**lbl, "__suffix__": "_count"}, s.decode_count))
+    return [
+        Metric("gnss_messages_total", "counter", "RTCM messages decoded, by message type", msgs),
+        Metric("gnss_stream_bytes_total", "counter", "Raw RTCM bytes received", bytes_),
+        Metric("gnss_stream_connected", "gauge", "1 while the caster connection is up", connected),
+        Metric("gnss_stream_reconnects_total", "counter", "Successful connects after the first", reconnects),
+        Metric("gnss_epochs_total", "counter", "MSM epochs produced", epochs),
+        Metric("gnss_decode_seconds", "summary", "RTCMHandler.process_message time", decode),
+    ]
+
+
+def ring_buffer_metrics(ring_buffers: Dict[str, object]) -> List[Metric]:
+    items, capacity, dropped = [], [], []
+    for name, rb in list(ring_buffers.items()):
+        lbl = {"stream": name}
+        items.append((lbl, rb.qsize()))
+        capacity.append((lbl, rb.maxsize))
+        dropped.append((lbl, rb.dropped))
+    return [
+        Metric("gnss_ring_buffer_items", "gauge", "Frames waiting in the ring buffer", items),
+        Metric("gnss_ring_buffer_capacity", "gauge", "Ring buffer size", capacity),
+        Metric("gnss_ring_buffer_dropped_total", "counter", "Frames dropped because the ring buffer was full", dropped),
+    ]
+
+
+def writer_metrics(writer) -> List[Metric]:
+    return [
+        Metric("gnss_output_pending", "gauge", "Epochs queued for the output sinks", [({}, writer._queue.qsize())]),
+        Metric("gnss_output_dropped_total", "counter", "Epochs dropped because the output queue was full",
+               [({}, writer.dropped)]),
+    ]
+
+
+def _ephemeris_age(sys_id: str, eph: dict, gps_now: float) -> Optional[float]:
+    """Seconds since the ephemeris reference time (Toe, or Tb for GLONASS)."""
+    if sys_id == "R":
+        ref, now = eph.get("Tb"), gps_now - LEAP_SECONDS  # Tb is UTC seconds of the GPS week
+    else:
+        ref, now = eph.get("Toe"), gps_now - (BDT_OFFSET if sys_id == "C" else 0)
+    if ref is None:
+        return None
+    age = (now - ref) % SECONDS_PER_WEEK
+    return age - SECONDS_PER_WEEK if age > SECONDS_PER_WEEK / 2 else age
+
+
+def ephemeris_metrics(handler) -> List[Metric]:
+    with handler.lock:
+        cache = dict(handler.ephemeris_cache)
+    gps_now = gps_seconds_now()
+    counts: Dict[str, int] = {}
+    ages: Dict[str, List[float]] = {}
+    for key, eph in cache.items():
+        sys_id = key[0]
+        counts[sys_id] = counts.get(sys_id, 0) + 1
+        age = _ephemeris_age(sys_id, eph, gps_now)
+        if age is not None:
+            ages.setdefault(sys_id, []).append(age)
+    age_samples = []
+    for sys_id, values in sorted(ages.items()):
+        age_samples.append(({"system": sys_id, "stat": "min"}, min(values)))
+        age_samples.append(({"system": sys_id, "stat": "max"}, max(values)))
+    return [
+        Metric("gnss_ephemeris_count", "gauge", "Broadcast ephemerides in the cache",
+               [({"system": k}, v) for k, v in sorted(counts.items())]),
+        Metric("gnss_ephemeris_age_seconds", "gauge", "Age of the cached ephemerides relative to their reference time",
+               age_samples),
+    ]
+
+
+def satellite_metrics(counts: Dict[str, int]) -> List[Metric]:
+    return [Metric("gnss_satellites_tracked", "gauge", "Satellites with recent observations",
+                   [({"system": k}, v) for k, v in sorted(counts.items())])]
+
+
+def ir_store_metrics(store) -> List[Metric]:
+    return [
+        Metric("gnss_ir_store_samples", "gauge", "Samples held by the GNSS-IR store", [({}, store.size())]),
+        Metric("gnss_ir_store_bytes", "gauge", "Estimated memory held by the GNSS-IR store",
+               [({}, store.memory_bytes())]),
+    ]
+
+
+def memory_budget_metrics(budget) -> List[Metric]:
+    return [
+        Metric("gnss_memory_budget_bytes", "gauge", "Configured memory budget", [({}, budget.limit_bytes)]),
+        Metric("gnss_memory_usage_bytes", "gauge", "Memory usage at the last budget check", [({}, budget.last_usage)]),
+        Metric("gnss_memory_evictions_total", "counter", "Budget eviction rounds", [({}, budget.evictions)]),
+    ]
+
+
+# ---------------------------------------------------------------------------
+# HTTP endpoint
+# ---------------------------------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the console
+
+
+class MetricsServer:
+    """Serves `registry` on http://host:port/metrics from a daemon thread."""
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_from(config_module) -> Optional[MetricsServer]:
+    """Start the endpoint if `config.METRICS` sets a PORT; None otherwise."""
+    cfg = getattr(config_module, "METRICS", {}) or {}
+    if not cfg.get("PORT"):
+        return None
+    return MetricsServer(int(cfg["PORT"]), cfg.get("HOST", "127.0.0.1")).start()
@@ -0,0 +1,283 @@
+"""
+Local mock NTRIP caster serving synthetic RTCM 3 traffic.
+
+Stands in for a real caster when testing the pipeline end to end:
+
+    caster = MockCaster(stations=4, rate_hz=10, n_sats=12, n_signals=2)
+    caster.start()
+    client = NtripClient("127.0.0.1", caster.port, "STA00", "user", "pass")
+
+Each mountpoint (`STA00`, `STA01`, ...) is one synthetic reference station
+(`core.rtcm_synth.SyntheticStation`). On connect a client receives the 1005
+station message and the current ephemerides, then MSM7 epochs at `rate_hz`
+with ephemerides repeated every `eph_interval` seconds.
+
+NTRIP 1 clients (no `Ntrip-Version` header, like `NtripClient`) get an
+`ICY 200 OK` response followed by raw RTCM; NTRIP 2 clients get
+`HTTP/1.1 200 OK` with chunked transfer encoding. `GET /` returns the
+sourcetable.
+
+`rate_hz` may be changed while clients are connected; the load test steps it
+up to find the point where the pipeline starts losing data.
+
+Run standalone:  python -m core.mock_caster --port 2101 --stations 2 --rate 1
+"""
+import argparse
+import base64
+import math
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, Optional
+
+from core.gnss_time import unix_to_gps_seconds
+from core.rtcm_synth import DEFAULT_REC_POS, SyntheticStation
+
+
+class _CasterServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _NtripRequestHandler(socketserver.StreamRequestHandler):
+    """One client connection: parse the request, then stream one mountpoint."""
+
+    def handle(self):
+        caster: "MockCaster" = self.server.caster
+        try:
+            request_line = self.rfile.readline(4096).decode("latin-1").strip()
+            headers = {}
+            while True:
+                line = self.rfile.readline(4096).decode("latin-1").strip()
+                if not line:
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        parts = request_line.split()
+        if len(parts) < 2 or parts[0] != "GET":
+            self._send(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            return
+        mountpoint = parts[1].lstrip("/")
+        ntrip2 = headers.get("ntrip-version", "").lower() == "ntrip/2.0"
+
+        if not mountpoint:
+            self._send_sourcetable(caster, ntrip2)
+            return
+        if mountpoint not in caster.mountpoints:
+            self._send(b"HTTP/1.1 404 Not Found\r\n\r\n" if ntrip2 else b"SOURCETABLE 200 OK\r\n\r\n")
+            return
+        if not caster.check_auth(headers.get("authorization", "")):
+            self._send(b"HTTP/1.1 401 Unauthorized\r\nWWW-Authenticate: Basic realm=\"/"
+                       + mountpoint.encode() + b"\"\r\n\r\n")
+            return
+
+        if ntrip2:
+            self._send(b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\n"
+                       b"Content-Type: gnss/data\r\nTransfer-Encoding: chunked\r\n\r\n")
+        else:
+            self._send(b"ICY 200 OK\r\n\r\n")
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        caster.stream(mountpoint, lambda data: self._send_data(data, ntrip2))
+
+    def _send(self, data: bytes):
+        try:
+            self.wfile.write(data)
+        except OSError:
+            pass
+
+    def _send_data(self, data: bytes, chunked: bool):
+        if chunked:
+            data = f"{len(data):X}\r\n".encode() + data + b"\r\n"
+        self.wfile.write(data)
+
+    def _send_sourcetable(self, caster: "MockCaster", ntrip2: bool):
+        body = caster.sourcetable().encode()
+        status = b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\n" if ntrip2 else b"SOURCETABLE 200 OK\r\n"
+        self._send(status + b"Content-Type: gnss/sourcetable\r\nContent-Length: "
+                   + str(len(body)).encode() + b"\r\n\r\n" + body)
+
+
+class MockCaster:
+    """
+    Args:
+        host / port: listen address (port 0 picks a free port, see `self.port`).
+        stations: number of mountpoints, named STA00, STA01, ...
+        systems: constellations in the MSM7 output, e.g. "GREC".
+        n_sats: satellites per constellation and epoch.
+        n_signals: signals per satellite (1-4).
+        rate_hz: observation epochs per second.
+        eph_interval: seconds between ephemeris repetitions (0 = only on connect).
+        rec_pos: station ECEF position; all stations share it.
+        user / password: require HTTP Basic auth when set.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, stations: int = 1, systems: str = "GREC",
+                 n_sats: int = 10, n_signals: int = 2, rate_hz: float = 1.0, eph_interval: float = 30.0,
+                 rec_pos=None, user: Optional[str] = None, password: Optional[str] = None):
+        self.host = host
+        self.systems = systems
+        self.n_sats = n_sats
+        self.n_signals = n_signals
+        self.rate_hz = rate_hz
+        self.eph_interval = eph_interval
+        self.rec_pos = list(rec_pos or DEFAULT_REC_POS)
+        self.mountpoints = [f"STA{i:02d}" for i in range(stations)]
+        self._auth = None
+        if user:
+            self._auth = base64.b64encode(f"{user}:{password or ''}".encode()).decode()
+
+        self.running = False
+        self.paused = False  # keep connections open but send no epochs
+        self.clients = 0
+        self.frames_sent = 0
+        self.msm_sent = 0
+        self.bytes_sent = 0
+        self.late_epochs = 0  # epochs generated after their scheduled time
+        self._lock = threading.Lock()
+        self._server = _CasterServer((host, port), _NtripRequestHandler)
+        self._server.caster = self
+        self.port = self._server.server_address[1]
+        self._thread = None
+
+    # --- lifecycle ---
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MockCaster", daemon=True)
+        self._thread.start()
+        print(f"[MockCaster] Serving {len(self.mountpoints)} mountpoints on {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        self.running = False
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"clients": self.clients, "frames_sent": self.frames_sent, "msm_sent": self.msm_sent,
+                    "bytes_sent": self.bytes_sent, "late_epochs": self.late_epochs}
+
+    def reset_stats(self):
+        with self._lock:
+            self.frames_sent = self.msm_sent = self.bytes_sent = self.late_epochs = 0
+
+    # --- protocol helpers ---
+    def check_auth(self, authorization: str) -> bool:
+        if self._auth is None:
+            return True
+        scheme, _, token = authorization.partition(" ")
+        return scheme.lower() == "basic" and token.strip() == self._auth
+
+    def sourcetable(self) -> str:
+        lines = [
+            f"STR;{mp};{mp};RTCM 3.3;1005(10),{self._msm_list()};2;{self.systems};SNIP;XXX;"
+            f"0.00;0.00;0;0;MockCaster;none;B;N;0;"
+            for mp in self.mountpoints
+        ]
+        return "\r\n".join(lines) + "\r\nENDSOURCETABLE\r\n"
+
+    def _msm_list(self) -> str:
+        numbers = {"G": "1077", "R": "1087", "E": "1097", "C": "1127"}
+        return ",".join(f"{numbers[s]}(1)" for s in self.systems if s in numbers)
+
+    # --- streaming ---
+    def stream(self, mountpoint: str, send):
+        """Generate and send traffic for one client until it disconnects or the caster stops."""
+        station = SyntheticStation(
+            station_id=self.mountpoints.index(mountpoint), rec_pos=self.rec_pos, systems=self.systems,
+            n_sats=self.n_sats, n_signals=self.n_signals, seed=self.mountpoints.index(mountpoint),
+        )
+        with self._lock:
+            self.clients += 1
+        try:
+            gps_now = unix_to_gps_seconds(time.time())
+            self._send_frames(send, [station.station_frame()] + station.ephemeris_frames(gps_now), 0)
+            last_eph = time.monotonic()
+            rate = self.rate_hz
+            next_epoch = self._next_grid_time(rate)
+
+            while self.running:
+                if self.rate_hz != rate:
+                    rate = self.rate_hz
+                    next_epoch = self._next_grid_time(rate)
+                delay = next_epoch - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -1.0 / rate:
+                    with self._lock:
+                        self.late_epochs += 1
+                if self.paused:
+                    time.sleep(0.05)
+                    next_epoch = self._next_grid_time(rate)
+                    continue
+
+                now = time.time()
+                # Epoch tags on the rate grid, like a receiver's measurement epochs
+                # (never in the future, so latency against GNSS time stays >= 0)
+                gps_now = unix_to_gps_seconds(now)
+                gps_epoch = math.floor(gps_now * rate) / rate
+                frames = station.epoch_frames(gps_epoch)
+                n_msm = len(frames)
+                if self.eph_interval > 0 and time.monotonic() - last_eph >= self.eph_interval:
+                    frames += station.ephemeris_frames(gps_epoch)
+                    last_eph = time.monotonic()
+                self._send_frames(send, frames, n_msm)
+                next_epoch += 1.0 / rate
+        except OSError:
+            pass  # client went away
+        finally:
+            with self._lock:
+                self.clients -= 1
+
+    @staticmethod
+    def _next_grid_time(rate: float) -> float:
+        """time.monotonic() of the next whole epoch on the GPS time grid for `rate`."""
+        gps_now = unix_to_gps_seconds(time.time())
+        return time.monotonic() + math.ceil(gps_now * rate) / rate - gps_now
+
+    def _send_frames(self, send, frames, n_msm: int):
+        data = b"".join(frames)
+        send(data)
+        with self._lock:
+            self.frames_sent += len(frames)
+            self.msm_sent += n_msm
+            self.bytes_sent += len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock NTRIP caster with synthetic MSM7 traffic")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2101)
+    parser.add_argument("--stations", type=int, default=1)
+    parser.add_argument("--systems", default="GREC")
+    parser.add_argument("--sats", type=int, default=10, help="satellites per constellation")
+    parser.add_argument("--signals", type=int, default=2, help="signals per satellite (1-4)")
+    parser.add_argument("--rate", type=float, default=1.0, help="epochs per second")
+    parser.add_argument("--eph-interval", type=float, default=30.0)
+    parser.add_argument("--rec-pos", type=float, nargs=3, metavar=("X", "Y", "Z"))
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    caster = MockCaster(args.host, args.port, stations=args.stations, systems=args.systems,
+                        n_sats=args.sats, n_signals=args.signals, rate_hz=args.rate,
+                        eph_interval=args.eph_interval, rec_pos=args.rec_pos, user=args.user, password=args.password)
+    caster.start()
+    print(f"[MockCaster] Mountpoints: {', '.join(caster.mountpoints)}")
+    try:
+        while True:
+            time.sleep(10)
+            s = caster.stats()
+            print(f"[MockCaster] clients={s['clients']} frames={s['frames_sent']} "
+                  f"bytes={s['bytes_sent']} late={s['late_epochs']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        caster.stop()
+
+
+if __name__ == "__main__":
+    main()
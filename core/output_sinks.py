@@ -0,0 +1,239 @@
+"""
+Pluggable output sinks for headless epoch output (main.py).
+
+Each sink turns an `EpochObservation` into bytes. `SinkWriter` runs the sinks
+on a background thread and hands each sink's pending output to its stream in
+one batched `write` per flush interval, so the stream threads never block on
+terminal or disk I/O.
+
+Available sink types (see `build_sinks`):
+- "summary": one compact text line per epoch (default).
+- "jsonl":   one JSON object per epoch.
+- "binary":  fixed-size little-endian records (see `BinaryRecordSink`).
+- "table":   the human-readable per-signal table, rate limited.
+"""
+import json
+import math
+import queue
+import struct
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from core.display_info import format_epoch_table
+
+
+def _open_stream(path: Optional[str]):
+    """Return a binary stream for `path`; None or "-" means stdout."""
+    if path in (None, "", "-"):
+        return sys.stdout.buffer, False
+    return open(path, "ab", buffering=1024 * 1024), True
+
+
+def _valid_signals(sat):
+    return [(code, sig) for code, sig in sat.signals.items() if sig is not None]
+
+
+class OutputSink:
+    """Base class: encode epochs to bytes and write batches to a stream."""
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.stream, self._owns_stream = _open_stream(path)
+
+    def encode(self, epoch_data) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def write_batch(self, chunks: List[bytes]):
+        self.stream.write(b"".join(chunks))
+        self.stream.flush()
+
+    def close(self):
+        try:
+            self.stream.flush()
+        finally:
+            if self._owns_stream:
+                self.stream.close()
+
+
+class SummarySink(OutputSink):
+    """One line per epoch: TOW, satellites/signals per system and mean SNR."""
+    def encode(self, epoch_data):
+        per_sys = {}
+        snr_sum = 0.0
+        snr_n = 0
+        for key, sat in epoch_data.satellites.items():
+            n_sats, n_sigs = per_sys.get(key[0], (0, 0))
+            sigs = _valid_signals(sat)
+            per_sys[key[0]] = (n_sats + 1, n_sigs + len(sigs))
+            for _, sig in sigs:
+                if sig.snr > 0:
+                    snr_sum += sig.snr
+                    snr_n += 1
+
+        sys_part = " ".join(f"{s}:{n}/{m}" for s, (n, m) in sorted(per_sys.items()))
+        mean_snr = snr_sum / snr_n if snr_n else 0.0
+        return (
+            f"TOW {epoch_data.gps_time:10.3f} | sats {len(epoch_data.satellites):3d} "
+            f"| {sys_part} | mean SNR {mean_snr:4.1f}\n"
+        ).encode()
+
+
+class JsonLinesSink(OutputSink):
+    """One JSON object per epoch with per-signal observations."""
+    def encode(self, epoch_data):
+        sats = {}
+        for key, sat in epoch_data.satellites.items():
+            sats[key] = {
+                "az": sat.azimuth,
+                "el": sat.elevation,
+                "signals": {
+                    code: {
+                        "snr": sig.snr,
+                        "pr": sig.pseudorange,
+                        "phase": sig.phase,
+                        "doppler": sig.doppler,
+                        "lock": sig.lock_time,
+                    }
+                    for code, sig in _valid_signals(sat)
+                },
+            }
+        record = {"tow": epoch_data.gps_time, "sats": sats}
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+
+class BinaryRecordSink(OutputSink):
+    """
+    Binary record stream, little-endian.
+
+    Epoch header `EPOCH_HEADER`: magic b"GEP1", gps_time (f8), n_records (u2).
+    Followed by n_records `SIGNAL_RECORD`s: sys (1 char), prn (u1),
+    signal id (3 chars, NUL padded), az (f4), el (f4), snr (f4),
+    pseudorange (f8), phase (f8), doppler (f4), lock_time (u2), half_cycle (u1).
+    Missing az/el are written as NaN.
+    """
+    EPOCH_HEADER = struct.Struct("<4sdH")
+    SIGNAL_RECORD = struct.Struct("<cB3sfffddfHB")
+    MAGIC = b"GEP1"
+
+    def encode(self, epoch_data):
+        body = []
+        pack = self.SIGNAL_RECORD.pack
+        for key, sat in epoch_data.satellites.items():
+            az = sat.azimuth if sat.azimuth is not None else math.nan
+            el = sat.elevation if sat.elevation is not None else math.nan
+            sys_b = key[0].encode()
+            prn = int(sat.prn) & 0xFF
+            for code, sig in _valid_signals(sat):
+                body.append(pack(
+                    sys_b, prn, code.encode()[:3], az, el, sig.snr,
+                    sig.pseudorange, sig.phase, sig.doppler,
+                    int(sig.lock_time) & 0xFFFF, int(sig.half_cycle) & 0xFF,
+                ))
+        header = self.EPOCH_HEADER.pack(self.MAGIC, epoch_data.gps_time, len(body))
+        return header + b"".join(body)
+
+
+class TableSink(OutputSink):
+    """The legacy per-signal console table, at most once every `min_interval` s."""
+    def __init__(self, path: Optional[str] = None, min_interval: float = 5.0):
+        super().__init__(path)
+        self.min_interval = min_interval
+        self._last_emit = 0.0
+
+    def encode(self, epoch_data):
+        now = time.monotonic()
+        if now - self._last_emit < self.min_interval:
+            return None
+        self._last_emit = now
+        return format_epoch_table(epoch_data).encode()
+
+
+SINK_TYPES = {
+    "summary": SummarySink,
+    "jsonl": JsonLinesSink,
+    "binary": BinaryRecordSink,
+    "table": TableSink,
+}
+
+
+def build_sinks(specs) -> List[OutputSink]:
+    """
+    Build sinks from config entries such as
+    `{"type": "jsonl", "path": "epochs.jsonl"}` or `{"type": "table", "min_interval": 10}`.
+    """
+    sinks = []
+    for spec in specs:
+        spec = dict(spec)
+        sink_type = spec.pop("type")
+        if sink_type not in SINK_TYPES:
+            raise ValueError(f"Unknown output sink type: {sink_type}")
+        sinks.append(SINK_TYPES[sink_type](**spec))
+    return sinks
+
+
+class SinkWriter(threading.Thread):
+    """
+    Background writer: encodes submitted epochs and writes them in batches.
+
+    `submit` never blocks; if the writer falls more than `max_pending` epochs
+    behind, new epochs are dropped and counted in `dropped`.
+    """
+    def __init__(self, sinks: List[OutputSink], flush_interval: float = 1.0, max_pending: int = 10000):
+        super().__init__(name="SinkWriter")
+        self.daemon = True
+        self.sinks = sinks
+        self.flush_interval = flush_interval
+        self.running = True
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = {id(s): [] for s in sinks}
+
+    def submit(self, epoch_data):
+        try:
+            self._queue.put_nowait(epoch_data)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        last_flush = time.monotonic()
+        while self.running or not self._queue.empty():
+            try:
+                epoch_data = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                epoch_data = None
+
+            if epoch_data is not None:
+                for sink in self.sinks:
+                    try:
+                        chunk = sink.encode(epoch_data)
+                    except Exception as e:
+                        print(f"[SinkWriter] {type(sink).__name__} encode error: {e}")
+                        continue
+                    if chunk:
+                        self._pending[id(sink)].append(chunk)
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = now
+        self.flush()
+
+    def flush(self):
+        for sink in self.sinks:
+            chunks = self._pending[id(sink)]
+            if not chunks:
+                continue
+            self._pending[id(sink)] = []
+            try:
+                sink.write_batch(chunks)
+            except Exception as e:
+                print(f"[SinkWriter] {type(sink).__name__} write error: {e}")
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the writer, draining queued epochs, and close all sinks."""
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+        for sink in self.sinks:
+            sink.close()
@@ -6,7 +6,17 @@ from core.display_info import (
     print_epoch_footer,
 )
 
-def process_epoch(epoch_data):
+def process_epoch(epoch_data, writer=None):
+    """
+    Hand one epoch to the output sinks.
+
+    With a `SinkWriter` the epoch is queued for the background writer; without
+    one the full table is printed directly (legacy behaviour).
+    """
+    if writer is not None:
+        writer.submit(epoch_data)
+        return
+
     print_epoch_header(epoch_data)
 
     sats_by_sys, sys_map = group_satellites_by_system(epoch_data)
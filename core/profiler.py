@@ -0,0 +1,255 @@
+"""
+Built-in profiler for the running pipeline, usable from the frozen executable.
+
+One session runs for N seconds and writes to `config.PROFILER["DIR"]`
+(default: `profiles/` next to the executable when frozen, else the working
+directory):
+
+    profile_<UTC>.collapsed        wall-clock stack samples of every thread,
+                                   "thread;outer;...;inner count" per line
+                                   (flamegraph.pl, speedscope, inferno)
+    profile_<UTC>_<thread>.prof    cProfile data per participating thread
+    profile_<UTC>_all.prof         the same merged (python -m pstats <file>)
+
+Sampling sees all threads via `sys._current_frames()`. cProfile only traces
+the thread that enables it, so threads opt in by calling
+`PROFILER.checkpoint()` from their loop (IOThread / DataProcessingThread once
+per message, the GUI thread from a QTimer); outside a session that is a
+single attribute check. On Python 3.12+ cProfile is process-wide
+(`sys.monitoring`) and only one can be active: the first thread to check in
+traces, the others fall back to stack sampling (listed in `status()`).
+Sessions are started from the Perf dialog in the GUI
+and by SIGUSR1 in headless `main.py`.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+
+def default_output_dir() -> str:
+    """`profiles/` beside the executable when frozen (PyInstaller), else in the working directory."""
+    if getattr(sys, "frozen", False):
+        return os.path.join(os.path.dirname(sys.executable), "profiles")
+    return os.path.join(os.getcwd(), "profiles")
+
+
+def thread_label(thread: threading.Thread) -> str:
+    """Readable, file-name safe label: thread class plus name (IOThread-OBS, MainThread)."""
+    if thread is threading.main_thread():
+        return "MainThread"
+    cls = type(thread).__name__
+    label = thread.name if cls == "Thread" or thread.name.startswith(cls) else f"{cls}-{thread.name}"
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in label)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """One timed profiling run: a sampler thread plus cooperative per-thread cProfile."""
+    def __init__(self, seconds: float, out_dir: Optional[str] = None, sample_interval: float = 0.005,
+                 use_cprofile: bool = True, grace: float = 2.0,
+                 on_done: Optional[Callable[[List[str]], None]] = None):
+        self.seconds = seconds
+        self.out_dir = out_dir or default_output_dir()
+        self.sample_interval = sample_interval
+        self.use_cprofile = use_cprofile
+        self.grace = grace
+        self.on_done = on_done
+        self.stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.deadline = 0.0
+        self.samples: Counter = Counter()
+        self.n_samples = 0
+        self.paths: List[str] = []
+        self.error: Optional[str] = None
+        self.finished = threading.Event()
+        self.base = os.path.join(self.out_dir, f"profile_{self.stamp}")
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._outstanding = 0  # threads still tracing (must disable themselves)
+        self.skipped: List[str] = []  # threads whose cProfile could not be enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> "ProfileSession":
+        self.deadline = time.monotonic() + self.seconds
+        self._thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return not self.finished.is_set()
+
+    @property
+    def idle(self) -> bool:
+        """Finished and no thread is still tracing."""
+        return self.finished.is_set() and self._outstanding == 0
+
+    def checkpoint(self):
+        """Enable cProfile on the calling thread during the session, disable it afterwards."""
+        if not self.use_cprofile:
+            return
+        local = self._local
+        prof = getattr(local, "prof", None)
+        if time.monotonic() < self.deadline:
+            if prof is None and not self.finished.is_set():
+                local.prof = prof = cProfile.Profile()
+                local.done = False
+                with self._lock:
+                    self._outstanding += 1
+                try:
+                    prof.enable()
+                except Exception as e:
+                    # Python 3.12+: another thread's profiler is already active
+                    # (process-wide); this thread is only sampled. Never raise
+                    # into the caller's loop.
+                    local.done = True
+                    with self._lock:
+                        self._outstanding -= 1
+                        self.skipped.append(f"{thread_label(threading.current_thread())} ({e})")
+        elif prof is not None and not local.done:
+            prof.disable()
+            local.done = True
+            self._hand_over(thread_label(threading.current_thread()), prof)
+
+    def _hand_over(self, label: str, prof: cProfile.Profile):
+        """
+        Write the calling thread's profile. A thread that checks out after the
+        session was written (e.g. a busy GUI thread) also refreshes the merged file.
+        """
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = f"{self.base}_{label}.prof"
+            prof.dump_stats(path)
+            with self._lock:
+                self._profiles[label] = prof
+                self.paths.append(path)
+                if self.finished.is_set():
+                    self._write_merged()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+
+    def _sample(self, me: int):
+        threads = {t.ident: t for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = threads.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(thread_label(thread) if thread else f"thread-{ident}")
+            self.samples[";".join(reversed(stack))] += 1
+        self.n_samples += 1
+
+    def _run(self):
+        me = threading.get_ident()
+        try:
+            next_t = time.monotonic()
+            while next_t < self.deadline:
+                self._sample(me)
+                next_t += self.sample_interval
+                delay = next_t - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_t = time.monotonic()  # fell behind; do not burst
+            os.makedirs(self.out_dir, exist_ok=True)
+            collapsed = self.base + ".collapsed"
+            with open(collapsed, "w", encoding="utf-8") as f:
+                for stack, count in sorted(self.samples.items()):
+                    f.write(f"{stack} {count}\n")
+            # give threads that opted in time to reach a checkpoint and hand over
+            end = time.monotonic() + self.grace
+            while self._outstanding and time.monotonic() < end:
+                time.sleep(0.05)
+            with self._lock:
+                self.paths.insert(0, collapsed)
+                self._write_merged()
+                self.finished.set()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.finished.set()
+        if self.on_done is not None:
+            self.on_done(list(self.paths))
+
+    def _write_merged(self):
+        """Merge the per-thread profiles into `<base>_all.prof` (caller holds the lock)."""
+        merged = None
+        for label, prof in sorted(self._profiles.items()):
+            if merged is None:
+                merged = pstats.Stats(prof)
+            else:
+                merged.add(prof)
+        if merged is None:
+            return
+        path = self.base + "_all.prof"
+        merged.dump_stats(path)
+        if path not in self.paths:
+            self.paths.append(path)
+
+    def status(self) -> str:
+        if self.running:
+            left = max(self.deadline - time.monotonic(), 0.0)
+            return (f"Profiling: {left:.0f}s left, {self.n_samples} samples, "
+                    f"{len(self._profiles) + self._outstanding} cProfile threads")
+        if self.error:
+            return f"Profile failed: {self.error}"
+        pending = f", {self._outstanding} threads still tracing" if self._outstanding else ""
+        if self.skipped:
+            pending += f"; cProfile skipped, sampled only: {', '.join(self.skipped)}"
+        return f"Profile written to {self.out_dir} ({len(self.paths)} files{pending})"
+
+
+class Profiler:
+    """Process-wide handle: at most one session at a time."""
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+        self.last: Optional[ProfileSession] = None
+        self._lock = threading.Lock()
+
+    def start(self, seconds: float, **kwargs) -> Optional[ProfileSession]:
+        """Start a session; None if one is still running."""
+        with self._lock:
+            if self.session is not None and not self.session.idle:
+                return None
+            self.session = self.last = ProfileSession(seconds, **kwargs).start()
+            return self.session
+
+    def checkpoint(self):
+        session = self.session
+        if session is not None:
+            session.checkpoint()
+            if session.idle:
+                self.session = None
+
+    def status(self) -> str:
+        return self.last.status() if self.last is not None else "No profile taken"
+
+
+PROFILER = Profiler()
+
+
+def start_from(config_module, seconds: Optional[float] = None,
+               on_done: Optional[Callable[[List[str]], None]] = None) -> Optional[ProfileSession]:
+    """Start a session with `config.PROFILER` ({SECONDS, DIR, INTERVAL, CPROFILE}) defaults."""
+    cfg = getattr(config_module, "PROFILER", {}) or {}
+    return PROFILER.start(
+        seconds if seconds is not None else float(cfg.get("SECONDS", 30)),
+        out_dir=cfg.get("DIR") or None,
+        sample_interval=float(cfg.get("INTERVAL", 0.005)),
+        use_cprofile=bool(cfg.get("CPROFILE", True)),
+        on_done=on_done,
+    )
@@ -0,0 +1,134 @@
+"""
+Named GNSS-IR reflection zones compiled into an azimuth/elevation lookup grid.
+
+Each zone is an elevation range plus azimuth windows, using the `GNSS_IR`
+keys; keys a zone leaves out are taken from the top level:
+
+    GNSS_IR = {
+        "KEEP_SECONDS": 900,
+        "MIN_ELEVATION_DEG": 5.0,
+        "MAX_ELEVATION_DEG": 30.0,
+        "ZONES": {
+            "river": {"AZ_WINDOWS_DEG": [[165, 250]], "MAX_ELEVATION_DEG": 15.0},
+            "field": {"AZ_WINDOWS_DEG": [[250, 330]]},
+            "roof": {"MIN_ELEVATION_DEG": 20.0, "AZ_WINDOWS_DEG": [[330, 30]]},  # wraps through north
+        },
+    }
+
+Without `ZONES` the top-level mask is a single zone named "default".
+
+The zone edges split each axis into cells (the open intervals between
+consecutive edges and the edge values themselves). Every zone is evaluated
+once per (azimuth cell, elevation cell) and stored as one bit of a uint32
+grid, so the zones an observation belongs to are a single grid lookup after
+two binary searches, and the inclusive comparisons of the config are
+reproduced exactly.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+MAX_ZONES = 32
+_MASK_KEYS = ("MIN_ELEVATION_DEG", "MAX_ELEVATION_DEG", "AZ_WINDOWS_DEG")
+
+
+def _in_windows(az: float, windows: Sequence[Sequence[float]]) -> bool:
+    """Inclusive azimuth window test; a window with start > end wraps through north."""
+    if not windows:
+        return True
+    for start, end in windows:
+        if (start <= az <= end) if start <= end else (az >= start or az <= end):
+            return True
+    return False
+
+
+def in_windows(az, windows: Sequence[Sequence[float]]) -> np.ndarray:
+    """Array version of `_in_windows`: boolean mask of the azimuths inside any window."""
+    az = np.asarray(az)
+    if not windows:
+        return np.ones(az.shape, dtype=bool)
+    mask = np.zeros(az.shape, dtype=bool)
+    for start, end in windows:
+        mask |= ((az >= start) & (az <= end)) if start <= end else ((az >= start) | (az <= end))
+    return mask
+
+
+def _cell_points(edges: List[float]) -> np.ndarray:
+    """One representative value per cell: cell 2i lies below edges[i], cell 2i+1 is edges[i]."""
+    if not edges:
+        return np.zeros(1)
+    points = [edges[0] - 1.0]
+    for i, edge in enumerate(edges):
+        points.append(edge)
+        points.append((edge + edges[i + 1]) / 2 if i + 1 < len(edges) else edge + 1.0)
+    return np.asarray(points)
+
+
+class ReflectionZones:
+    """
+    Compiled set of named zones.
+
+    `bit_of(name)` assigns each zone its bit (default: position in `zones`);
+    a store passes its own table so bits stay stable when the zones are
+    recompiled.
+    """
+    def __init__(self, zones: Dict[str, dict], bit_of: Optional[Callable[[str], int]] = None):
+        self.names = list(zones)
+        self.bits = {name: (bit_of(name) if bit_of else i) for i, name in enumerate(self.names)}
+        if any(bit >= MAX_ZONES for bit in self.bits.values()):
+            raise ValueError(f"at most {MAX_ZONES} reflection zones are supported")
+
+        specs = []
+        for name, zone in zones.items():
+            windows = [(float(a), float(b)) for a, b in zone.get("AZ_WINDOWS_DEG") or []]
+            specs.append((1 << self.bits[name], float(zone.get("MIN_ELEVATION_DEG", 0)),
+                          float(zone.get("MAX_ELEVATION_DEG", 90)), windows))
+        self.min_el = min((lo for _, lo, _, _ in specs), default=0.0)
+        self.max_el = max((hi for _, _, hi, _ in specs), default=90.0)
+
+        self._az_edges = sorted({v for *_, windows in specs for window in windows for v in window})
+        self._el_edges = sorted({v for _, lo, hi, _ in specs for v in (lo, hi)})
+        self._az_edges_arr = np.asarray(self._az_edges, dtype=np.float64)
+        self._el_edges_arr = np.asarray(self._el_edges, dtype=np.float64)
+
+        az_points = _cell_points(self._az_edges)
+        el_points = _cell_points(self._el_edges)
+        self.grid = np.zeros((len(az_points), len(el_points)), dtype=np.uint32)
+        for bit, lo, hi, windows in specs:
+            az_in = np.array([_in_windows(a, windows) for a in az_points])
+            el_in = (el_points >= lo) & (el_points <= hi)
+            self.grid[np.ix_(az_in, el_in)] |= np.uint32(bit)
+        self._grid_rows = self.grid.tolist()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict], bit_of: Optional[Callable[[str], int]] = None) -> "ReflectionZones":
+        """Zones from a `GNSS_IR` dict (`ZONES`, or the top-level mask as zone "default")."""
+        cfg = cfg or {}
+        base = {k: cfg[k] for k in _MASK_KEYS if k in cfg}
+        zones = cfg.get("ZONES") or {"default": base}
+        return cls({name: {**base, **(zone or {})} for name, zone in zones.items()}, bit_of)
+
+    def lookup_one(self, az: float, el: float) -> int:
+        """Zone bitmask of one observation (0 = outside every zone)."""
+        if el < self.min_el or el > self.max_el:
+            return 0
+        ca = bisect_left(self._az_edges, az) + bisect_right(self._az_edges, az)
+        ce = bisect_left(self._el_edges, el) + bisect_right(self._el_edges, el)
+        return self._grid_rows[ca][ce]
+
+    def lookup(self, az, el) -> np.ndarray:
+        """Zone bitmasks (uint32) of arrays of azimuth/elevation."""
+        az = np.asarray(az, dtype=np.float64)
+        el = np.asarray(el, dtype=np.float64)
+        ca = np.searchsorted(self._az_edges_arr, az, "left") + np.searchsorted(self._az_edges_arr, az, "right")
+        ce = np.searchsorted(self._el_edges_arr, el, "left") + np.searchsorted(self._el_edges_arr, el, "right")
+        return self.grid[ca, ce]
+
+    def mask(self, names: Iterable[str]) -> int:
+        """Bitmask of the given zone names (unknown names are ignored)."""
+        out = 0
+        for name in names:
+            if name in self.bits:
+                out |= 1 << self.bits[name]
+        return out
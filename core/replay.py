@@ -0,0 +1,134 @@
+"""
+Replay of recorded RTCM captures as a drop-in replacement for `NtripClient`.
+
+`ReplayClient.connect()` returns a file-like stream that `RTCMReader` reads
+exactly like a caster socket. Frames are released at their original receipt
+timing (from the capture index), at a multiple of it, or as fast as possible.
+"""
+import heapq
+import os
+import time
+from typing import Iterator, Optional, Tuple
+
+from core.rtcm_recorder import iter_frames, list_captures, read_frames, read_index, select_records
+
+
+def _raw_file_frames(path: str, chunk_size: int = 65536) -> Iterator[Tuple[bytes, Optional[float]]]:
+    """Unindexed capture: yield raw chunks without timing information."""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk, None
+
+
+class ReplayStream:
+    """
+    File-like view over a sequence of `(bytes, recv_time)` chunks.
+
+    `read` sleeps until each chunk's scheduled release time, scaled by `speed`
+    (`speed <= 0` disables pacing). Returns b"" at the end of the capture,
+    which `RTCMReader` treats as end of stream.
+    """
+    def __init__(self, chunks: Iterator[Tuple[bytes, Optional[float]]], speed: float = 1.0):
+        self._chunks = chunks
+        self._speed = speed
+        self._buf = bytearray()
+        self._t0_wall = None
+        self._t0_rec = None
+        self.closed = False
+        self.bytes_read = 0
+
+    def _wait_for(self, recv_time: Optional[float]):
+        if recv_time is None or self._speed <= 0:
+            return
+        if self._t0_wall is None:
+            self._t0_wall = time.monotonic()
+            self._t0_rec = recv_time
+            return
+        delay = self._t0_wall + (recv_time - self._t0_rec) / self._speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.closed and (size < 0 or len(self._buf) < size):
+            try:
+                chunk, recv_time = next(self._chunks)
+            except StopIteration:
+                break
+            self._wait_for(recv_time)
+            self._buf += chunk
+        if size < 0:
+            size = len(self._buf)
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self.closed = True
+
+
+class ReplayClient:
+    """
+    Interchangeable with `NtripClient`: `connect()` / `close()`.
+
+    Args:
+        path: capture directory written by `RtcmRecorder`, or a single .rtcm file.
+        speed: 1.0 = original timing, N = N times faster, 0 = as fast as possible.
+        start_gps / end_gps: optional GPS-seconds range (uses the capture index).
+        stream_name: replay only this stream's captures (default: all, merged
+            by receipt time).
+        loop: restart from the beginning when the capture ends.
+
+    After the capture is exhausted (and `loop` is False) `connect()` returns
+    None and `finished` is True.
+    """
+    def __init__(self, path: str, speed: float = 1.0, start_gps: Optional[float] = None,
+                 end_gps: Optional[float] = None, stream_name: Optional[str] = None, loop: bool = False):
+        self.path = path
+        self.speed = speed
+        self.start_gps = start_gps
+        self.end_gps = end_gps
+        self.stream_name = stream_name
+        self.loop = loop
+        self.sock = None
+        self.finished = False
+        self._started = False
+
+    def _chunks(self) -> Iterator[Tuple[bytes, Optional[float]]]:
+        if os.path.isfile(self.path):
+            index = read_index(self.path)
+            if len(index) == 0:
+                return _raw_file_frames(self.path)
+            records = select_records(index, self.start_gps, self.end_gps)
+            return ((raw, float(rec["recv_time"])) for raw, rec in read_frames(self.path, records))
+
+        if self.stream_name:
+            stream_names = [self.stream_name]
+        else:
+            stream_names = sorted({os.path.basename(p).rsplit("_", 2)[0] for p in list_captures(self.path)})
+        sources = [
+            ((raw, float(rec["recv_time"])) for raw, rec in
+             iter_frames(self.path, self.start_gps, self.end_gps, stream_name=name))
+            for name in stream_names
+        ]
+        if len(sources) == 1:
+            return sources[0]
+        return heapq.merge(*sources, key=lambda item: item[1])
+
+    def connect(self):
+        """Open the capture; returns a readable stream, or None when finished."""
+        if self._started and not self.loop:
+            self.finished = True
+            print(f"[Replay] Finished {self.path}")
+            return None
+        self._started = True
+        self.sock = ReplayStream(self._chunks(), self.speed)
+        print(f"[Replay] Playing {self.path} at {'max' if self.speed <= 0 else f'{self.speed:g}x'} speed")
+        return self.sock
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
@@ -20,6 +20,7 @@ class RingBuffer:
         self.not_empty = threading.Condition(self.lock)
         self.not_full = threading.Condition(self.lock)
         self.closed = False
+        self.dropped = 0  # items discarded by non-blocking puts on a full buffer
         
     def put(self, item: Any, block: bool = False, timeout: Optional[float] = None) -> bool:
         """
@@ -40,6 +41,8 @@ class RingBuffer:
             # Non-blocking mode: If the buffer is full, discard the oldest data (ring buffer feature).
             if not block:
                 # If the buffer is full, deque will discard the oldest data.
+                if len(self.buffer) >= self.maxsize:
+                    self.dropped += 1
                 self.buffer.append(item)
                 self.not_empty.notify()
                 return True
@@ -101,6 +104,20 @@ class RingBuffer:
             self.not_empty.notify_all()
             self.not_full.notify_all()
     
+    def resize(self, maxsize: int):
+        """
+        Change the capacity. When shrinking below the current fill level the
+        oldest items are discarded (and counted in `dropped`).
+        """
+        maxsize = max(1, int(maxsize))
+        with self.lock:
+            excess = len(self.buffer) - maxsize
+            if excess > 0:
+                self.dropped += excess
+            self.buffer = deque(self.buffer, maxlen=maxsize)
+            self.maxsize = maxsize
+            self.not_full.notify_all()
+
     def clear(self):
         with self.lock:
             self.buffer.clear()
@@ -7,6 +7,7 @@ from core.data_models import EpochObservation, SatelliteState, SignalData
 from datetime import datetime, timedelta, timezone
 from core.geo_utils import calculate_az_el, get_freq
 import core.BE2pos as BE2pos 
+from core.instrumentation import PIPELINE
 import config
 import threading
 import math
@@ -320,7 +321,7 @@ class RTCMHandler:
             epoch_time = getattr(msg, time_attr) / 1000.0
             if sys_id == 'R': # GLONASS is time of day
                 epoch_time = epoch_time - 3*60*60 + self.gps_day_of_week() * 24*3600
-            epoch_data = EpochObservation(gps_time=epoch_time)
+            epoch_data = EpochObservation(gps_time=epoch_time, sys_id=sys_id)
 
             # ------------------------------ Cell Parsing -------------------------------
             cell_prn_map = {}
@@ -365,6 +366,7 @@ class RTCMHandler:
                     # ================================================================
                     if sat_key in self.ephemeris_cache:
                         eph_data = self.ephemeris_cache[sat_key]
+                        t_orbit = PIPELINE.start()
                         
                         # 1. Calculate Satellite Position (ECEF) using BE2pos
                         # t_obs_gpst is passed as epoch_time (approximate is fine for initial step)
@@ -380,6 +382,7 @@ class RTCMHandler:
                                 az, el = calculate_az_el(sat_pos, rec_pos)
                                 sat_state.azimuth = az
                                 sat_state.elevation = el
+                        PIPELINE.stop("orbit_azel", t_orbit)
                     # ================================================================
 
                 else:
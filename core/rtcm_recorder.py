@@ -0,0 +1,213 @@
+"""
+Raw RTCM capture with a seekable time index.
+
+`RtcmRecorder` tees validated RTCM frames from an I/O thread into rotating
+capture files. Every capture file `<stream>_<YYYYmmdd_HHMMSS>.rtcm` has a side
+index `<...>.idx` with one fixed-size `INDEX_DTYPE` record per frame:
+
+    gps_time   f8  absolute GPS seconds (MSM epoch, else last MSM epoch / receipt time)
+    recv_time  f8  unix time the frame was received
+    msg_type   u2  RTCM message number
+    offset     u8  byte offset of the frame in the .rtcm file
+    length     u4  frame length in bytes
+
+The index is memory-mapped by `find_frames`/`iter_frames`, so a time range in a
+multi-day capture is located without reading the RTCM data itself.
+"""
+import glob
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.gnss_time import msm_epoch_gps_seconds, unix_to_gps_seconds
+
+INDEX_DTYPE = np.dtype([
+    ("gps_time", "<f8"),
+    ("recv_time", "<f8"),
+    ("msg_type", "<u2"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+])
+_INDEX_RECORD = struct.Struct("<ddHQI")
+
+# Allow for out-of-order MSM epochs between systems when skipping whole files.
+FILE_SKIP_SLACK = 60.0
+
+
+def frame_msg_type(raw: bytes) -> int:
+    """RTCM message number from the first 12 payload bits of a raw frame."""
+    if len(raw) < 5:
+        return 0
+    return (raw[3] << 4) | (raw[4] >> 4)
+
+
+class RtcmRecorder(threading.Thread):
+    """
+    Background writer for raw RTCM captures of one stream.
+
+    `record` only enqueues the frame, so it is safe to call from the I/O thread;
+    file writes, index generation and rotation all happen on this thread.
+    """
+    def __init__(self, stream_name: str, capture_dir: str, rotate_seconds: int = 3600,
+                 flush_interval: float = 2.0, max_pending: int = 100000):
+        super().__init__(name=f"Recorder-{stream_name}")
+        self.daemon = True
+        self.stream_name = stream_name
+        self.capture_dir = capture_dir
+        self.rotate_seconds = rotate_seconds
+        self.flush_interval = flush_interval
+        self.running = True
+        self.dropped = 0
+        self.frames_written = 0
+        self.bytes_written = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._data_file = None
+        self._index_file = None
+        self._offset = 0
+        self._period_end = 0.0
+        self._last_gps_time = None
+        os.makedirs(capture_dir, exist_ok=True)
+
+    def record(self, raw: bytes, msg=None):
+        """Queue one validated frame for writing (non-blocking)."""
+        try:
+            self._queue.put_nowait((raw, msg, time.time()))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        last_flush = time.monotonic()
+        while self.running or not self._queue.empty():
+            try:
+                raw, msg, recv_time = self._queue.get(timeout=self.flush_interval)
+                self._write_frame(raw, msg, recv_time)
+            except queue.Empty:
+                pass
+            except Exception as e:
+                print(f"[{self.name}] Write error: {e}")
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = now
+        self._close_files()
+
+    def stop(self, timeout: float = 2.0):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def _write_frame(self, raw: bytes, msg, recv_time: float):
+        if self._data_file is None or recv_time >= self._period_end:
+            self._rotate(recv_time)
+
+        gps_time = None
+        if msg is not None:
+            gps_time = msm_epoch_gps_seconds(msg, unix_to_gps_seconds(recv_time))
+        if gps_time is None:
+            gps_time = self._last_gps_time if self._last_gps_time is not None else unix_to_gps_seconds(recv_time)
+        else:
+            self._last_gps_time = gps_time
+
+        self._data_file.write(raw)
+        self._index_file.write(_INDEX_RECORD.pack(gps_time, recv_time, frame_msg_type(raw), self._offset, len(raw)))
+        self._offset += len(raw)
+        self.frames_written += 1
+        self.bytes_written += len(raw)
+
+    def _rotate(self, recv_time: float):
+        self._close_files()
+        period_start = recv_time - (recv_time % self.rotate_seconds)
+        self._period_end = period_start + self.rotate_seconds
+        stamp = datetime.fromtimestamp(period_start, tz=timezone.utc).strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.capture_dir, f"{self.stream_name}_{stamp}")
+        # Append so a restart within the same period continues the same file.
+        self._data_file = open(base + ".rtcm", "ab", buffering=1024 * 1024)
+        self._index_file = open(base + ".idx", "ab", buffering=64 * 1024)
+        self._offset = self._data_file.tell()
+
+    def _flush(self):
+        if self._data_file is not None:
+            self._data_file.flush()
+            self._index_file.flush()
+
+    def _close_files(self):
+        if self._data_file is not None:
+            self._data_file.close()
+            self._index_file.close()
+            self._data_file = None
+            self._index_file = None
+
+
+# -----------------------------------------------------------------------------
+# Capture reading
+# -----------------------------------------------------------------------------
+def list_captures(capture_dir: str, stream_name: Optional[str] = None) -> List[str]:
+    """Capture data files in chronological order (file names sort by time)."""
+    pattern = f"{stream_name}_*.rtcm" if stream_name else "*.rtcm"
+    return sorted(glob.glob(os.path.join(capture_dir, pattern)))
+
+
+def read_index(rtcm_path: str) -> np.ndarray:
+    """Memory-map the side index of a capture file (empty array if missing)."""
+    idx_path = os.path.splitext(rtcm_path)[0] + ".idx"
+    if not os.path.exists(idx_path) or os.path.getsize(idx_path) < INDEX_DTYPE.itemsize:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    n = os.path.getsize(idx_path) // INDEX_DTYPE.itemsize
+    return np.memmap(idx_path, dtype=INDEX_DTYPE, mode="r", shape=(n,))
+
+
+def select_records(index: np.ndarray, start_gps: Optional[float] = None, end_gps: Optional[float] = None,
+                   msg_types: Optional[Sequence[int]] = None) -> np.ndarray:
+    """Index records of one capture file inside [start_gps, end_gps] with the given message types."""
+    if len(index) == 0:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    lo = -np.inf if start_gps is None else start_gps
+    hi = np.inf if end_gps is None else end_gps
+    if index["gps_time"][0] > hi + FILE_SKIP_SLACK or index["gps_time"][-1] < lo - FILE_SKIP_SLACK:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    t = index["gps_time"]
+    mask = (t >= lo) & (t <= hi)
+    if msg_types is not None:
+        mask &= np.isin(index["msg_type"], np.asarray(msg_types, dtype=np.uint16))
+    return np.asarray(index[mask])
+
+
+def read_frames(rtcm_path: str, records: np.ndarray) -> Iterator[Tuple[bytes, np.void]]:
+    """Yield `(raw_frame, index_record)` for the given records of one capture file."""
+    with open(rtcm_path, "rb") as f:
+        for rec in records:
+            f.seek(int(rec["offset"]))
+            yield f.read(int(rec["length"])), rec
+
+
+def find_frames(
+    capture_dir: str,
+    start_gps: Optional[float] = None,
+    end_gps: Optional[float] = None,
+    msg_types: Optional[Sequence[int]] = None,
+    stream_name: Optional[str] = None,
+) -> Iterator[Tuple[str, np.ndarray]]:
+    """
+    Yield `(rtcm_path, index_records)` for the frames inside [start_gps, end_gps]
+    with the given message types. Files entirely outside the range are skipped
+    after looking only at their first and last index records.
+    """
+    for path in list_captures(capture_dir, stream_name):
+        records = select_records(read_index(path), start_gps, end_gps, msg_types)
+        if len(records):
+            yield path, records
+
+
+def iter_frames(capture_dir: str, start_gps: Optional[float] = None, end_gps: Optional[float] = None,
+                msg_types: Optional[Sequence[int]] = None,
+                stream_name: Optional[str] = None) -> Iterator[Tuple[bytes, np.void]]:
+    """Yield `(raw_frame, index_record)` for every matching frame, in file order."""
+    for path, records in find_frames(capture_dir, start_gps, end_gps, msg_types, stream_name):
+        yield from read_frames(path, records)
@@ -0,0 +1,359 @@
+"""
+Synthetic RTCM 3 traffic: MSM7 observations and broadcast ephemerides.
+
+Used by the local mock caster (`core/mock_caster.py`) and the benchmarks.
+Satellites follow simple Keplerian orbits propagated with `BE2pos.SatPos_brdc`,
+so the ephemerides broadcast for GPS/Galileo/BeiDou reproduce the same
+positions that the observations were generated from and `RTCMHandler`
+computes consistent az/el. GLONASS observations are generated from the same
+kind of orbit but no 1020 ephemeris is sent.
+
+Field widths and scale factors come from pyrtcm's own tables, so every frame
+(including the CRC-24Q) decodes with `RTCMReader`.
+"""
+import math
+import random
+from typing import Dict, List, Optional, Sequence
+
+from pyrtcm import INT, INTS, RTCM_DATA_FIELDS, RTCM_PAYLOADS_GET, calc_crc24q
+from pyrtcm.rtcmtables import BEIDOU_SIG_MAP, GALILEO_SIG_MAP, GLONASS_SIG_MAP, GPS_SIG_MAP
+
+import core.BE2pos as BE2pos
+from core.geo_utils import calculate_az_el
+from core.gnss_time import BDT_OFFSET, LEAP_SECONDS, SECONDS_PER_DAY, SECONDS_PER_WEEK
+
+CLIGHT = 299792458.0
+RANGE_MS = CLIGHT / 1000.0
+
+DEFAULT_REC_POS = [-2267750.0, 5009154.0, 3221290.0]
+
+# Per system: MSM7 message number, signal map, default signals, orbit shape
+# (sqrtA, inclination [semicircles], planes, satellites) and ephemeris message.
+SYSTEMS = {
+    "G": {"msm7": 1077, "sig_map": GPS_SIG_MAP, "signals": ["1C", "2W", "5Q", "2L"],
+          "sqrtA": 5153.7, "i0": 0.3056, "planes": 6, "n_total": 32, "eph": 1019},
+    "R": {"msm7": 1087, "sig_map": GLONASS_SIG_MAP, "signals": ["1C", "2C", "1P", "2P"],
+          "sqrtA": 5050.8, "i0": 0.3600, "planes": 3, "n_total": 24, "eph": None},
+    "E": {"msm7": 1097, "sig_map": GALILEO_SIG_MAP, "signals": ["1C", "5Q", "7Q", "6C"],
+          "sqrtA": 5440.6, "i0": 0.3111, "planes": 3, "n_total": 30, "eph": 1046},
+    "C": {"msm7": 1127, "sig_map": BEIDOU_SIG_MAP, "signals": ["2I", "6I", "7I", "5P"],
+          "sqrtA": 5282.6, "i0": 0.3056, "planes": 3, "n_total": 35, "eph": 1042},
+}
+
+
+# -----------------------------------------------------------------------------
+# Bit-level encoding
+# -----------------------------------------------------------------------------
+class BitWriter:
+    """MSB-first bit packer for RTCM payloads."""
+    def __init__(self):
+        self._value = 0
+        self._nbits = 0
+
+    def put(self, value: int, nbits: int, signed: bool = False, sign_magnitude: bool = False):
+        if nbits == 0:
+            return
+        value = int(value)
+        if sign_magnitude:
+            mag = abs(value)
+            if mag >= 1 << (nbits - 1):
+                raise ValueError(f"{value} does not fit in {nbits}-bit sign-magnitude field")
+            value = ((1 << (nbits - 1)) if value < 0 else 0) | mag
+        elif signed:
+            if not -(1 << (nbits - 1)) <= value < (1 << (nbits - 1)):
+                raise ValueError(f"{value} does not fit in {nbits}-bit signed field")
+            value &= (1 << nbits) - 1
+        elif not 0 <= value < (1 << nbits):
+            raise ValueError(f"{value} does not fit in {nbits}-bit unsigned field")
+        self._value = (self._value << nbits) | value
+        self._nbits += nbits
+
+    def put_df(self, df: str, value):
+        """Pack a scaled value for data field `df` using pyrtcm's width/resolution."""
+        dtype, nbits, res, _ = RTCM_DATA_FIELDS[df]
+        raw = round(value / res) if res not in (0, 1) else int(value)
+        self.put(raw, nbits, signed=(dtype == INT), sign_magnitude=(dtype == INTS))
+
+    def to_bytes(self) -> bytes:
+        pad = -self._nbits % 8
+        n_bytes = (self._nbits + pad) // 8
+        return (self._value << pad).to_bytes(n_bytes, "big")
+
+
+def frame(payload: bytes) -> bytes:
+    """Wrap a payload in an RTCM 3 transport frame with CRC-24Q."""
+    header = bytes([0xD3, (len(payload) >> 8) & 0x03, len(payload) & 0xFF])
+    body = header + payload
+    return body + calc_crc24q(body).to_bytes(3, "big")
+
+
+def encode_fields(msg_num: int, values: Dict[str, float]) -> bytes:
+    """Encode a flat (non-repeating) message from pyrtcm's payload definition."""
+    w = BitWriter()
+    for df in RTCM_PAYLOADS_GET[str(msg_num)]:
+        w.put_df(df, msg_num if df == "DF002" else values.get(df, 0))
+    return frame(w.to_bytes())
+
+
+def _sig_ids(sys_id: str) -> Dict[str, int]:
+    """Reverse MSM signal map: RINEX code -> signal mask id (lowest id wins)."""
+    out = {}
+    for sig_id, (_, code) in sorted(SYSTEMS[sys_id]["sig_map"].items()):
+        out.setdefault(code, sig_id)
+    return out
+
+
+_SIG_IDS = {sys_id: _sig_ids(sys_id) for sys_id in SYSTEMS}
+
+
+def encode_msm7(sys_id: str, station_id: int, epoch_fields: Sequence[tuple], sats: List[dict],
+                multiple: bool = False) -> bytes:
+    """
+    Encode one MSM7 message.
+
+    Args:
+        sys_id: 'G', 'R', 'E' or 'C'.
+        epoch_fields: [(data_field, value), ...] epoch time fields.
+        sats: [{'prn', 'range', 'rate', 'fcn', 'signals': {code: (snr, lock, pr_m, ph_m)}}]
+            with ranges in metres and rates in m/s.
+        multiple: set the multiple message bit (more MSMs follow for this epoch).
+    """
+    sig_ids = _SIG_IDS[sys_id]
+    sats = sorted(sats, key=lambda s: s["prn"])
+    used_sigs = sorted({sig_ids[c] for s in sats for c in s["signals"]})
+    code_of = {sig_ids[c]: c for s in sats for c in s["signals"]}
+
+    w = BitWriter()
+    w.put_df("DF002", SYSTEMS[sys_id]["msm7"])
+    w.put_df("DF003", station_id)
+    for df, value in epoch_fields:
+        w.put_df(df, value)
+    w.put(1 if multiple else 0, 1)       # DF393
+    w.put(0, 3)                          # DF409 IODS
+    w.put(0, 7)                          # reserved
+    w.put(0, 2)                          # DF411
+    w.put(0, 2)                          # DF412
+    w.put(0, 1)                          # DF417
+    w.put(0, 3)                          # DF418
+
+    sat_mask = 0
+    for s in sats:
+        sat_mask |= 1 << (64 - s["prn"])
+    sig_mask = 0
+    for sig in used_sigs:
+        sig_mask |= 1 << (32 - sig)
+    w.put(sat_mask, 64)
+    w.put(sig_mask, 32)
+
+    cells = []
+    for s in sats:
+        for sig in used_sigs:
+            present = code_of[sig] in s["signals"]
+            w.put(1 if present else 0, 1)
+            if present:
+                cells.append((s, s["signals"][code_of[sig]]))
+
+    # Satellite data: rough range (int ms + 1/1024 ms), ext info, rough rate
+    rough = {}
+    for s in sats:
+        rough_raw = round(s["range"] / RANGE_MS * 1024)
+        rough[s["prn"]] = (rough_raw, rough_raw / 1024.0, int(round(s["rate"])))
+    for s in sats:
+        w.put(rough[s["prn"]][0] >> 10, 8)
+    for s in sats:
+        w.put((s.get("fcn", 0) + 7) if sys_id == "R" else 0, 4)
+    for s in sats:
+        w.put(rough[s["prn"]][0] & 0x3FF, 10)
+    for s in sats:
+        w.put(rough[s["prn"]][2], 14, signed=True)
+
+    # Signal data
+    for s, (snr, lock, pr_m, ph_m) in cells:
+        w.put_df("DF405", pr_m / RANGE_MS - rough[s["prn"]][1])
+    for s, (snr, lock, pr_m, ph_m) in cells:
+        w.put_df("DF406", ph_m / RANGE_MS - rough[s["prn"]][1])
+    for s, (snr, lock, pr_m, ph_m) in cells:
+        w.put(lock, 10)
+    for _ in cells:
+        w.put(0, 1)                      # DF420 half-cycle
+    for s, (snr, lock, pr_m, ph_m) in cells:
+        w.put_df("DF408", snr)
+    for s, (snr, lock, pr_m, ph_m) in cells:
+        w.put_df("DF404", s["rate"] - rough[s["prn"]][2])
+    return frame(w.to_bytes())
+
+
+# -----------------------------------------------------------------------------
+# Synthetic station
+# -----------------------------------------------------------------------------
+class SyntheticStation:
+    """
+    Generates MSM7 + ephemeris frames for one reference station.
+
+    Args:
+        station_id: RTCM reference station id (DF003).
+        rec_pos: receiver ECEF position [m].
+        systems: constellations to generate, e.g. "GREC".
+        n_sats: satellites per constellation and epoch (highest elevation first).
+        n_signals: signals per satellite (1-4).
+        seed: seed for the SNR noise, so runs are reproducible.
+        geometry_interval: seconds between full orbit evaluations; in between,
+            ranges are extrapolated with the range rate (keeps high rates cheap).
+    """
+    def __init__(self, station_id: int = 0, rec_pos: Optional[Sequence[float]] = None,
+                 systems: str = "GREC", n_sats: int = 10, n_signals: int = 2, seed: int = 0,
+                 geometry_interval: float = 1.0):
+        self.station_id = station_id
+        self.rec_pos = list(rec_pos or DEFAULT_REC_POS)
+        self.systems = [s for s in systems if s in SYSTEMS]
+        self.n_sats = n_sats
+        self.n_signals = max(1, min(n_signals, 4))
+        self._rng = random.Random(seed)
+        self.geometry_interval = geometry_interval
+        self._ephs = {}
+        self._geometry = {}
+
+    # --- orbits ---
+    def _ephemeris(self, sys_id: str, prn: int, gps_seconds: float) -> dict:
+        """Keplerian elements for a satellite (BE2pos dict, radians), new set every 2 h."""
+        spec = SYSTEMS[sys_id]
+        week = int(gps_seconds // SECONDS_PER_WEEK)
+        tow = self._sat_time(sys_id, gps_seconds)
+        toe = tow - (tow % 7200)
+        cached = self._ephs.get(sys_id)
+        if cached is None or cached[0] != (week, toe):
+            cached = ((week, toe), {})
+            self._ephs[sys_id] = cached
+        if prn in cached[1]:
+            return cached[1][prn]
+
+        plane = (prn - 1) % spec["planes"]
+        slot = (prn - 1) // spec["planes"]
+        per_plane = math.ceil(spec["n_total"] / spec["planes"])
+        # Elements in semicircles as broadcast; BE2pos works in radians.
+        eph_sc = {
+            "M0": ((slot / per_plane) * 2 + plane * 0.2) % 2 - 1,
+            "OMEGA0": (plane / spec["planes"]) * 2 - 1,
+            "i0": spec["i0"],
+            "omega": 0.1,
+            "Delta_n": 1.4e-9,
+            "OMEGA_DOT": -2.6e-9,
+            "IDOT": 1.0e-10,
+        }
+        eph = {k: v * math.pi for k, v in eph_sc.items()}
+        eph.update({
+            "sqrtA": spec["sqrtA"], "Eccentricity": 0.005, "Toe": toe, "Toc": toe,
+            "Cuc": 0.0, "Cus": 0.0, "Crc": 0.0, "Crs": 0.0, "Cic": 0.0, "Cis": 0.0,
+            "Week": week, "PRN": prn, "_sc": eph_sc,
+        })
+        cached[1][prn] = eph
+        return eph
+
+    @staticmethod
+    def _sat_time(sys_id: str, gps_seconds: float) -> float:
+        """Time of week in the constellation's own time scale (BDT for BeiDou)."""
+        if sys_id == "C":
+            gps_seconds -= BDT_OFFSET
+        return gps_seconds % SECONDS_PER_WEEK
+
+    def visible_satellites(self, sys_id: str, gps_seconds: float) -> List[dict]:
+        """The `n_sats` highest satellites with range, range rate and az/el."""
+        cached = self._geometry.get(sys_id)
+        if cached is None or not 0 <= gps_seconds - cached[0] < self.geometry_interval:
+            cached = (gps_seconds, self._compute_geometry(sys_id, gps_seconds))
+            self._geometry[sys_id] = cached
+        dt = gps_seconds - cached[0]
+        return [dict(s, range=s["range"] + s["rate"] * dt) for s in cached[1]]
+
+    def _compute_geometry(self, sys_id: str, gps_seconds: float) -> List[dict]:
+        t = self._sat_time(sys_id, gps_seconds)
+        out = []
+        for prn in range(1, SYSTEMS[sys_id]["n_total"] + 1):
+            eph = self._ephemeris(sys_id, prn, gps_seconds)
+            pos, vel = BE2pos.SatPos_brdc(t, eph)
+            los = [pos[k] - self.rec_pos[k] for k in range(3)]
+            rng = math.sqrt(sum(v * v for v in los))
+            rate = sum(vel[k] * los[k] for k in range(3)) / rng
+            az, el = calculate_az_el(pos, self.rec_pos)
+            out.append({"prn": prn, "range": float(rng), "rate": float(rate), "az": az, "el": el,
+                        "fcn": (prn % 14) - 7})
+        out.sort(key=lambda s: s["el"], reverse=True)
+        return out[: self.n_sats]
+
+    # --- messages ---
+    def _epoch_fields(self, sys_id: str, gps_seconds: float):
+        if sys_id == "R":
+            utc = gps_seconds - LEAP_SECONDS
+            moscow = utc + 3 * 3600
+            # GPS epoch (1980-01-06) was a Sunday, so day 0 = Sunday.
+            dow = int(moscow // SECONDS_PER_DAY) % 7
+            tod_ms = int(round((moscow % SECONDS_PER_DAY) * 1000)) % (SECONDS_PER_DAY * 1000)
+            return [("DF416", dow), ("DF034", tod_ms)]
+        tow = self._sat_time(sys_id, gps_seconds)
+        df = {"G": "DF004", "E": "DF248", "C": "DF427"}[sys_id]
+        return [(df, int(round(tow * 1000)) % (SECONDS_PER_WEEK * 1000))]
+
+    def epoch_frames(self, gps_seconds: float) -> List[bytes]:
+        """All MSM7 frames for one epoch (split when a message would exceed 64 cells)."""
+        jobs = []
+        for sys_id in self.systems:
+            codes = SYSTEMS[sys_id]["signals"][: self.n_signals]
+            sats = []
+            for s in self.visible_satellites(sys_id, gps_seconds):
+                base_snr = 25.0 + 25.0 * math.sin(math.radians(max(s["el"], 0.0)))
+                s["signals"] = {
+                    code: (
+                        min(max(base_snr - 3.0 * k + self._rng.gauss(0, 1.0), 1.0), 63.0),
+                        int(gps_seconds) % 1024,
+                        s["range"] + 0.5 * k,
+                        s["range"],
+                    )
+                    for k, code in enumerate(codes)
+                }
+                sats.append(s)
+            per_msg = max(1, 64 // len(codes))
+            for i in range(0, len(sats), per_msg):
+                jobs.append((sys_id, sats[i:i + per_msg]))
+
+        frames = []
+        for n, (sys_id, sats) in enumerate(jobs):
+            frames.append(encode_msm7(sys_id, self.station_id, self._epoch_fields(sys_id, gps_seconds),
+                                      sats, multiple=n < len(jobs) - 1))
+        return frames
+
+    def ephemeris_frames(self, gps_seconds: float) -> List[bytes]:
+        """Broadcast ephemerides (1019/1046/1042) for the satellites currently in view."""
+        frames = []
+        for sys_id in self.systems:
+            msg_num = SYSTEMS[sys_id]["eph"]
+            if msg_num is None:
+                continue
+            for s in self.visible_satellites(sys_id, gps_seconds):
+                frames.append(self._encode_eph(sys_id, msg_num, self._ephemeris(sys_id, s["prn"], gps_seconds)))
+        return frames
+
+    def station_frame(self) -> bytes:
+        """1005 stationary antenna reference point."""
+        x, y, z = self.rec_pos
+        return encode_fields(1005, {"DF003": self.station_id, "DF022": 1, "DF023": 1, "DF024": 1,
+                                    "DF025": x, "DF026": y, "DF027": z})
+
+    @staticmethod
+    def _encode_eph(sys_id: str, msg_num: int, eph: dict) -> bytes:
+        sc = eph["_sc"]
+        orbit = (eph["sqrtA"], eph["Eccentricity"], sc["M0"], sc["omega"], sc["i0"], sc["OMEGA0"],
+                 sc["Delta_n"], sc["OMEGA_DOT"], sc["IDOT"])
+        if sys_id == "G":
+            names = ("DF092", "DF090", "DF088", "DF099", "DF097", "DF095", "DF087", "DF100", "DF079")
+            values = {"DF009": eph["PRN"], "DF076": (eph["Week"] - 2048) % 1024,
+                      "DF093": eph["Toe"], "DF081": eph["Toc"]}
+        elif sys_id == "E":
+            names = ("DF303", "DF301", "DF299", "DF310", "DF308", "DF306", "DF298", "DF311", "DF292")
+            values = {"DF252": eph["PRN"], "DF289": eph["Week"] - 1024,
+                      "DF304": eph["Toe"], "DF293": eph["Toc"]}
+        else:
+            names = ("DF504", "DF502", "DF500", "DF511", "DF509", "DF507", "DF499", "DF512", "DF491")
+            values = {"DF488": eph["PRN"], "DF489": eph["Week"] - 1356,
+                      "DF505": eph["Toe"], "DF493": eph["Toc"]}
+        values.update(zip(names, orbit))
+        return encode_fields(msg_num, values)
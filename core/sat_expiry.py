@@ -0,0 +1,87 @@
+"""
+Deadline-ordered expiry of satellites that stopped reporting.
+
+`SatelliteExpiry` keeps the last-seen time per PRN and a min-heap of check
+deadlines holding at most one entry per PRN. `touch` only records the time
+(no heap work per observation); `expire(now)` pops the due entries and either
+drops the PRN or, if it was seen since the entry was scheduled, pushes it
+again at its new deadline. A tick therefore costs O((expired + rescheduled)
+log n) instead of a scan of every tracked satellite.
+
+Timeouts are per PRN or per constellation, e.g. from config:
+
+    SAT_EXPIRY = {"DEFAULT": 5.0, "S": 30.0, "C01": 30.0}
+
+A full PRN key takes precedence over its system letter, then `DEFAULT`.
+"""
+import heapq
+from typing import Dict, List, Optional
+
+
+class SatelliteExpiry:
+    """Last-seen tracking with per-system timeouts. Not thread-safe: use from one thread."""
+    def __init__(self, timeouts: Optional[Dict[str, float]] = None, default: float = 5.0):
+        timeouts = dict(timeouts or {})
+        self.default = float(timeouts.pop("DEFAULT", default))
+        self.timeouts = {k: float(v) for k, v in timeouts.items()}
+        self._last_seen: Dict[str, float] = {}
+        self._heap: List[tuple] = []           # (deadline, prn)
+        self._scheduled: Dict[str, float] = {}  # prn -> deadline of its heap entry
+
+    @classmethod
+    def from_config(cls, cfg_module) -> "SatelliteExpiry":
+        return cls(getattr(cfg_module, "SAT_EXPIRY", None))
+
+    def timeout_for(self, prn: str) -> float:
+        t = self.timeouts.get(prn)
+        if t is None:
+            t = self.timeouts.get(prn[:1], self.default)
+        return t
+
+    def touch(self, prn: str, now: float):
+        """Record an observation of `prn` at `now`."""
+        self._last_seen[prn] = now
+        if prn not in self._scheduled:
+            deadline = now + self.timeout_for(prn)
+            self._scheduled[prn] = deadline
+            heapq.heappush(self._heap, (deadline, prn))
+
+    def expire(self, now: float) -> List[str]:
+        """Forget and return the PRNs not seen within their timeout."""
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, prn = heapq.heappop(heap)
+            if self._scheduled.get(prn) != deadline:
+                continue  # discarded (and possibly re-added) since this entry was pushed
+            due = self._last_seen[prn] + self.timeout_for(prn)
+            if due <= now:
+                del self._scheduled[prn]
+                del self._last_seen[prn]
+                expired.append(prn)
+            else:
+                self._scheduled[prn] = due
+                heapq.heappush(heap, (due, prn))
+        return expired
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest time at which `expire` can return something (None if nothing is tracked)."""
+        return self._heap[0][0] if self._heap else None
+
+    def discard(self, prn: str):
+        self._last_seen.pop(prn, None)
+        self._scheduled.pop(prn, None)  # its heap entry is skipped when popped
+
+    def clear(self):
+        self._last_seen.clear()
+        self._scheduled.clear()
+        self._heap.clear()
+
+    def last_seen(self, prn: str) -> Optional[float]:
+        return self._last_seen.get(prn)
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+    def __contains__(self, prn: str) -> bool:
+        return prn in self._last_seen
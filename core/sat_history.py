@@ -0,0 +1,139 @@
+"""
+Raw per-satellite SNR/elevation history for the SNR plots.
+
+`SatHistory` keeps, per PRN, a fixed-capacity ring of columns: time (unix
+seconds, float64), elevation (float32) and one float32 SNR column per signal
+slot (NaN where the signal was not observed). Each sample is written twice,
+at `i` and `i + capacity` ("mirrored" ring), so the newest `n` samples are
+always one contiguous range and `get` returns slices of the buffers without
+copying or reordering.
+
+Not thread-safe: append and read from the GUI thread.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class _Ring:
+    __slots__ = ("cap", "head", "count", "t", "el", "snr", "slots")
+
+    def __init__(self, cap: int, n_slots: int = 4):
+        self.cap = cap
+        self.head = 0
+        self.count = 0
+        self.t = np.empty(2 * cap)
+        self.el = np.empty(2 * cap, dtype=np.float32)
+        self.snr = np.empty((2 * cap, n_slots), dtype=np.float32)
+        self.slots: Dict[str, int] = {}
+
+    def _add_slot(self, sig: str):
+        slot = self.slots[sig] = len(self.slots)
+        if slot >= self.snr.shape[1]:
+            snr = np.full((2 * self.cap, 2 * self.snr.shape[1]), np.nan, dtype=np.float32)
+            snr[:, :self.snr.shape[1]] = self.snr
+            self.snr = snr
+        else:
+            self.snr[:, slot] = np.nan
+
+    def append(self, t: float, el: float, snr_map: Dict[str, float]):
+        slots = self.slots
+        row = [np.nan] * self.snr.shape[1]
+        for sig, v in snr_map.items():
+            slot = slots.get(sig)
+            if slot is None:
+                self._add_slot(sig)
+                row = row + [np.nan] * (self.snr.shape[1] - len(row))
+                slot = slots[sig]
+            row[slot] = v
+        cap = self.cap
+        if self.count < cap:
+            i = self.head + self.count
+            if i >= cap:
+                i -= cap
+            self.count += 1
+        else:
+            i = self.head  # full: overwrite the oldest sample
+            self.head = i + 1 if i + 1 < cap else 0
+        j = i + cap
+        self.t[i] = self.t[j] = t
+        self.el[i] = self.el[j] = el
+        self.snr[i] = row
+        self.snr[j] = row
+
+    def view(self) -> Dict[str, object]:
+        sl = slice(self.head, self.head + self.count)
+        n_sig = len(self.slots)
+        return {"time": self.t[sl], "el": self.el[sl], "signals": sorted(self.slots, key=self.slots.get),
+                "snr": self.snr[sl, :n_sig]}
+
+    def nbytes(self) -> int:
+        return self.t.nbytes + self.el.nbytes + self.snr.nbytes
+
+
+class SatHistory:
+    """Per-PRN raw history, `maxlen` newest samples each."""
+    def __init__(self, maxlen: int = 500):
+        self.maxlen = maxlen
+        self._rings: Dict[str, _Ring] = {}
+
+    def append(self, prn: str, t: float, el: Optional[float], snr_map: Dict[str, float]):
+        """Add one sample: unix time, elevation in deg (None if unknown), {signal: SNR}."""
+        ring = self._rings.get(prn)
+        if ring is None:
+            ring = self._rings[prn] = _Ring(self.maxlen)
+        ring.append(t, np.nan if el is None else el, snr_map)
+
+    def get(self, prn: str) -> Optional[Dict[str, object]]:
+        """
+        {'time', 'el', 'signals', 'snr'} of `prn`, oldest first: views into the
+        ring (valid until the next append), SNR as rows x signals. None if unknown.
+        """
+        ring = self._rings.get(prn)
+        return ring.view() if ring is not None else None
+
+    def __contains__(self, prn: str) -> bool:
+        return prn in self._rings
+
+    def __delitem__(self, prn: str):
+        del self._rings[prn]
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def prns(self) -> List[str]:
+        return list(self._rings)
+
+    def clear(self):
+        self._rings.clear()
+
+    def size(self) -> int:
+        """Samples held over all PRNs."""
+        return sum(r.count for r in self._rings.values())
+
+    def memory_bytes(self) -> int:
+        return sum(r.nbytes() for r in self._rings.values())
+
+    def resize(self, maxlen: int):
+        """
+        Change the per-PRN capacity. Histories longer than the new capacity are
+        downsampled (newest sample kept, evenly strided) so the time span survives.
+        """
+        self.maxlen = maxlen
+        for prn, ring in list(self._rings.items()):
+            v = ring.view()
+            n = len(v["time"])
+            idx = np.arange(n)
+            if n > maxlen:
+                step = -(-n // maxlen)
+                idx = idx[::-1][::step][::-1]
+            new = _Ring(maxlen, max(4, len(ring.slots)))
+            new.slots = dict(ring.slots)
+            k = len(idx)
+            for dst in (slice(0, k), slice(maxlen, maxlen + k)):
+                new.t[dst] = v["time"][idx]
+                new.el[dst] = v["el"][idx]
+                new.snr[dst] = np.nan
+                new.snr[dst, :len(ring.slots)] = v["snr"][idx]
+            new.count = k
+            self._rings[prn] = new
@@ -0,0 +1,116 @@
+"""
+Versioned, immutable views of the latest satellite states for the GUI.
+
+`SatelliteTracker` holds the latest `SatelliteState` per PRN, partitioned by
+constellation (MSM epochs arrive one constellation at a time). `snapshot()`
+returns a `SatelliteSnapshot`: a read-only mapping built at most once per
+change, in which only the partitions touched since the previous snapshot are
+copied and the others are shared. Every partition carries the version it was
+last rebuilt at, so a consumer can compare `view_key(active_systems)` with the
+key it last rendered and skip the work when none of the constellations it
+shows has changed.
+
+Satellite states are replaced per epoch, never mutated, so the snapshot can
+share them with the tracker.
+"""
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, Tuple
+
+from core.data_models import SatelliteState
+
+_EMPTY = MappingProxyType({})
+
+
+class SatelliteSnapshot(Mapping):
+    """Read-only {'G01': SatelliteState, ...} at one version."""
+    __slots__ = ("version", "_parts", "_versions")
+
+    def __init__(self, version: int, parts: Dict[str, Mapping], versions: Dict[str, int]):
+        self.version = version
+        self._parts = parts
+        self._versions = versions
+
+    def __getitem__(self, key: str) -> SatelliteState:
+        return self._parts.get(key[:1], _EMPTY)[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for part in self._parts.values():
+            yield from part
+
+    def __len__(self) -> int:
+        return sum(len(part) for part in self._parts.values())
+
+    def system(self, sys_id: str) -> Mapping:
+        """Satellites of one constellation."""
+        return self._parts.get(sys_id, _EMPTY)
+
+    def system_version(self, sys_id: str) -> int:
+        return self._versions.get(sys_id, 0)
+
+    def view_key(self, active_systems: Iterable[str]) -> Tuple[Tuple[str, int], ...]:
+        """Changes whenever anything a consumer showing `active_systems` draws has changed."""
+        return tuple((s, self._versions.get(s, 0)) for s in sorted(active_systems))
+
+    def counts(self) -> Dict[str, int]:
+        """Satellites per constellation."""
+        return {s: len(part) for s, part in self._parts.items() if part}
+
+
+class SatelliteTracker:
+    """
+    Latest satellite state per PRN. Written by the GUI thread; `snapshot()`
+    may be taken from any thread.
+    """
+    def __init__(self):
+        self._parts: Dict[str, Dict[str, SatelliteState]] = {}
+        self._frozen: Dict[str, Mapping] = {}
+        self._versions: Dict[str, int] = {}
+        self._dirty = set()
+        self._version = 0
+        self._snapshot = SatelliteSnapshot(0, {}, {})
+        self._lock = threading.Lock()
+
+    def update(self, key: str, sat: SatelliteState):
+        with self._lock:
+            part = self._parts.get(key[:1])
+            if part is None:
+                part = self._parts[key[:1]] = {}
+            part[key] = sat
+            self._dirty.add(key[:1])
+
+    def discard(self, key: str) -> bool:
+        with self._lock:
+            part = self._parts.get(key[:1])
+            if part is None or part.pop(key, None) is None:
+                return False
+            self._dirty.add(key[:1])
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._dirty.update(self._parts)
+            for part in self._parts.values():
+                part.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(part) for part in self._parts.values())
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._parts.get(key[:1], ())
+
+    def snapshot(self) -> SatelliteSnapshot:
+        """Current snapshot; rebuilt only when something changed since the last call."""
+        with self._lock:
+            if not self._dirty:
+                return self._snapshot
+            self._version += 1
+            for sys_id in self._dirty:
+                self._frozen[sys_id] = MappingProxyType(dict(self._parts[sys_id]))
+                self._versions[sys_id] = self._version
+            self._dirty.clear()
+            self._snapshot = SatelliteSnapshot(self._version, dict(self._frozen), dict(self._versions))
+            return self._snapshot
@@ -2,17 +2,28 @@
 import sys
 import time
 import threading
+import signal
 from pyrtcm import RTCMReader
 
 import config
 from core.ntrip_client import NtripClient
 from core.rtcm_handler import RTCMHandler
 from core.process import process_epoch
+from core.output_sinks import build_sinks, SinkWriter
+from core.rtcm_recorder import RtcmRecorder
+from core.replay import ReplayClient
+from core.instrumentation import PIPELINE, EPOCH_LATENCY, configure_from
+from core import metrics_server
+from core import profiler
+from core import memory_report
 
 
-def stream_thread(name, client, handler):
+def stream_thread(name, client, handler, writer=None, recorder=None, stats=None):
+    stats = stats or metrics_server.StreamStats(name)
     while True:
         sock = client.connect()
+        if getattr(client, "finished", False):
+            break
         if not sock:
             print(f"[{name}] Failed to connect. Retry in 3s...")
             time.sleep(3)
@@ -20,38 +31,184 @@ def stream_thread(name, client, handler):
 
         try:
             reader = RTCMReader(sock)
+            reader.parse = PIPELINE.timed("io_parse", RTCMReader.parse)
             print(f"[{name}] Connected. Start streaming...")
+            stats.on_connect()
+            t_start = time.perf_counter()
+            n_msgs = 0
 
             for raw, msg in reader:
+                profiler.PROFILER.checkpoint()
                 if msg is None:
                     continue
+                n_msgs += 1
+                stats.on_frame(raw)
+                if recorder is not None:
+                    recorder.record(raw, msg)
 
+                recv_time = time.time()
+                t0 = time.perf_counter()
                 epoch_data = handler.process_message(msg)
+                decode_time = time.perf_counter() - t0
+                stats.on_message(msg.identity, decode_time)
+                PIPELINE.record("decode", decode_time)
                 if epoch_data:
-                    process_epoch(epoch_data)
+                    stats.on_epoch(epoch_data, recv_time)
+                    if PIPELINE.enabled:
+                        EPOCH_LATENCY.stamp(epoch_data, msg, name, recv_time)
+                    process_epoch(epoch_data, writer)
+                    if PIPELINE.enabled:
+                        EPOCH_LATENCY.record_epoch(epoch_data)  # "render" = handed to the output
+
+            if isinstance(client, ReplayClient):
+                elapsed = time.perf_counter() - t_start
+                print(f"[{name}] Replayed {n_msgs} msgs in {elapsed:.1f}s ({n_msgs / max(elapsed, 1e-9):.0f} msg/s)")
 
         except Exception as e:
             print(f"[{name}] Stream error: {e}")
 
         finally:
+            stats.on_disconnect()
             client.close()
-            time.sleep(2)
+            if not isinstance(client, ReplayClient):
+                time.sleep(2)
+
+
+def create_writer():
+    """Start the background output writer configured by `config.OUTPUT`."""
+    output_cfg = getattr(config, "OUTPUT", {})
+    specs = output_cfg.get("SINKS", [{"type": "summary"}])
+    writer = SinkWriter(
+        build_sinks(specs),
+        flush_interval=output_cfg.get("FLUSH_INTERVAL", 1.0),
+    )
+    writer.start()
+    return writer
+
+
+def create_recorder(name):
+    """Start a raw RTCM recorder for one stream if `config.RECORD` is set."""
+    record_cfg = getattr(config, "RECORD", {})
+    if not record_cfg.get("DIR"):
+        return None
+    recorder = RtcmRecorder(name, record_cfg["DIR"],
+                            rotate_seconds=record_cfg.get("ROTATE_SECONDS", 3600))
+    recorder.start()
+    print(f"[{name}] Recording raw RTCM to {record_cfg['DIR']}")
+    return recorder
+
+
+def start_metrics(handler, writer, stream_stats):
+    """Serve `config.METRICS` (Prometheus text) for this process, if configured."""
+    try:
+        server = metrics_server.start_from(config)
+    except OSError as e:
+        print(f"[Main] Metrics endpoint not started: {e}")
+        return None
+    if server is None:
+        return None
+
+    def collect():
+        sats = {}
+        for stats in stream_stats:
+            for sys_id, n in stats.satellites_tracked().items():
+                sats[sys_id] = max(sats.get(sys_id, 0), n)
+        return (metrics_server.stream_metrics(stream_stats)
+                + metrics_server.writer_metrics(writer)
+                + metrics_server.ephemeris_metrics(handler)
+                + metrics_server.satellite_metrics(sats))
+
+    metrics_server.REGISTRY.set_collector("main", collect)
+    print(f"[Main] Metrics: http://{server.host}:{server.port}/metrics")
+    return server
+
+
+def install_profile_signal():
+    """SIGUSR1 profiles all stream threads for `config.PROFILER["SECONDS"]` (POSIX only)."""
+    if not hasattr(signal, "SIGUSR1"):
+        return
+
+    def on_done(paths):
+        print("[Profile] Wrote " + ", ".join(paths))
+
+    def handle(signum, frame):
+        session = profiler.start_from(config, on_done=on_done)
+        if session is None:
+            print("[Profile] A profile is already running")
+        else:
+            print(f"[Profile] Profiling for {session.seconds:g}s -> {session.out_dir}")
+
+    signal.signal(signal.SIGUSR1, handle)
+
+
+def install_memory_signal():
+    """
+    SIGUSR2 prints the memory report; with tracemalloc on it also snapshots,
+    prints the growth since the previous snapshot and dumps it (POSIX only).
+    """
+    if not hasattr(signal, "SIGUSR2"):
+        return
+
+    def handle(signum, frame):
+        print(f"[Memory]\n{memory_report.MEMORY.format_report()}")
+        tracker = memory_report.TRACEMALLOC
+        if tracker.tracing:
+            tracker.take()
+            print(tracker.diff("previous"))
+            path = tracker.dump_latest(getattr(config, "MEMORY", {}).get("DIR"))
+            print(f"[Memory] Snapshot written to {path}")
+
+    signal.signal(signal.SIGUSR2, handle)
+
+
+def register_memory_sources(handler, writer, stream_stats):
+    """Structures listed by the memory report (SIGUSR2 / `MEMORY.LOG_INTERVAL`)."""
+    mem = memory_report.MEMORY
+    mem.register("ephemeris_cache", lambda: handler.ephemeris_cache)
+    mem.register("output_queue", lambda: writer._queue.queue)
+    mem.register("sat_last_seen", lambda: [s.sat_last_seen for s in stream_stats],
+                 count=lambda seen: sum(len(d) for d in seen))
 
 
 def main():
+    configure_from(config)
+    memory_report.configure_from(config)
+    install_profile_signal()
+    install_memory_signal()
+    memory_interval = getattr(config, "MEMORY", {}).get("LOG_INTERVAL", 0)
+    log_interval = getattr(config, "INSTRUMENTATION", {}).get("LOG_INTERVAL", 60)
+    writer = create_writer()
+    recorders = []
+    stream_stats = []
+
+    # Replay: recorded captures (all streams merged) replace both casters
+    replay_cfg = getattr(config, "REPLAY", {})
+    replay_enabled = bool(replay_cfg.get("PATH"))
+
     # Caster：MSM 
-    client_obs = NtripClient(
-        config.NTRIP_HOST,
-        config.NTRIP_PORT,
-        config.MOUNTPOINT,
-        config.USER,
-        config.PASSWORD
-    )
+    if replay_enabled:
+        client_obs = ReplayClient(replay_cfg["PATH"], speed=replay_cfg.get("SPEED", 1.0))
+    else:
+        client_obs = NtripClient(
+            config.NTRIP_HOST,
+            config.NTRIP_PORT,
+            config.MOUNTPOINT,
+            config.USER,
+            config.PASSWORD
+        )
 
     handler = RTCMHandler()
+    metrics = start_metrics(handler, writer, stream_stats)
+    register_memory_sources(handler, writer, stream_stats)
+    rec_obs = create_recorder("OBS")
+    if rec_obs:
+        recorders.append(rec_obs)
+    stats_obs = metrics_server.StreamStats("OBS")
+    stream_stats.append(stats_obs)
     t_obs = threading.Thread(
         target=stream_thread,
-        args=("OBS", client_obs, handler),
+        name="OBS",
+        args=("OBS", client_obs, handler, writer, rec_obs, stats_obs),
         daemon=True
     )
     t_obs.start()
@@ -60,7 +217,8 @@ def main():
 
     # Caster - BRDC
     eph_enabled = (
-        hasattr(config, "EPH_HOST")
+        not replay_enabled
+        and hasattr(config, "EPH_HOST")
         and config.EPH_HOST not in (None, "", "0")
     )
 
@@ -73,9 +231,15 @@ def main():
             config.EPH_PASSWORD
         )
 
+        rec_eph = create_recorder("EPH")
+        if rec_eph:
+            recorders.append(rec_eph)
+        stats_eph = metrics_server.StreamStats("EPH")
+        stream_stats.append(stats_eph)
         t_eph = threading.Thread(
             target=stream_thread,
-            args=("EPH", client_eph, handler),
+            name="EPH",
+            args=("EPH", client_eph, handler, writer, rec_eph, stats_eph),
             daemon=True
         )
         t_eph.start()
@@ -84,11 +248,26 @@ def main():
     else:
         print("[Main] EPH stream disabled (no config provided).")
 
+    last_perf_log = last_memory_log = time.time()
     try:
-        while True:
+        while t_obs.is_alive():
             time.sleep(1)
+            if PIPELINE.enabled and time.time() - last_perf_log >= log_interval:
+                print(f"[Perf]\n{PIPELINE.format_summary()}\n{EPOCH_LATENCY.format_summary()}")
+                last_perf_log = time.time()
+            if memory_interval and time.time() - last_memory_log >= memory_interval:
+                print(f"[Memory]\n{memory_report.MEMORY.format_report()}")
+                last_memory_log = time.time()
     except KeyboardInterrupt:
         print("\n[Main] Stopped by user.")
+    finally:
+        for recorder in recorders:
+            recorder.stop()
+        writer.stop()
+        if metrics is not None:
+            metrics.stop()
+        if PIPELINE.enabled:
+            print(f"[Perf]\n{PIPELINE.format_summary()}\n{EPOCH_LATENCY.format_summary()}")
 
 
 
@@ -2,8 +2,15 @@
 import importlib.util
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QGroupBox, QFormLayout, 
                              QLineEdit, QCheckBox, QHBoxLayout, QPushButton, 
-                             QFileDialog, QMessageBox, QStyle)
-from PyQt6.QtGui import QIcon
+                             QFileDialog, QMessageBox, QStyle, QDoubleSpinBox, QTextEdit,
+                             QSpinBox, QLabel)
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QIcon, QFont
+
+from core.instrumentation import PIPELINE, EPOCH_LATENCY
+from core import profiler
+from core.memory_report import MEMORY, TRACEMALLOC
+import config
 
 class ConfigDialog(QDialog):
     def __init__(self, parent=None, initial_settings=None):
@@ -54,6 +61,25 @@ class ConfigDialog(QDialog):
         grp2.setLayout(fl2)
         layout.addWidget(grp2)
         
+        # Replay：用录制的RTCM文件代替NTRIP流（留空则使用上面的NTRIP配置）
+        grp3 = QGroupBox("Replay (recorded RTCM)")
+        fl3 = QFormLayout()
+        h_replay = QHBoxLayout()
+        self.replay_path = QLineEdit(self.settings.get('REPLAY', {}).get('path', ''))
+        b_browse = QPushButton("...")
+        b_browse.clicked.connect(self.browse_replay)
+        h_replay.addWidget(self.replay_path)
+        h_replay.addWidget(b_browse)
+        self.replay_speed = QDoubleSpinBox()
+        self.replay_speed.setRange(0.0, 1000.0)
+        self.replay_speed.setDecimals(1)
+        self.replay_speed.setSpecialValueText("Max")  # 0 = 尽可能快
+        self.replay_speed.setValue(float(self.settings.get('REPLAY', {}).get('speed', 1.0)))
+        fl3.addRow("Capture:", h_replay)
+        fl3.addRow("Speed (x):", self.replay_speed)
+        grp3.setLayout(fl3)
+        layout.addWidget(grp3)
+
         btns = QHBoxLayout()
         b_load = QPushButton("Load File")
         # 添加打开文件图标
@@ -94,9 +120,152 @@ class ConfigDialog(QDialog):
             except Exception as e:
                 QMessageBox.warning(self, "Error", str(e))
 
+    def browse_replay(self):
+        d = QFileDialog.getExistingDirectory(self, "Select Capture Directory")
+        if d:
+            self.replay_path.setText(d)
+
     def get_settings(self):
         return {
             'OBS': {'host': self.obs_h.text(), 'port': self.obs_p.text(), 'mountpoint': self.obs_m.text(), 'user': self.obs_u.text(), 'password': self.obs_pw.text()},
             'EPH_ENABLED': self.chk_eph.isChecked(),
-            'EPH': {'host': self.eph_h.text(), 'port': self.eph_p.text(), 'mountpoint': self.eph_m.text(), 'user': self.eph_u.text(), 'password': self.eph_pw.text()}
+            'EPH': {'host': self.eph_h.text(), 'port': self.eph_p.text(), 'mountpoint': self.eph_m.text(), 'user': self.eph_u.text(), 'password': self.eph_pw.text()},
+            'REPLAY': {'path': self.replay_path.text().strip(), 'speed': self.replay_speed.value()}
         }
+
+
+class PerfDialog(QDialog):
+    """性能统计窗口：各管线阶段延迟 + 历元到显示的端到端延迟（非模态，每秒刷新）"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Pipeline Performance")
+        self.resize(900, 480)
+        layout = QVBoxLayout(self)
+
+        self.text = QTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("Monospace", 9))
+        layout.addWidget(self.text)
+
+        btns = QHBoxLayout()
+        self.chk_enabled = QCheckBox("Enable instrumentation")
+        self.chk_enabled.setChecked(PIPELINE.enabled)
+        self.chk_enabled.toggled.connect(PIPELINE.set_enabled)
+        b_reset = QPushButton("Reset")
+        b_reset.clicked.connect(self.reset)
+        btns.addWidget(self.chk_enabled)
+        btns.addStretch()
+        btns.addWidget(b_reset)
+        layout.addLayout(btns)
+
+        # 性能剖析：采样全部线程 + 各线程 cProfile，输出 .collapsed / .prof 文件
+        prof_row = QHBoxLayout()
+        self.spin_profile = QSpinBox()
+        self.spin_profile.setRange(1, 3600)
+        self.spin_profile.setValue(int(getattr(config, "PROFILER", {}).get("SECONDS", 30)))
+        self.spin_profile.setSuffix(" s")
+        self.btn_profile = QPushButton("Profile")
+        self.btn_profile.clicked.connect(self.start_profile)
+        self.lbl_profile = QLabel(profiler.PROFILER.status())
+        prof_row.addWidget(self.spin_profile)
+        prof_row.addWidget(self.btn_profile)
+        prof_row.addWidget(self.lbl_profile, 1)
+        layout.addLayout(prof_row)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def start_profile(self):
+        seconds = self.spin_profile.value()
+        session = profiler.start_from(config, seconds=seconds)
+        if session is None:
+            self.lbl_profile.setText("A profile is already running")
+            return
+        # GUI主线程参与 cProfile：现在启用，结束后由定时器停用
+        profiler.PROFILER.checkpoint()
+        QTimer.singleShot(seconds * 1000 + 100, profiler.PROFILER.checkpoint)
+        self.refresh()
+
+    def reset(self):
+        PIPELINE.reset()
+        EPOCH_LATENCY.reset()
+        self.refresh()
+
+    def refresh(self):
+        self.text.setPlainText(
+            "Pipeline stages\n" + PIPELINE.format_summary()
+            + "\n\nEpoch latency vs GNSS time (caster = arrival - epoch, queue = decoded - arrival, "
+              "render = drawn - decoded)\n" + EPOCH_LATENCY.format_summary()
+        )
+        self.lbl_profile.setText(profiler.PROFILER.status())
+
+
+class MemoryDialog(QDialog):
+    """内存统计窗口：各数据结构对象数/字节估计 + tracemalloc 快照对比（按需刷新，非模态）"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Memory")
+        self.resize(900, 560)
+        layout = QVBoxLayout(self)
+
+        self.text = QTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("Monospace", 9))
+        layout.addWidget(self.text)
+
+        btns = QHBoxLayout()
+        b_refresh = QPushButton("Refresh")
+        b_refresh.clicked.connect(self.refresh)
+        self.chk_trace = QCheckBox("tracemalloc")
+        self.chk_trace.setChecked(TRACEMALLOC.tracing)
+        self.chk_trace.toggled.connect(self.toggle_tracing)
+        b_snap = QPushButton("Snapshot")
+        b_snap.setToolTip("Take a snapshot and diff it against the previous one")
+        b_snap.clicked.connect(lambda: self.snapshot("previous"))
+        b_base = QPushButton("Diff baseline")
+        b_base.setToolTip("Take a snapshot and diff it against the first one")
+        b_base.clicked.connect(lambda: self.snapshot("baseline"))
+        b_save = QPushButton("Save")
+        b_save.setToolTip("Dump the latest snapshot for offline diffs (python -m core.memory_report diff)")
+        b_save.clicked.connect(self.save_snapshot)
+        for w in (b_refresh, self.chk_trace, b_snap, b_base, b_save):
+            btns.addWidget(w)
+        btns.addStretch()
+        layout.addLayout(btns)
+
+        self.diff_text = ""
+        self.refresh()
+
+    def toggle_tracing(self, on):
+        if on:
+            TRACEMALLOC.start(int(getattr(config, "MEMORY", {}).get("FRAMES", 25)))
+        else:
+            TRACEMALLOC.stop()
+            TRACEMALLOC.reset()
+        self.refresh()
+
+    def snapshot(self, against):
+        if not TRACEMALLOC.tracing:
+            self.diff_text = "tracemalloc is off: enable it first (or set MEMORY['TRACEMALLOC'] in config.py)"
+        else:
+            TRACEMALLOC.take()
+            self.diff_text = TRACEMALLOC.diff(against)
+        self.refresh()
+
+    def save_snapshot(self):
+        try:
+            self.diff_text = f"Snapshot written to {TRACEMALLOC.dump_latest(getattr(config, 'MEMORY', {}).get('DIR'))}"
+        except RuntimeError as e:
+            self.diff_text = str(e)
+        self.refresh()
+
+    def refresh(self):
+        text = MEMORY.format_report()
+        budget = getattr(self.parent(), 'memory_budget', None)
+        if budget is not None:
+            text += "\n\nMemory budget\n" + budget.format_status()
+        if self.diff_text:
+            text += "\n\n" + self.diff_text
+        self.text.setPlainText(text)
@@ -1,16 +1,14 @@
 # ui/main_window.py
 import time
-import threading
 from datetime import datetime
-from collections import deque, defaultdict
 import numpy as np
 
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QTableWidget, QTableWidgetItem, QLabel, QTextEdit, 
+                             QTableView, QLabel, QTextEdit, 
                              QSplitter, QHeaderView, QTabWidget, QComboBox,
                              QCheckBox, QPushButton, QFrame, QApplication, QDialog, QStyle)
 from PyQt6.QtCore import Qt, pyqtSlot, QTimer
-from PyQt6.QtGui import QColor, QFont, QIcon, QPalette
+from PyQt6.QtGui import QIcon, QPalette
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import matplotlib.dates as mdates
@@ -20,8 +18,20 @@ from ui.workers import IOThread, DataProcessingThread, StreamSignals
 from core.rtcm_handler import RTCMHandler
 from core.ring_buffer import RingBuffer
 from core.data_store import GnssIrStore
+from core.history_tiers import HistoryTiers, DEFAULT_TIERS
+from core.sat_history import SatHistory
+from core.sat_snapshot import SatelliteTracker
+from core.sat_expiry import SatelliteExpiry
+from core.ir_archive import IrArchive, IrArchiveWriter
+from core.gnss_time import epoch_gps_tow
+from core.rtcm_recorder import RtcmRecorder
+from core.instrumentation import PIPELINE, EPOCH_LATENCY, configure_from
+from core import metrics_server
+from core import memory_report
+from core import memory_budget
 from ui.widgets import SkyplotWidget, MultiSignalBarWidget, PlotSNRWidget
-from ui.dialogs import ConfigDialog
+from ui.table_model import ObservationTableModel, SystemFilterProxy, SnrDelegate, SNR_COLUMN, HEADERS
+from ui.dialogs import ConfigDialog, PerfDialog, MemoryDialog
 import config
 
 
@@ -33,26 +43,41 @@ class GNSSMonitorWindow(QMainWindow):
     - Maintains merged satellite snapshot + history for plots.
     - Stores filtered GNSS-IR samples for downstream spectral analysis.
     """
+    # SNR Display 的时间跨度：Recent 使用原始历史，其余使用聚合层
+    HISTORY_SPANS = [("Recent", 0), ("1 h", 3600), ("6 h", 6 * 3600), ("24 h", 86400), ("3 d", 3 * 86400)]
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("GNSS RT Monitor V0.1")
         self.resize(1600, 900)
         
-        self.merged_satellites = {}
-        self.sat_last_seen = {}
+        # 最新卫星状态（按系统分区）；刷新时取不可变快照，所有控件共享同一份
+        self.merged_satellites = SatelliteTracker()
+        # 卫星过期：按截止时间排序的堆，超时可按系统配置（config.SAT_EXPIRY）
+        self.sat_expiry = SatelliteExpiry.from_config(config)
 
-        self.sat_history = defaultdict(lambda: deque(maxlen=500))
+        # 每颗卫星的原始历史：列式 NumPy 环形缓冲（500 点，内存预算超限时会降低并降采样）
+        self.sat_history = SatHistory(maxlen=500)
         self.current_sat_list = []
-
-        keep_seconds = getattr(config, "GNSS_IR", {}).get("KEEP_SECONDS", 900)
-        self.ir_store = GnssIrStore(keep_seconds=keep_seconds)
+        # 长时间跨度曲线：按 30 s / 5 min 桶聚合的 min/mean/max（卫星下线后保留，按保留时长淘汰）
+        self.history_tiers = HistoryTiers(getattr(config, "HISTORY_TIERS", DEFAULT_TIERS))
+
+        ir_cfg = getattr(config, "GNSS_IR", {})
+        keep_seconds = ir_cfg.get("KEEP_SECONDS", 900)
+        # 配置 ARCHIVE_DIR 时，GNSS-IR 样本同时写入磁盘归档（按天分目录，后台线程批量写入）
+        self.ir_archive = None
+        if ir_cfg.get("ARCHIVE_DIR"):
+            self.ir_archive = IrArchiveWriter(ir_cfg["ARCHIVE_DIR"],
+                                              flush_interval=ir_cfg.get("ARCHIVE_FLUSH_INTERVAL", 5.0))
+            self.ir_archive.start()
+        self.ir_store = GnssIrStore(keep_seconds=keep_seconds, archive=self.ir_archive)
         
         # 性能优化：GUI更新节流机制
         self.last_gui_update_time = 0
         self.gui_update_interval = 0.3  # 300ms
         self.pending_update = False
         self.current_tab_index = 0  # 跟踪当前tab，只更新可见的widget
-        self.last_table_data_hash = None  # 用于检测表格数据是否变化
+        self.last_table_view_key = None  # 表格上次绘制的快照版本（版本不变则跳过）
         
         # 从config.py读取启用的系统，如果没有定义则使用默认值
         try:
@@ -72,6 +97,14 @@ class GNSSMonitorWindow(QMainWindow):
         self.io_threads = []
         self.processing_threads = []
         self.ring_buffers = {}  # 存储每个流的环形缓冲区
+        self.recorders = []  # 原始RTCM录制线程（config.RECORD）
+        configure_from(config)  # 管线性能统计（config.INSTRUMENTATION）
+        self.perf_dialog = None
+        self.memory_dialog = None
+        self.memory_budget = None
+        memory_report.configure_from(config)  # tracemalloc（config.MEMORY）
+        self.unrendered_epochs = []  # 已接收、尚未绘制的历元（端到端延迟统计）
+        self.stream_stats = {}  # 每个流的累计计数（metrics 端点）
 
         # 默认配置
         self.settings = {
@@ -81,11 +114,15 @@ class GNSSMonitorWindow(QMainWindow):
         }
         
         self.setup_ui()
+        self.start_metrics_server()
+        self.register_memory_sources()
+        self.start_memory_budget()
         
         # 启动定时器，每秒检查一次是否有卫星过期 (防止卫星下线后一直卡在屏幕上)
-        self.cleanup_timer = threading.Timer(1.0, self.cleanup_stale_satellites)
-        self.cleanup_timer.daemon = True
-        self.cleanup_timer.start()
+        # 在GUI线程执行，不再跨线程修改卫星字典
+        self.cleanup_timer = QTimer(self)
+        self.cleanup_timer.timeout.connect(self.cleanup_stale_satellites)
+        self.cleanup_timer.start(1000)
         
         # 性能优化：定期检查并执行待处理的GUI更新（防止数据丢失）
         self.gui_update_timer = QTimer()
@@ -124,6 +161,16 @@ class GNSSMonitorWindow(QMainWindow):
             btn_cfg.setText("⚙ Config")
         btn_cfg.clicked.connect(self.open_config_dialog)
         top_bar.addWidget(btn_cfg)
+
+        btn_perf = QPushButton("Perf")
+        btn_perf.setToolTip("Pipeline stage latency statistics")
+        btn_perf.clicked.connect(self.open_perf_dialog)
+        top_bar.addWidget(btn_perf)
+
+        btn_mem = QPushButton("Mem")
+        btn_mem.setToolTip("Memory usage per data structure and tracemalloc snapshots")
+        btn_mem.clicked.connect(self.open_memory_dialog)
+        top_bar.addWidget(btn_mem)
         
         line = QFrame()
         line.setFrameShape(QFrame.Shape.VLine)
@@ -156,7 +203,9 @@ class GNSSMonitorWindow(QMainWindow):
         # 左侧：星空图
         left_widget = QWidget()
         left_layout = QVBoxLayout(left_widget)
-        self.skyplot = SkyplotWidget()
+        sky_cfg = getattr(config, "SKYPLOT", {})
+        self.skyplot = SkyplotWidget(trail_points=int(sky_cfg.get("TRAIL_POINTS", 0)),
+                                     trail_interval=float(sky_cfg.get("TRAIL_INTERVAL", 30.0)))
         left_layout.addWidget(self.skyplot)
         splitter.addWidget(left_widget)
 
@@ -188,23 +237,30 @@ class GNSSMonitorWindow(QMainWindow):
         }
         self.tables = {} # 存储创建好的表格对象
 
-        headers = ["PRN", "Sys", "El(°)", "Az(°)", "Freq", "SNR", "Pseudorange (m)", "Phase (cyc)"]
-        
-        for tab_name in self.table_groups.keys():
-            t_widget = QTableWidget()
-            t_widget.setColumnCount(len(headers))
-            t_widget.setHorizontalHeaderLabels(headers)
+        # 所有子表格共享一个模型（按快照差量更新），每个子标签页通过代理按系统过滤
+        self.table_model = ObservationTableModel(self)
+        self.snr_delegate = SnrDelegate(self)
+
+        for tab_name, systems in self.table_groups.items():
+            proxy = SystemFilterProxy(systems, self)
+            proxy.setSourceModel(self.table_model)
+            t_widget = QTableView()
+            t_widget.setModel(proxy)
+            t_widget.setItemDelegateForColumn(SNR_COLUMN, self.snr_delegate)
             
             # 列宽调整
+            # PRN/Sys/Freq 内容宽度固定：按字体一次算好宽度，不用 ResizeToContents
+            # （它会在每次 dataChanged 时遍历所有行调用 data()）
             header = t_widget.horizontalHeader()
-            header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents) # PRN
-            header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents) # Sys
-            header.setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents) # Freq
+            fm = header.fontMetrics()
+            for col, sample in ((0, "G00"), (1, "GLO"), (4, "1C")):
+                header.setSectionResizeMode(col, QHeaderView.ResizeMode.Fixed)
+                header.resizeSection(col, max(fm.horizontalAdvance(HEADERS[col]), fm.horizontalAdvance(sample)) + 24)
             header.setSectionResizeMode(6, QHeaderView.ResizeMode.Stretch) # Pseudo
             header.setSectionResizeMode(7, QHeaderView.ResizeMode.Stretch) # Phase
             
             t_widget.verticalHeader().setVisible(False)
-            # 注意：我们这里不开启 setAlternatingRowColors，因为我们要手动根据卫星分组染色
+            # 注意：我们这里不开启 setAlternatingRowColors，因为模型按卫星分组染色
             
             self.sub_tabs.addTab(t_widget, tab_name)
             self.tables[tab_name] = t_widget
@@ -228,6 +284,12 @@ class GNSSMonitorWindow(QMainWindow):
         self.combo_mode.addItems(["Time Sequence", "Elevation","sin(Elevation)"])
         self.combo_mode.currentTextChanged.connect(self.refresh_analysis_plot)
         h_ctrl.addWidget(self.combo_mode)
+        h_ctrl.addWidget(QLabel("Span:"))
+        self.combo_span = QComboBox()
+        for label, seconds in self.HISTORY_SPANS:
+            self.combo_span.addItem(label, seconds)
+        self.combo_span.currentIndexChanged.connect(self.refresh_analysis_plot)
+        h_ctrl.addWidget(self.combo_span)
         h_ctrl.addStretch()
         vbox_an.addLayout(h_ctrl)
     
@@ -366,7 +428,7 @@ class GNSSMonitorWindow(QMainWindow):
         }}
 
         /* --- Tables --- */
-        QTableWidget {{
+        QTableView {{
             background: {card};
             gridline-color: {border};
             selection-background-color: {accent}33;
@@ -424,52 +486,48 @@ class GNSSMonitorWindow(QMainWindow):
         self.refresh_all_widgets()
 
     def cleanup_stale_satellites(self):
-        """定期清理超过5秒没更新的卫星，同时清理历史数据"""
-        now = time.time()
-        to_remove = []
-        for prn, last_time in self.sat_last_seen.items():
-            if now - last_time > 5.0: # 5秒超时
-                to_remove.append(prn)
-        
+        """清理超时未更新的卫星（默认5秒，按系统可配置），同时清理历史数据"""
+        to_remove = self.sat_expiry.expire(time.time())
         if to_remove:
             for prn in to_remove:
-                del self.merged_satellites[prn]
-                del self.sat_last_seen[prn]
+                self.merged_satellites.discard(prn)
                 # 性能优化：清理过期卫星的历史数据，释放内存
                 if prn in self.sat_history:
                     del self.sat_history[prn]
-            # 注意：在非 GUI 线程调用 GUI 更新需要小心，这里简单起见，
-            # 我们等下一个 epoch 到来时自然会刷新，或者使用 signal 触发。
-            # 这里为了线程安全，我们暂不直接触发重绘，而是让 process_gui_epoch 承担重绘任务
-
-        # 重新启动定时器
-        self.cleanup_timer = threading.Timer(2.0, self.cleanup_stale_satellites)
-        self.cleanup_timer.daemon = True
-        self.cleanup_timer.start()
+            # 在GUI线程中，直接标记待刷新，让界面移除过期卫星
+            self.pending_update = True
 
     @pyqtSlot(object)
     def process_gui_epoch(self, epoch_data):
         """
         接收新数据，更新到 merged_satellites 字典，刷新界面显示
         """
+        if PIPELINE.enabled and epoch_data.emit_time is not None:
+            PIPELINE.record("qt_delivery", time.perf_counter() - epoch_data.emit_time)
+            if epoch_data.decode_time is not None and len(self.unrendered_epochs) < 10000:
+                self.unrendered_epochs.append(epoch_data)
         now = time.time()
-        current_dt = datetime.now()
         n_sats = len(epoch_data.satellites)
         n_signals = sum(len(sat.signals) for sat in epoch_data.satellites.values())
 
         # --- 步骤1：合并数据 ---
         for prn, sat in epoch_data.satellites.items():
-            self.merged_satellites[prn] = sat
-            self.sat_last_seen[prn] = now
+            self.merged_satellites.update(prn, sat)
+            self.sat_expiry.touch(prn, now)
             
             # 同时更新历史记录 (用于折线图)
             el = getattr(sat, "el", getattr(sat, "elevation", 0)) or None
             snr_map = {c: s.snr for c, s in sat.signals.items() if s and getattr(s, 'snr', 0)}
-            self.sat_history[prn].append({'time': current_dt, 'el': el, 'snr': snr_map})
+            self.sat_history.append(prn, now, el, snr_map)
+            self.history_tiers.add(prn, now, el, snr_map)
 
         # 额外：将满足GNSS-IR掩膜的数据写入内存存储，便于后续LSP分析
         try:
-            self.ir_store.add_epoch(epoch_data.gps_time, epoch_data.satellites, config.GNSS_IR, self.active_systems)
+            t0 = PIPELINE.start()
+            # 各系统的历元时间统一为 GPST 周内秒，存储和归档按时间二分查找
+            tow = epoch_gps_tow(epoch_data.gps_time, epoch_data.sys_id)
+            self.ir_store.add_epoch(tow, epoch_data.satellites, config.GNSS_IR, self.active_systems)
+            PIPELINE.stop("ir_add_epoch", t0)
         except Exception:
             pass
 
@@ -484,7 +542,7 @@ class GNSSMonitorWindow(QMainWindow):
                 self._last_stats_log_time = now
             if now - self._last_stats_log_time >= 5.0:
                 total_sats = len(self.merged_satellites)
-                ir_samples = len(self.ir_store._data) if hasattr(self.ir_store, '_data') else 0
+                ir_samples = self.ir_store.size()
                 self.signals.log_signal.emit(
                     f"Status: {total_sats} satellites tracked, "
                     f"{n_sats} in epoch, {n_signals} signals, "
@@ -507,11 +565,24 @@ class GNSSMonitorWindow(QMainWindow):
     def on_tab_changed(self, index):
         """Tab切换时更新当前tab索引"""
         self.current_tab_index = index
+        if index == 0:
+            # 离开 Dashboard 期间表格未更新：按当前快照补一次
+            self.update_table()
     
     def refresh_all_widgets(self):
+        t0 = PIPELINE.start()
+        self._refresh_all_widgets()
+        PIPELINE.stop("refresh", t0)
+        if self.unrendered_epochs:
+            render_time = time.time()
+            for epoch_data in self.unrendered_epochs:
+                EPOCH_LATENCY.record_epoch(epoch_data, render_time)
+            self.unrendered_epochs = []
+
+    def _refresh_all_widgets(self):
         # 性能优化：只更新当前可见的tab，减少不必要的绘制
-        # 线程安全：创建字典副本，避免在遍历时字典被其他线程修改
-        satellites_snapshot = dict(self.merged_satellites)
+        # 不可变快照（仅在数据变化时重建），各控件按版本判断是否需要重绘
+        satellites_snapshot = self.merged_satellites.snapshot()
         
         # Tab 0: Dashboard - 总是更新（因为skyplot和bar chart在左侧，总是可见）
         if self.current_tab_index == 0 or True:  # 暂时总是更新，因为左侧widget总是可见
@@ -523,176 +594,160 @@ class GNSSMonitorWindow(QMainWindow):
             
             # 3. Update Table (只在Dashboard tab时更新)
             if self.current_tab_index == 0:
-                self.update_table()
+                self.update_table(satellites_snapshot)
         
         # Tab 1: Analysis - 只在Analysis tab时更新
         if self.current_tab_index == 1 and self.combo_sat.currentText():
             self.refresh_analysis_plot()
 
-    def update_table(self):
-        # 性能优化：检测数据是否真的变化了，避免不必要的更新
-        import hashlib
-        satellites_snapshot = dict(self.merged_satellites)
-        # 创建数据哈希，快速检测变化（包含SNR/伪距/相位，确保实时刷新而不重复重绘）
-        flat_rows = []
-        for key, sat in sorted(satellites_snapshot.items()):
-            el = getattr(sat, "el", getattr(sat, "elevation", 0)) or 0
-            az = getattr(sat, "az", getattr(sat, "azimuth", 0)) or 0
-            for code, sig in sorted(sat.signals.items()):
-                if not sig: 
-                    continue
-                flat_rows.append((
-                    key,
-                    round(el, 1),
-                    round(az, 1),
-                    code,
-                    round(getattr(sig, "snr", 0.0) or 0.0, 1),
-                    round(getattr(sig, "pseudorange", 0.0) or 0.0, 3),
-                    round(getattr(sig, "phase", 0.0) or 0.0, 3),
-                ))
-        data_hash = hashlib.md5(str(flat_rows).encode()).hexdigest()
-        
-        # 如果数据没有变化，跳过更新（但第一次总是更新）
-        if data_hash == self.last_table_data_hash and self.last_table_data_hash is not None:
+    def update_table(self, satellites_snapshot=None):
+        # 性能优化：显示的系统的快照版本未变化时跳过更新
+        if satellites_snapshot is None:
+            satellites_snapshot = self.merged_satellites.snapshot()
+        view_key = satellites_snapshot.view_key(self.active_systems)
+        if view_key == self.last_table_view_key:
             return
         
-        self.last_table_data_hash = data_hash
-        
-        # 性能优化：使用setUpdatesEnabled减少重绘开销
-        for t in self.tables.values():
-            t.setUpdatesEnabled(False)  # 禁用更新，批量操作
+        self.last_table_view_key = view_key
         
-        try:
-            # 1. 准备数据
-            active_prns_in_view = [] # 用于更新下拉框
-            sys_map = {'G': 'GPS', 'R': 'GLO', 'E': 'GAL', 'C': 'BDS', 'J': 'QZS', 'S': 'SBS'}
-            
-            # 定义两种背景色，用于区分不同卫星 (浅白 / 浅灰)
-            bg_colors = [QColor("#ffffff"), QColor("#b9b9b9")]
-
-            # 清空所有子表格
-            for t in self.tables.values():
-                t.setRowCount(0)
-
-            # 排序
-            sorted_sats = sorted(satellites_snapshot.items())
+        # 共享模型只对变化的系统做增删行/dataChanged，视图只重绘可见的变化单元格
+        if not self.table_model.set_snapshot(satellites_snapshot, self.active_systems):
+            return
 
-            # 遍历卫星
-            sat_counter = 0 # 卫星计数器，用于决定颜色
-            
-            for key, sat in sorted_sats:
-                sys_char = key[0]
-                
-                # 基础信息
-                el = getattr(sat, "el", getattr(sat, "elevation", 0)) or 0
-                az = getattr(sat, "az", getattr(sat, "azimuth", 0)) or 0
-                
-                # 确定这颗卫星应该显示的颜色
-                current_bg = bg_colors[sat_counter % 2]
-                sat_counter += 1
-
-                # 遍历这颗卫星的所有信号 (Signal)
-                # 排序信号代码: 1C, 2W, 5Q...
-                sorted_codes = sorted(sat.signals.keys())
-                
-                # 如果没有信号，也跳过
-                if not sorted_codes: continue
-                
-                # 记录这颗卫星是否已经被添加到 active_prns (避免重复)
-                added_to_dropdown = False
-
-                # === 核心：每个信号生成一行 ===
-                for code in sorted_codes:
-                    sig = sat.signals[code]
-                    if not sig: continue
-
-                    snr = getattr(sig, 'snr', 0)
-                    if snr == 0: continue # 不显示无效信号
-
-                    # 提取伪距和相位
-                    pr = getattr(sig, 'pseudorange', 0)
-                    ph = getattr(sig, 'phase', 0)
-                    
-                    pr_str = f"{pr:12.3f}" if pr else ""
-                    ph_str = f"{ph:12.3f}" if ph else ""
-                    
-                    # 构建行数据
-                    row_items = [
-                        key,                            # PRN
-                        sys_map.get(sys_char, sys_char),# Sys
-                        f"{el:.1f}",                    # El
-                        f"{az:.1f}",                    # Az
-                        code,                           # Freq/Signal
-                        f"{snr:.1f}",                   # SNR
-                        pr_str,                         # Pseudorange
-                        ph_str                          # Phase
-                    ]
-
-                    # 将这一行添加到所有符合条件的表格中
-                    for tab_name, valid_systems in self.table_groups.items():
-                        # 检查当前卫星系统是否属于该 Tab (比如 'G' 属于 'ALL' 和 'GPS')
-                        if sys_char in valid_systems:
-                            
-                            # 只有当用户在顶部 Checkbox 勾选了该系统，才显示
-                            if sys_char in self.active_systems:
-                                
-                                if not added_to_dropdown:
-                                    active_prns_in_view.append(key)
-                                    added_to_dropdown = True
-                                
-                                table = self.tables[tab_name]
-                                row_idx = table.rowCount()
-                                table.insertRow(row_idx)
-                                
-                                # 填入单元格并设置背景色
-                                for col_idx, val in enumerate(row_items):
-                                    item = QTableWidgetItem(str(val))
-                                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                                    item.setBackground(current_bg) # 设置背景色
-                                    
-                                    # 给 SNR 加个颜色增强可读性 (可选)
-                                    if col_idx == 5: # SNR column
-                                        if snr > 40: item.setForeground(QColor("green"))
-                                        elif snr < 30: item.setForeground(QColor("red"))
-                                        item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
-                                    
-                                    table.setItem(row_idx, col_idx, item)
-
-            # 3. 更新 Analysis 页面的下拉框
+        # 更新 Analysis 页面的下拉框
+        active_prns_in_view = self.table_model.prns()
+        if active_prns_in_view != self.current_sat_list:
             current_sel = self.combo_sat.currentText()
-            # 简单去重并排序
-            active_prns_in_view = sorted(list(set(active_prns_in_view)))
-            
-            if active_prns_in_view != self.current_sat_list:
-                self.current_sat_list = active_prns_in_view
-                self.combo_sat.blockSignals(True)
-                self.combo_sat.clear()
-                self.combo_sat.addItems(active_prns_in_view)
-                if current_sel in active_prns_in_view:
-                    self.combo_sat.setCurrentText(current_sel)
-                self.combo_sat.blockSignals(False)
-        finally:
-            # 重新启用更新
-            for t in self.tables.values():
-                t.setUpdatesEnabled(True)
+            self.current_sat_list = active_prns_in_view
+            self.combo_sat.blockSignals(True)
+            self.combo_sat.clear()
+            self.combo_sat.addItems(active_prns_in_view)
+            if current_sel in active_prns_in_view:
+                self.combo_sat.setCurrentText(current_sel)
+            self.combo_sat.blockSignals(False)
 
     def refresh_analysis_plot(self):
         prn = self.combo_sat.currentText()
         mode = self.combo_mode.currentText()
         if prn and mode:
-            data = list(self.sat_history[prn])
+            span = self.combo_span.currentData() or 0
+            if span:
+                now = time.time()
+                data = self.history_tiers.query(prn, now - span, now)
+                if data is not None:
+                    self.analysis_plot.update_plot(prn, data, mode, xlim=(now - span, now))
+                    return
+            data = self.sat_history.get(prn)
             # 直接调用封装好的方法，主窗口非常清爽
             self.analysis_plot.update_plot(prn, data, mode)
 
     # ---- GNSS-IR ----
-    def get_ir_series(self, prn: str = None, signal_id: str = None):
+    def get_ir_series(self, prn: str = None, signal_id: str = None, **window):
         """
         Return the historical samples that meet the mask, which can be used for GNSS-IR analysis.
+        `window` is passed on to `GnssIrStore.get_series` (start_tow/end_tow, min_el/max_el, az_windows).
         """
         sys_id = prn[0] if prn else None
-        return self.ir_store.get_series(prn=prn, sys=sys_id, signal_id=signal_id)
+        return self.ir_store.get_series(prn=prn, sys=sys_id, signal_id=signal_id, **window)
+
+    def get_ir_tracks(self):
+        """(prn, signal_id) pairs currently held by the GNSS-IR store."""
+        return self.ir_store.tracks()
+
+    def get_ir_archive_series(self, start_gps=None, end_gps=None, prn=None, signal_id=None):
+        """
+        Long-term samples from the on-disk archive (absolute GPS seconds), or None if
+        `GNSS_IR["ARCHIVE_DIR"]` is not set. Returns a dict of column arrays.
+        """
+        if self.ir_archive is None:
+            return None
+        return IrArchive(self.ir_archive.archive_dir).query(start_gps, end_gps, prn=prn, signal_id=signal_id)
 
     # --- Config  ---
+    def open_perf_dialog(self):
+        """打开（或前置）性能统计窗口"""
+        if self.perf_dialog is None:
+            self.perf_dialog = PerfDialog(self)
+        self.perf_dialog.show()
+        self.perf_dialog.raise_()
+
+    def open_memory_dialog(self):
+        """打开（或前置）内存统计窗口"""
+        if self.memory_dialog is None:
+            self.memory_dialog = MemoryDialog(self)
+        self.memory_dialog.show()
+        self.memory_dialog.raise_()
+        self.memory_dialog.refresh()
+
+    def register_memory_sources(self):
+        """登记内存统计的数据结构（按需遍历估算，getter 每次取当前对象）"""
+        mem = memory_report.MEMORY
+        mem.register_sizer("sat_history", lambda: (self.sat_history.size(), self.sat_history.memory_bytes()))
+        mem.register_sizer("history_tiers", lambda: (
+            len(self.history_tiers.prns()), self.history_tiers.memory_bytes()))
+        mem.register("merged_satellites", lambda: self.merged_satellites)
+        mem.register("ir_store", lambda: self.ir_store, count=lambda store: store.size())
+        mem.register("unrendered_epochs", lambda: self.unrendered_epochs)
+        mem.register("ephemeris_cache",
+                     lambda: self.handler.ephemeris_cache if getattr(self, 'handler', None) else None)
+        mem.register("ring_buffers", lambda: {k: rb.buffer for k, rb in list(self.ring_buffers.items())},
+                     count=lambda b: sum(len(d) for d in b.values()))
+        # 表格模型在 Python 侧每行只有键和一组数值，单元格文本在绘制时生成：只统计行数
+        mem.register_sizer("table_rows", lambda: (self.table_model.rowCount(), None))
+        # 日志文本按 UTF-16 估算
+        mem.register_sizer("log_area", lambda: (
+            self.log_area.document().blockCount(), self.log_area.document().characterCount() * 2))
+
+    def start_memory_budget(self):
+        """按 config.MEMORY_BUDGET 登记各数据结构，定时检查并按优先级收缩（在GUI线程执行）"""
+        self.memory_budget = memory_budget.from_config(config, log=self.signals.log_signal.emit)
+        if self.memory_budget is None:
+            return
+        budget = self.memory_budget
+        # 优先级数值越小越先收缩：日志 -> 历史曲线 -> 聚合历史 -> 缓冲区 -> GNSS-IR 数据
+        budget.register("log_area", lambda: self.log_area.document().characterCount() * 2,
+                        self.shrink_log, priority=10)
+        budget.register("sat_history", self.sat_history.memory_bytes, self.shrink_sat_history, priority=20)
+        budget.register("history_tiers", self.history_tiers.memory_bytes, self.history_tiers.shrink, priority=25)
+        budget.register("ring_buffers", self.ring_buffer_bytes, self.shrink_ring_buffers, priority=30)
+        budget.register("ir_store", self.ir_store.memory_bytes, self.ir_store.shrink, priority=40)
+        interval = float(getattr(config, "MEMORY_BUDGET", {}).get("CHECK_INTERVAL", 10))
+        self.memory_budget_timer = QTimer(self)
+        self.memory_budget_timer.timeout.connect(budget.check)
+        self.memory_budget_timer.start(int(interval * 1000))
+        self.signals.log_signal.emit(f"Memory budget: {budget.limit_bytes / 2**20:.0f} MB")
+
+    def shrink_sat_history(self, fraction):
+        """降低历史长度上限，并对现有历史降采样（保留时间跨度，最新点优先）"""
+        maxlen = self.sat_history.maxlen
+        self.sat_history.resize(min(maxlen, max(50, int(maxlen * (1.0 - fraction)))))
+
+    def ring_buffer_bytes(self):
+        total = 0
+        for rb in list(self.ring_buffers.values()):
+            n = rb.qsize()
+            if n:
+                try:
+                    total += n * memory_report.deep_sizeof(rb.buffer[-1], sample=32)[0]
+                except IndexError:
+                    pass
+        return total
+
+    def shrink_ring_buffers(self, fraction):
+        for rb in list(self.ring_buffers.values()):
+            rb.resize(min(rb.maxsize, max(100, int(rb.maxsize * (1.0 - fraction)))))
+
+    def shrink_log(self, fraction):
+        """降低日志行数上限并立即删除最旧的行"""
+        self.max_log_lines = min(self.max_log_lines, max(100, int(self.max_log_lines * (1.0 - fraction))))
+        doc = self.log_area.document()
+        excess = doc.blockCount() - self.max_log_lines
+        if excess > 0:
+            cursor = self.log_area.textCursor()
+            cursor.movePosition(cursor.MoveOperation.Start)
+            cursor.movePosition(cursor.MoveOperation.Down, cursor.MoveMode.KeepAnchor, excess)
+            cursor.removeSelectedText()
+
     def open_config_dialog(self):
         dlg = ConfigDialog(self, self.settings)
         if dlg.exec() == QDialog.DialogCode.Accepted:
@@ -717,31 +772,62 @@ class GNSSMonitorWindow(QMainWindow):
         # 关闭所有环形缓冲区
         for rb in self.ring_buffers.values():
             rb.close()
+        for rec in self.recorders:
+            rec.stop()
         
         self.io_threads.clear()
         self.processing_threads.clear()
         self.ring_buffers.clear()
+        self.recorders.clear()
+        self.stream_stats.clear()
         
         # 清空数据缓存
         self.merged_satellites.clear()
-        self.sat_last_seen.clear()
+        self.sat_expiry.clear()
         self.sat_history.clear()
+        self.history_tiers.clear()
+        self.table_model.clear()
+        self.last_table_view_key = None
+        self.skyplot.clear_trails()
         self.signals.log_signal.emit("Cleared data cache")
         
         # 创建共享的RTCM处理器
         self.handler = RTCMHandler()
         
+        # 回放模式：录制文件（所有流按接收时间合并）走OBS管线
+        replay_cfg = self.settings.get('REPLAY', {})
+        replay_mode = bool(replay_cfg.get('path'))
+        if replay_mode:
+            self.signals.log_signal.emit(f"Initializing replay of {replay_cfg['path']}...")
+            obs_buffer = RingBuffer(maxsize=1000)
+            self.ring_buffers['OBS'] = obs_buffer
+
+            replay_settings = {'replay': replay_cfg['path'], 'speed': replay_cfg.get('speed', 1.0)}
+            io_thread = IOThread("OBS", replay_settings, obs_buffer, self.signals,
+                                 stats=self.create_stream_stats("OBS"))
+            io_thread.start()
+            self.io_threads.append(io_thread)
+
+            proc_thread = DataProcessingThread("OBS", obs_buffer, self.handler, self.signals,
+                                               stats=self.stream_stats["OBS"])
+            proc_thread.start()
+            self.processing_threads.append(proc_thread)
+            self.signals.log_signal.emit("Replay threads started")
+
         # 为OBS流创建多线程管线
-        if self.settings['OBS']['host']:
+        elif self.settings['OBS']['host']:
             self.signals.log_signal.emit("Initializing OBS stream...")
             obs_buffer = RingBuffer(maxsize=1000)
             self.ring_buffers['OBS'] = obs_buffer
             
-            io_thread = IOThread("OBS", self.settings['OBS'], obs_buffer, self.signals)
+            io_thread = IOThread("OBS", self.settings['OBS'], obs_buffer, self.signals,
+                                 recorder=self.create_recorder("OBS"),
+                                 stats=self.create_stream_stats("OBS"))
             io_thread.start()
             self.io_threads.append(io_thread)
             
-            proc_thread = DataProcessingThread("OBS", obs_buffer, self.handler, self.signals)
+            proc_thread = DataProcessingThread("OBS", obs_buffer, self.handler, self.signals,
+                                               stats=self.stream_stats["OBS"])
             proc_thread.start()
             self.processing_threads.append(proc_thread)
             self.signals.log_signal.emit("OBS stream threads started")
@@ -749,16 +835,21 @@ class GNSSMonitorWindow(QMainWindow):
             self.signals.log_signal.emit("OBS stream not configured")
         
         # 为EPH流创建多线程管线
-        if self.settings['EPH_ENABLED'] and self.settings['EPH']['host']:
+        if replay_mode:
+            pass  # 星历已包含在录制文件中
+        elif self.settings['EPH_ENABLED'] and self.settings['EPH']['host']:
             self.signals.log_signal.emit("Initializing EPH stream...")
             eph_buffer = RingBuffer(maxsize=1000)
             self.ring_buffers['EPH'] = eph_buffer
             
-            io_thread = IOThread("EPH", self.settings['EPH'], eph_buffer, self.signals)
+            io_thread = IOThread("EPH", self.settings['EPH'], eph_buffer, self.signals,
+                                 recorder=self.create_recorder("EPH"),
+                                 stats=self.create_stream_stats("EPH"))
             io_thread.start()
             self.io_threads.append(io_thread)
             
-            proc_thread = DataProcessingThread("EPH", eph_buffer, self.handler, self.signals)
+            proc_thread = DataProcessingThread("EPH", eph_buffer, self.handler, self.signals,
+                                               stats=self.stream_stats["EPH"])
             proc_thread.start()
             self.processing_threads.append(proc_thread)
             self.signals.log_signal.emit("EPH stream threads started")
@@ -769,6 +860,51 @@ class GNSSMonitorWindow(QMainWindow):
         self.signals.log_signal.emit(f"Active GNSS systems: {active_systems}")
         self.signals.log_signal.emit("=== Stream initialization complete ===")
 
+    def create_stream_stats(self, stream_name):
+        """新建一个流的累计计数，IO线程与处理线程共用"""
+        stats = metrics_server.StreamStats(stream_name)
+        self.stream_stats[stream_name] = stats
+        return stats
+
+    def start_metrics_server(self):
+        """按 config.METRICS 启动本地 Prometheus 端点；采集时读取当前管线对象"""
+        self.metrics_server = None
+        try:
+            self.metrics_server = metrics_server.start_from(config)
+        except OSError as e:
+            self.signals.log_signal.emit(f"Metrics endpoint not started: {e}")
+            return
+        if self.metrics_server is None:
+            return
+        metrics_server.REGISTRY.set_collector("gui", self.collect_metrics)
+        self.signals.log_signal.emit(
+            f"Metrics: http://{self.metrics_server.host}:{self.metrics_server.port}/metrics")
+
+    def collect_metrics(self):
+        """metrics 端点回调（在HTTP线程中执行，只读取快照）"""
+        sats = self.merged_satellites.snapshot().counts()
+        metrics = metrics_server.stream_metrics(self.stream_stats.values())
+        metrics += metrics_server.ring_buffer_metrics(dict(self.ring_buffers))
+        if getattr(self, 'handler', None) is not None:
+            metrics += metrics_server.ephemeris_metrics(self.handler)
+        metrics += metrics_server.satellite_metrics(sats)
+        metrics += metrics_server.ir_store_metrics(self.ir_store)
+        if self.memory_budget is not None:
+            metrics += metrics_server.memory_budget_metrics(self.memory_budget)
+        return metrics
+
+    def create_recorder(self, stream_name):
+        """按 config.RECORD 创建并启动原始RTCM录制线程；未配置时返回 None"""
+        record_cfg = getattr(config, "RECORD", {})
+        if not record_cfg.get("DIR"):
+            return None
+        recorder = RtcmRecorder(stream_name, record_cfg["DIR"],
+                                rotate_seconds=record_cfg.get("ROTATE_SECONDS", 3600))
+        recorder.start()
+        self.recorders.append(recorder)
+        self.signals.log_signal.emit(f"[{stream_name}] Recording raw RTCM to {record_cfg['DIR']}")
+        return recorder
+
     @pyqtSlot(str)
     def append_log(self, text):
         """添加日志，并限制日志行数防止无限增长"""
@@ -802,8 +938,15 @@ class GNSSMonitorWindow(QMainWindow):
         # 关闭所有环形缓冲区
         for rb in self.ring_buffers.values():
             rb.close()
+        for rec in self.recorders:
+            rec.stop()
+        if self.ir_archive is not None:
+            self.ir_archive.stop()
         if hasattr(self, 'cleanup_timer'): 
-            self.cleanup_timer.cancel()
+            self.cleanup_timer.stop()
         if hasattr(self, 'gui_update_timer'): 
             self.gui_update_timer.stop()
+        if self.metrics_server is not None:
+            metrics_server.REGISTRY.remove_collector("gui")
+            self.metrics_server.stop()
         event.accept()
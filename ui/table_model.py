@@ -0,0 +1,228 @@
+# ui/table_model.py
+"""
+Dashboard 观测表格：一个共享的 QAbstractTableModel + 每个系统子标签页一个过滤代理。
+
+- 模型每行对应一个 (PRN, 信号)，按 PRN/信号排序，同一系统的行连续。
+- set_snapshot 按系统比较快照版本，只重建有新数据的系统；行集合变化时
+  发出 insertRows/removeRows，数值变化只对变化的行发出 dataChanged，
+  视图只重绘可见的变化单元格（不再每次清空并重建全部 QTableWidgetItem）。
+- SNR 着色由 SnrDelegate 在绘制时完成。
+"""
+from bisect import bisect_left
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtGui import QBrush, QColor, QFont
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+SYS_NAMES = {'G': 'GPS', 'R': 'GLO', 'E': 'GAL', 'C': 'BDS', 'J': 'QZS', 'S': 'SBS'}
+HEADERS = ["PRN", "Sys", "El(°)", "Az(°)", "Freq", "SNR", "Pseudorange (m)", "Phase (cyc)"]
+SNR_COLUMN = 5
+
+
+def _sys_range_key(sys_id):
+    return (sys_id,), (chr(ord(sys_id) + 1),)
+
+
+class ObservationTableModel(QAbstractTableModel):
+    """所有卫星信号的行；行内容为显示精度下的数值（el, az, snr, pr, ph）"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._keys = []     # [(prn, code)]，有序
+        self._values = []   # 与 _keys 对齐：(el, az, snr, pr, ph)
+        self._shade = []    # 与 _keys 对齐：按卫星交替的背景色序号
+        self._versions = {}  # 系统 -> 已显示的快照版本（未启用的系统为 -1）
+        self._bg = [QBrush(QColor("#ffffff")), QBrush(QColor("#b9b9b9"))]
+
+    # ---- Qt 接口 ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        row, col = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            prn, code = self._keys[row]
+            el, az, snr, pr, ph = self._values[row]
+            if col == 0:
+                return prn
+            if col == 1:
+                return SYS_NAMES.get(prn[0], prn[0])
+            if col == 2:
+                return f"{el:.1f}"
+            if col == 3:
+                return f"{az:.1f}"
+            if col == 4:
+                return code
+            if col == 5:
+                return f"{snr:.1f}"
+            if col == 6:
+                return f"{pr:12.3f}" if pr else ""
+            return f"{ph:12.3f}" if ph else ""
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return self._bg[self._shade[row]]
+        if role == Qt.ItemDataRole.UserRole and col == SNR_COLUMN:
+            return self._values[row][2]
+        return None
+
+    # ---- 查询 ----
+    def row_system(self, row):
+        return self._keys[row][0][0]
+
+    def prns(self):
+        """表格中出现的 PRN（有序、去重）"""
+        out = []
+        for prn, _ in self._keys:
+            if not out or out[-1] != prn:
+                out.append(prn)
+        return out
+
+    # ---- 更新 ----
+    def set_snapshot(self, snapshot, active_systems):
+        """按快照更新；只处理版本变化的系统，返回是否有任何变化"""
+        changed = False
+        structural = False
+        for sys_id in sorted(set(snapshot.counts()) | set(self._versions)):
+            version = snapshot.system_version(sys_id) if sys_id in active_systems else -1
+            if self._versions.get(sys_id) == version:
+                continue
+            self._versions[sys_id] = version
+            rows = self._build_rows(snapshot.system(sys_id)) if version >= 0 else []
+            structural |= self._apply(sys_id, rows)
+            changed = True
+        if structural:
+            self._update_shading()
+        return changed
+
+    def clear(self):
+        self.beginResetModel()
+        self._keys, self._values, self._shade = [], [], []
+        self._versions.clear()
+        self.endResetModel()
+
+    @staticmethod
+    def _build_rows(satellites):
+        rows = []
+        for key in sorted(satellites):
+            sat = satellites[key]
+            el = round(getattr(sat, "el", getattr(sat, "elevation", 0)) or 0, 1)
+            az = round(getattr(sat, "az", getattr(sat, "azimuth", 0)) or 0, 1)
+            for code in sorted(sat.signals):
+                sig = sat.signals[code]
+                if not sig:
+                    continue
+                snr = getattr(sig, 'snr', 0)
+                if snr == 0:
+                    continue  # 不显示无效信号
+                rows.append(((key, code), (el, az, round(snr, 1), round(getattr(sig, 'pseudorange', 0) or 0, 3),
+                                           round(getattr(sig, 'phase', 0) or 0, 3))))
+        return rows
+
+    def _apply(self, sys_id, rows):
+        """把一个系统的行块替换为 rows（均有序），返回行集合是否变化"""
+        lo_key, hi_key = _sys_range_key(sys_id)
+        lo = bisect_left(self._keys, lo_key)
+        hi = bisect_left(self._keys, hi_key)
+        new_keys = [k for k, _ in rows]
+        structural = self._keys[lo:hi] != new_keys
+        if structural:
+            # 1. 删除不再存在的行（从后往前，连续的合并为一次）
+            keep = set(new_keys)
+            i = hi - 1
+            while i >= lo:
+                if self._keys[i] in keep:
+                    i -= 1
+                    continue
+                j = i
+                while j - 1 >= lo and self._keys[j - 1] not in keep:
+                    j -= 1
+                self.beginRemoveRows(QModelIndex(), j, i)
+                del self._keys[j:i + 1], self._values[j:i + 1], self._shade[j:i + 1]
+                self.endRemoveRows()
+                i = j - 1
+            # 2. 插入新出现的行（剩余旧行是新行的有序子序列，连续的新行合并为一次）
+            end = bisect_left(self._keys, hi_key)
+            i = 0
+            while i < len(rows):
+                pos = lo + i
+                existing = self._keys[pos] if pos < end else None
+                if existing == new_keys[i]:
+                    i += 1
+                    continue
+                j = i
+                while j < len(rows) and new_keys[j] != existing:
+                    j += 1
+                self.beginInsertRows(QModelIndex(), pos, pos + j - i - 1)
+                self._keys[pos:pos] = new_keys[i:j]
+                self._values[pos:pos] = [v for _, v in rows[i:j]]
+                self._shade[pos:pos] = [0] * (j - i)
+                self.endInsertRows()
+                end += j - i
+                i = j
+
+        # 3. 数值变化：连续变化的行合并为一次 dataChanged
+        last_col = len(HEADERS) - 1
+        start = None
+        for i, (_, values) in enumerate(rows):
+            row = lo + i
+            if self._values[row] != values:
+                self._values[row] = values
+                if start is None:
+                    start = row
+            elif start is not None:
+                self.dataChanged.emit(self.index(start, 0), self.index(row - 1, last_col))
+                start = None
+        if start is not None:
+            self.dataChanged.emit(self.index(start, 0), self.index(lo + len(rows) - 1, last_col))
+        return structural
+
+    def _update_shading(self):
+        """行集合变化后重新计算按卫星交替的背景色，只通知颜色变化的行"""
+        shade, prev, first, last = -1, None, None, None
+        for row, (prn, _) in enumerate(self._keys):
+            if prn != prev:
+                shade, prev = 1 - shade if shade >= 0 else 0, prn
+            if self._shade[row] != shade:
+                self._shade[row] = shade
+                first = row if first is None else first
+                last = row
+        if first is not None:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(HEADERS) - 1),
+                                  [Qt.ItemDataRole.BackgroundRole])
+
+
+class SystemFilterProxy(QSortFilterProxyModel):
+    """子标签页：只显示指定系统的行"""
+    def __init__(self, systems, parent=None):
+        super().__init__(parent)
+        self.systems = set(systems)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.sourceModel().row_system(source_row) in self.systems
+
+
+class SnrDelegate(QStyledItemDelegate):
+    """SNR 列：>40 绿色，<30 红色，加粗"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._font = QFont("Arial", 9, QFont.Weight.Bold)
+        self._high = QColor("green")
+        self._low = QColor("red")
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        snr = index.data(Qt.ItemDataRole.UserRole)
+        option.font = self._font
+        if snr is not None:
+            if snr > 40:
+                option.palette.setColor(option.palette.ColorRole.Text, self._high)
+            elif snr < 30:
+                option.palette.setColor(option.palette.ColorRole.Text, self._low)
@@ -5,24 +5,87 @@ matplotlib.use('QtAgg')
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import matplotlib.dates as mdates
-from collections import defaultdict
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.ticker import AutoLocator, ScalarFormatter
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QSizePolicy
 from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
 
 
 from ui.color_def import get_sys_color, get_signal_color
+from core.sat_snapshot import SatelliteSnapshot
 
-class SkyplotWidget(FigureCanvas):
-    def __init__(self, parent=None):
+class BlitCanvas(FigureCanvas):
+    """
+    静态部分（坐标轴、网格、标题）在完整重绘时缓存为背景，
+    动态 artist（animated=True）更新时只恢复背景 + 重画自身 + blit。
+    窗口缩放等触发完整重绘时会自动重新缓存背景。
+    """
+    def __init__(self, fig):
+        super().__init__(fig)
+        self._background = None
+        self._animated = []
+        self.mpl_connect('draw_event', self._on_draw)
+
+    def add_animated(self, artist):
+        artist.set_animated(True)
+        self._animated.append(artist)
+        return artist
+
+    def remove_animated(self, artist):
+        self._animated.remove(artist)
+        artist.remove()
+
+    def _on_draw(self, event):
+        self._background = self.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self._animated:
+            if artist.get_visible():
+                self.figure.draw_artist(artist)
+
+    def blit_update(self):
+        """只重画动态 artist；还没有背景时退回完整重绘"""
+        if self._background is None:
+            self.draw_idle()
+            return
+        self.restore_region(self._background)
+        self._draw_animated()
+        self.blit(self.figure.bbox)
+
+    def full_redraw(self):
+        """静态部分变化（坐标刻度、图例等）后调用：下次绘制时重新缓存背景"""
+        self._background = None
+        self.draw_idle()
+
+
+class SkyplotWidget(BlitCanvas):
+    """
+    星空图：所有卫星共用一个散点 PathCollection，标签从文本对象池中复用；
+    可选的卫星轨迹（最近 trail_points 个位置，每 trail_interval 秒采样一次）
+    画在一个 LineCollection 中，越旧越透明。
+    """
+    def __init__(self, parent=None, trail_points=0, trail_interval=30.0):
         self.fig = Figure(figsize=(4, 4), dpi=100, facecolor='#ffffff')
         self.ax = self.fig.add_subplot(111, projection='polar')
         super().__init__(self.fig)
         self.setParent(parent)
         # 初始化时只设置一次坐标轴，后续不再重建
         self.init_plot()
-        # 用于存储绘图对象，以便更新时删除
-        self.scatter_artists = []
-        self.text_artists = []
+        # 持久化的绘图对象：更新时只修改数据
+        self.trail_points = int(trail_points)
+        self.trail_interval = float(trail_interval)
+        self.trails = {}  # prn -> [deque((theta, el)), 上次采样时间]
+        self.trail_lines = self.add_animated(LineCollection([], linewidths=1.5, zorder=2))
+        self.ax.add_collection(self.trail_lines, autolim=False)
+        self.scatter = self.add_animated(
+            self.ax.scatter([], [], s=100, alpha=0.8, edgecolors='white', zorder=3))
+        self.text_artists = []  # 标签对象池
+        self.rendered_key = None  # 上次绘制的快照版本
 
     def init_plot(self):
         """初始化坐标轴，只调用一次"""
@@ -34,39 +97,90 @@ class SkyplotWidget(FigureCanvas):
         self.ax.grid(True, alpha=0.3)
         self.ax.set_title("Skyplot", pad=10, fontsize=9, fontweight='bold')
 
+    def _label(self, i):
+        while len(self.text_artists) <= i:
+            self.text_artists.append(self.add_animated(
+                self.ax.text(0, 0, "", fontsize=8, ha='center', va='bottom', fontweight='bold', zorder=4)))
+        return self.text_artists[i]
+
     def update_satellites(self, satellites, active_systems):
-        """更新卫星数据，只更新绘图对象，不重建坐标轴"""
-        # 删除旧的绘图对象
-        for artist in self.scatter_artists:
-            artist.remove()
-        for artist in self.text_artists:
-            artist.remove()
-        self.scatter_artists.clear()
-        self.text_artists.clear()
-        
-        # 线程安全：创建字典副本，避免在遍历时字典被其他线程修改
-        satellites_snapshot = dict(satellites)
-        
-        # 绘制新的数据
-        for key, sat in satellites_snapshot.items():
+        """更新卫星数据，只修改持久化绘图对象的数据，然后 blit"""
+        # 快照版本未变化（显示的系统没有新数据）时跳过
+        view_key = satellites.view_key(active_systems) if isinstance(satellites, SatelliteSnapshot) else None
+        if view_key is not None and view_key == self.rendered_key:
+            return
+        self.rendered_key = view_key
+
+        # 收集可见卫星（快照不可变，无需复制）
+        keys, theta, el = [], [], []
+        for key, sat in satellites.items():
             if key[0] not in active_systems: continue # 过滤系统
 
-            el = getattr(sat, "el", getattr(sat, "elevation", None))
-            az = getattr(sat, "az", getattr(sat, "azimuth", None))
-            
-            if el is not None and az is not None:
-                color = get_sys_color(key[0])
-                scatter = self.ax.scatter(np.radians(az), el, c=color, s=100, alpha=0.8, edgecolors='white')
-                text = self.ax.text(np.radians(az), el, key, fontsize=8, ha='center', va='bottom', fontweight='bold')
-                self.scatter_artists.append(scatter)
-                self.text_artists.append(text)
-        
-        # 性能优化：只在有数据变化时才重绘
-        if self.scatter_artists:
-            self.draw_idle()  # 使用draw_idle而不是draw，更高效
+            e = getattr(sat, "el", getattr(sat, "elevation", None))
+            a = getattr(sat, "az", getattr(sat, "azimuth", None))
+            if e is not None and a is not None:
+                keys.append(key)
+                theta.append(a)
+                el.append(e)
+        theta = np.radians(theta)
+        colors = [get_sys_color(k[0]) for k in keys]
+
+        self.scatter.set_offsets(np.column_stack([theta, el]) if keys else np.empty((0, 2)))
+        self.scatter.set_facecolors(colors)
+        for i, key in enumerate(keys):
+            text = self._label(i)
+            text.set_position((theta[i], el[i]))
+            text.set_text(key)
+            text.set_visible(True)
+        for text in self.text_artists[len(keys):]:
+            text.set_visible(False)
+
+        if self.trail_points > 1:
+            self._update_trails(keys, theta, el, colors)
+        self.blit_update()
+
+    def _update_trails(self, keys, theta, el, colors):
+        """按采样间隔追加轨迹点；不再显示的卫星丢弃轨迹"""
+        now = time.monotonic()
+        changed = False
+        for prn in set(self.trails) - set(keys):
+            del self.trails[prn]
+            changed = True
+        for i, prn in enumerate(keys):
+            trail = self.trails.get(prn)
+            if trail is None:
+                trail = self.trails[prn] = [deque(maxlen=self.trail_points), None]
+            if trail[1] is None or now - trail[1] >= self.trail_interval:
+                trail[0].append((theta[i], el[i]))
+                trail[1] = now
+                changed = True
+        if not changed:
+            return
+
+        segments, seg_colors = [], []
+        for i, prn in enumerate(keys):
+            pts = np.asarray(self.trails[prn][0])
+            if len(pts) < 2:
+                continue
+            segments.extend(np.stack([pts[:-1], pts[1:]], axis=1))
+            rgba = np.tile(to_rgba(colors[i]), (len(pts) - 1, 1))
+            rgba[:, 3] = np.linspace(0.05, 0.6, len(pts) - 1)  # 越旧越透明
+            seg_colors.append(rgba)
+        self.trail_lines.set_segments(segments)
+        self.trail_lines.set_color(np.concatenate(seg_colors) if seg_colors else [])
+
+    def clear_trails(self):
+        self.trails.clear()
+        self.trail_lines.set_segments([])
+
+class MultiSignalBarWidget(BlitCanvas):
+    """
+    分组柱状图：显示每颗卫星的所有频点 SNR。
+    每个信号一个 PolyCollection（所有卫星的该信号柱子），卫星/信号集合不变时
+    只改柱高并 blit；集合变化时才重建柱子位置、刻度和图例并完整重绘。
+    """
+    BAR_WIDTH = 0.15
 
-class MultiSignalBarWidget(FigureCanvas):
-    """分组柱状图：显示每颗卫星的所有频点 SNR"""
     def __init__(self, parent=None):
         self.fig = Figure(figsize=(8, 4), dpi=100, facecolor='#ffffff')
         self.ax = self.fig.add_subplot(111)
@@ -77,106 +191,132 @@ class MultiSignalBarWidget(FigureCanvas):
         self.ax.set_ylim(0, 60)
         self.ax.set_ylabel("SNR (dB-Hz)")
         self.ax.grid(True, axis='y', linestyle='--', alpha=0.5)
-        # 存储绘图对象
-        self.bar_artists = []
-        self.legend_handles = {}
+        self.empty_text = self.ax.text(0.5, 0.5, "No Satellites for selected systems", ha='center', va='center',
+                                       transform=self.ax.transAxes, visible=False)
+        # 持久化的绘图对象
+        self.bar_artists = {}  # 信号 -> PolyCollection
+        self.bar_verts = {}    # 信号 -> (n, 4, 2) 柱子顶点，更新时只改 y
+        self.layout_key = None  # ((PRN, (信号, ...)), ...)：决定柱子位置、刻度和图例
+        self.rendered_key = None  # 上次绘制的快照版本
 
     def update_data(self, satellites, active_systems):
-        # 删除旧的柱状图
-        for bars in self.bar_artists:
-            for bar in bars:
-                bar.remove()
-        self.bar_artists.clear()
-        
-        # 清除图例
-        if self.ax.legend_:
-            self.ax.legend_.remove()
-        
-        # 线程安全：创建字典副本，避免在遍历时字典被其他线程修改
-        satellites_snapshot = dict(satellites)
-        
-        # 1. 过滤卫星
-        valid_sats = {k: v for k, v in satellites_snapshot.items() if k[0] in active_systems}
-        sorted_keys = sorted(valid_sats.keys())
-        
-        if not sorted_keys:
-            # 清除可能存在的文本
-            for text in self.ax.texts:
-                if text.get_text() == "No Satellites for selected systems":
-                    text.remove()
-            self.ax.text(0.5, 0.5, "No Satellites for selected systems", ha='center', va='center', transform=self.ax.transAxes)
-            self.draw_idle()
+        # 快照版本未变化（显示的系统没有新数据）时跳过
+        view_key = satellites.view_key(active_systems) if isinstance(satellites, SatelliteSnapshot) else None
+        if view_key is not None and view_key == self.rendered_key:
             return
+        self.rendered_key = view_key
 
-        # 2. 收集所有出现的信号名称以便做 Legend
-        all_signals_set = set()
-        
-        # 3. 准备绘图数据结构
-        x_indices = np.arange(len(sorted_keys))
-        sat_map = {k: i for i, k in enumerate(sorted_keys)}
-        
-        bar_width = 0.15 
-        sig_plot_data = defaultdict(list)
-        max_sigs_per_sat = 1
-        
+        # 1. 过滤卫星（快照不可变，无需复制），收集每颗卫星的有效信号和 SNR
+        sorted_keys = sorted(k for k in satellites if k[0] in active_systems)
+        layout = []
+        snr_by_code = defaultdict(list)
         for k in sorted_keys:
-            sat = valid_sats[k]
-            valid_sigs = {code: sig for code, sig in sat.signals.items() if sig and getattr(sig, 'snr', 0) > 0}
-            
-            if not valid_sigs: continue
-            
-            # 对信号名排序
-            sorted_sig_codes = sorted(valid_sigs.keys())
-            max_sigs_per_sat = max(max_sigs_per_sat, len(sorted_sig_codes))
-            
-            # 计算起始偏移量
-            n_sigs = len(sorted_sig_codes)
-            start_offset = - (n_sigs * bar_width) / 2 + (bar_width / 2)
-            
-            for i, code in enumerate(sorted_sig_codes):
-                all_signals_set.add(code)
-                offset = start_offset + i * bar_width
-                snr = valid_sigs[code].snr
-                
-                # 保存: (x坐标索引, 偏移量, SNR值)
-                sig_plot_data[code].append((sat_map[k], offset, snr))
-
-        # 4. 绘制（只更新数据，不重建坐标轴）
-        self.legend_handles.clear()
-        
-        # 按频段排序 Legend (让 1C, 1W 在一起，2C, 2W 在一起)
-        sorted_all_signals = sorted(list(all_signals_set))
-        
-        for code in sorted_all_signals:
-            data_points = sig_plot_data[code]
-            if not data_points: continue
-            
-            x_vals = [d[0] + d[1] for d in data_points] # Base X + Offset
-            y_vals = [d[2] for d in data_points]
-            
-            # 调用颜色函数
-            color = get_signal_color(code)
-            
-            # 添加边框以增强区分度，边框颜色比柱体稍深
-            bars = self.ax.bar(x_vals, y_vals, width=bar_width, color=color, alpha=0.95, 
-                             label=code, edgecolor='black', linewidth=0.5)
-            self.bar_artists.append(bars)
-            self.legend_handles[code] = bars[0]
-
-        # 5. 更新坐标轴标签（不重建坐标轴）
-        self.ax.set_xticks(x_indices)
+            signals = satellites[k].signals
+            codes = tuple(sorted(code for code, sig in signals.items() if sig and getattr(sig, 'snr', 0) > 0))
+            layout.append((k, codes))
+            for code in codes:
+                snr_by_code[code].append(signals[code].snr)
+        layout = tuple(layout)
+
+        # 2. 卫星/信号集合变化时重建布局（静态部分变化，需要完整重绘）
+        relayout = layout != self.layout_key
+        if relayout:
+            self._rebuild_layout(layout)
+
+        # 3. 只更新柱高
+        for code, verts in self.bar_verts.items():
+            verts[:, 1:3, 1] = np.asarray(snr_by_code[code])[:, None]
+            self.bar_artists[code].set_verts(verts)
+
+        if relayout:
+            self.full_redraw()
+        else:
+            self.blit_update()
+
+    def _rebuild_layout(self, layout):
+        """计算每个信号的柱子位置，更新刻度和图例"""
+        self.layout_key = layout
+        if self.ax.legend_:
+            self.ax.legend_.remove()
+
+        # 每颗卫星的信号按名称排列，整体居中于刻度
+        centers = defaultdict(list)
+        for i, (_, codes) in enumerate(layout):
+            start_offset = - (len(codes) * self.BAR_WIDTH) / 2 + (self.BAR_WIDTH / 2)
+            for j, code in enumerate(codes):
+                centers[code].append(i + start_offset + j * self.BAR_WIDTH)
+
+        for code in set(self.bar_artists) - set(centers):
+            self.remove_animated(self.bar_artists.pop(code))
+            del self.bar_verts[code]
+        for code, x in centers.items():
+            x = np.asarray(x)
+            verts = np.zeros((len(x), 4, 2))
+            verts[:, 0:2, 0] = (x - self.BAR_WIDTH / 2)[:, None]
+            verts[:, 2:4, 0] = (x + self.BAR_WIDTH / 2)[:, None]
+            self.bar_verts[code] = verts
+            if code not in self.bar_artists:
+                # 添加边框以增强区分度
+                coll = PolyCollection([], facecolors=get_signal_color(code), edgecolors='black',
+                                      linewidths=0.5, alpha=0.95, label=code)
+                self.ax.add_collection(coll, autolim=False)
+                self.bar_artists[code] = self.add_animated(coll)
+
+        # 更新坐标轴标签（不重建坐标轴）
+        sorted_keys = [k for k, _ in layout]
+        self.ax.set_xticks(np.arange(len(sorted_keys)))
         self.ax.set_xticklabels(sorted_keys, rotation=90, fontsize=9, fontweight='bold')
-        
-        # 6. 更新图例
-        if self.legend_handles:
-            # 动态调整图例列数，避免太长
-            ncol = min(len(self.legend_handles), 8)
-            self.ax.legend(handles=self.legend_handles.values(), labels=self.legend_handles.keys(), 
+        self.ax.set_xlim(-0.5, max(len(sorted_keys), 1) - 0.5)
+        self.empty_text.set_visible(not sorted_keys)
+
+        # 更新图例：按频段排序 (让 1C, 1W 在一起，2C, 2W 在一起)，动态调整列数避免太长
+        if self.bar_artists:
+            codes = sorted(self.bar_artists)
+            self.ax.legend(handles=[self.bar_artists[c] for c in codes], labels=codes,
                            loc='upper center', bbox_to_anchor=(0.5, 1.15),
-                           ncol=ncol, fontsize='small', frameon=False)
-            
-        # 性能优化：使用draw_idle而不是draw，更高效
-        self.draw_idle()
+                           ncol=min(len(codes), 8), fontsize='small', frameon=False)
+
+
+def _unix_to_datenum(t):
+    """unix 秒数组 -> matplotlib 日期数（本地时间显示，向量化，不逐点创建 datetime）"""
+    ref = float(t[-1])
+    offset = (datetime.fromtimestamp(ref) - datetime.fromtimestamp(ref, timezone.utc).replace(tzinfo=None)).total_seconds()
+    return mdates.date2num(datetime(1970, 1, 1)) + (t + offset) / 86400.0
+
+
+def _minmax_decimate(x, y, n_bins):
+    """
+    x 递增的折线降采样到 n_bins 段：每段只保留 y 最小和最大的点（保持原顺序），
+    像素宽度内的形状（包括尖峰）不变。整段为 NaN 时保留一个 NaN 点，断线位置不变。
+    """
+    n = len(x)
+    if n <= 2 * n_bins or not x[-1] > x[0]:
+        return x, y
+    bins = np.minimum(((x - x[0]) * (n_bins / (x[-1] - x[0]))).astype(np.intp), n_bins - 1)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    seg = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    nan = np.isnan(y)
+    keep = []
+    for key, reduce in ((np.where(nan, np.inf, y), np.minimum), (np.where(nan, -np.inf, y), np.maximum)):
+        # 每段中第一个等于段内极值的点
+        idx = np.flatnonzero(key == reduce.reduceat(key, starts)[seg])
+        keep.append(idx[np.r_[True, seg[idx[1:]] != seg[idx[:-1]]]])
+    keep = np.unique(np.concatenate(keep))
+    return x[keep], y[keep]
+
+
+def _pixel_decimate(x, y, n_x, n_y, ylim):
+    """散点降采样：落在同一个像素格 (n_x × n_y) 内的点只保留第一个，丢弃 NaN"""
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    if len(x) <= n_x:
+        return x, y
+    x0, x1 = x.min(), x.max()
+    xi = ((x - x0) * ((n_x - 1) / (x1 - x0) if x1 > x0 else 0)).astype(np.intp)
+    yi = np.clip((y - ylim[0]) * ((n_y - 1) / (ylim[1] - ylim[0])), -1, n_y).astype(np.intp) + 1
+    _, keep = np.unique(xi * (n_y + 2) + yi, return_index=True)
+    keep.sort()
+    return x[keep], y[keep]
 
 
 class PlotSNRWidget(QWidget):
@@ -185,7 +325,11 @@ class PlotSNRWidget(QWidget):
     1. 继承自 QWidget 而不是 FigureCanvas，以便同时容纳工具栏(Toolbar)和画布(Canvas)。
     2. 支持 sin(Elevation) 模式。
     3. 解决了 Title 和 Legend 重叠问题。
+    4. 原始历史每个信号一条持久化的 Line2D（set_data 更新），按画布像素宽度降采样；
+       图例只在信号集合或模式变化时重建。
     """
+    YLIM = (0, 60)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         
@@ -213,88 +357,163 @@ class PlotSNRWidget(QWidget):
         # 设置策略，让画布尽可能扩展
         self.canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
 
-    def update_plot(self, prn, data, mode):
+        # 持久化的绘图对象
+        self.signal_lines = {}   # 信号 -> Line2D（原始历史）
+        self.tier_artists = []   # 聚合历史的线/带/竖线（桶数有限，每次重建）
+        self.line_style = None   # 信号线当前的样式："Time" 或 "Elevation"
+        self.axis_mode = None    # X 轴刻度当前的类型
+        self.legend_key = None   # 当前图例对应的 (数据类型, 模式, 信号)
+
+    def update_plot(self, prn, data, mode, xlim=None):
         """
         mode: "Time Sequence", "Elevation", "sin(Elevation)"
+        data: SatHistory.get 的原始历史，或 HistoryTiers.query 的聚合结果（均为 dict of arrays）
+        xlim: 时间模式下的显示范围（unix 秒），用于聚合结果
         优化：只更新数据，不重建坐标轴
         """
-        # 删除旧的绘图对象
-        for line in self.ax.lines:
-            line.remove()
-        for collection in self.ax.collections:
-            collection.remove()
-        
-        if not data:
-            self.canvas.draw_idle()
+        for artist in self.tier_artists:
+            artist.remove()
+        self.tier_artists.clear()
+        # 切换模式/跨度时丢弃旧数据范围，按新数据重新自动缩放
+        self.ax.ignore_existing_data_limits = True
+        self.ax.set_autoscalex_on(True)
+
+        if data is not None and 'bucket' in data:
+            self._set_lines({})
+            if self._plot_tiers(data, mode, xlim):
+                self._finish_plot(prn, mode, ('tier', mode, tuple(data['signals'])),
+                                  [a for a in self.tier_artists if a.get_label() in data['signals']])
+            else:
+                self.canvas.draw_idle()
             return
 
-        # --- 数据预处理：过滤高度角 <= 0 的数据 ---
+        # --- 数据预处理：过滤高度角 <= 0 的数据（含未知高度角 NaN）---
         # 如果是高度角相关模式，我们通常不看地平线以下的数据
-        valid_data = []
-        for d in data:
-            # 如果模式是高度角相关，且高度角为0或负，则跳过
-            if ("Elevation" in mode or "sin" in mode) and d['el'] <= 0:
-                continue
-            valid_data.append(d)
-        
-        # 如果过滤完没数据了，直接返回
-        if not valid_data:
+        if data is not None:
+            els = data['el']
+            snr = data['snr']
+            times = data['time']
+            if "Elevation" in mode or "sin" in mode:
+                valid = els > 0
+                els, snr = els[valid], snr[valid]
+
+        # 如果过滤完没数据了，清空后返回
+        if data is None or not len(els):
+            self._set_lines({})
             self.canvas.draw_idle()
             return
 
-        # 提取所有出现的信号
-        all_sigs = set()
-        for d in valid_data: all_sigs.update(d['snr'].keys())
-        sorted_sigs = sorted(all_sigs)
-
-        # 提取基础列表
-        times = [d['time'] for d in valid_data]
-        els = [d['el'] for d in valid_data] # 角度制
-
-        # --- 绘图逻辑 ---
-        for sig in sorted_sigs:
-            vals = [d['snr'].get(sig, np.nan) for d in valid_data]
-            color = get_signal_color(sig) # 确保你有引入这个函数
+        if "Time" in mode:
+            x_vals = _unix_to_datenum(times)
+        elif "sin" in mode:
+            # sin(Elevation) 模式：将角度转为弧度，再求 sin（所有信号共用）
+            x_vals = np.sin(np.radians(els))
+        else:
+            # 普通 Elevation 模式
+            x_vals = els
 
+        # --- 每个信号一列（跳过窗口内没有观测的信号），降采样到画布像素宽度 ---
+        n_x = max(int(self.ax.bbox.width), 1)
+        n_y = max(int(self.ax.bbox.height), 1)
+        series = {}
+        for i, sig in enumerate(data['signals']):
+            vals = snr[:, i]
+            if np.isnan(vals).all():
+                continue
             if "Time" in mode:
-                self.ax.plot(times, vals, '.-', markersize=3, label=sig, color=color, linewidth=1)
-            
-            elif "sin" in mode:
-                # sin(Elevation) 模式
-                # 将角度转为弧度，再求 sin
-                x_vals = np.sin(np.radians(els))
-                self.ax.scatter(x_vals, vals, s=10, label=sig, color=color, alpha=0.6)
-            
+                series[sig] = _minmax_decimate(x_vals, vals, n_x)
             else:
-                # 普通 Elevation 模式
-                self.ax.scatter(els, vals, s=10, label=sig, color=color, alpha=0.6)
+                series[sig] = _pixel_decimate(x_vals, vals, n_x, n_y, self.YLIM)
+        self._set_lines(series, "Time" if "Time" in mode else "Elevation")
+        self.ax.relim()
+        self.ax.autoscale_view(scaley=False)
+
+        self._finish_plot(prn, mode, ('raw', self.line_style, tuple(sorted(series))),
+                          [self.signal_lines[sig] for sig in sorted(series)])
 
-        # --- 更新 X 轴格式（不重建）---
+    def _set_lines(self, series, style=None):
+        """更新信号线数据；不再出现的信号删除其线，模式变化时只改样式"""
+        for sig in set(self.signal_lines) - set(series):
+            self.signal_lines.pop(sig).remove()
+        restyle = style != self.line_style
+        self.line_style = style
+        for sig, (x, y) in series.items():
+            line = self.signal_lines.get(sig)
+            if line is None:
+                line = self.signal_lines[sig] = self.ax.plot([], [], label=sig, color=get_signal_color(sig))[0]
+                self._style_line(line, style)
+            elif restyle:
+                self._style_line(line, style)
+            line.set_data(x, y)
+
+    @staticmethod
+    def _style_line(line, style):
+        if style == "Time":
+            line.set(linestyle='-', linewidth=1, marker='.', markersize=3, markeredgewidth=1, alpha=None)
+        else:
+            # 高度角模式：只画点（代替每个信号一个 scatter）
+            line.set(linestyle='None', marker='o', markersize=4, markeredgewidth=0, alpha=0.6)
+
+    def _plot_tiers(self, tier, mode, xlim):
+        """聚合历史：时间模式画均值线 + min/max 阴影带，高度角模式画均值点 + min/max 竖线"""
+        t = tier['time']
+        if not len(t):
+            return False
+        els = tier['el'].astype(float)
         if "Time" in mode:
-            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-            self.ax.set_xlabel("Time")
-            
-        elif "sin" in mode:
-            self.ax.set_xlabel("sin(Elevation)")
-            
+            # 卫星不可见期间没有桶：在间隔处插入 NaN，避免跨越空档连线
+            gaps = np.flatnonzero(np.diff(t) > 1.5 * tier['bucket']) + 1
+            times = np.insert(_unix_to_datenum(t + tier['bucket'] / 2), gaps, np.nan)
         else:
-            self.ax.set_xlabel("Elevation (°)")
+            gaps = np.zeros(0, dtype=int)
+            x = np.sin(np.radians(els)) if "sin" in mode else els
+            valid = els > 0
 
-        # --- 更新通用属性（不重建）---
-        self.ax.set_ylabel("SNR (dB-Hz)")
-        self.ax.set_ylim(0, 60)
-        self.ax.set_title(f"Satellite: {prn}", y=1.12, fontsize=10, fontweight='bold')
-        
-        # 网格只设置一次，不需要每次更新
-        if not hasattr(self, '_grid_initialized'):
+        add = self.tier_artists.append
+        for i, sig in enumerate(tier['signals']):
+            color = get_signal_color(sig)
+            lo, mean, hi = (tier[k][:, i].astype(float) for k in ('snr_min', 'snr_mean', 'snr_max'))
+            if "Time" in mode:
+                lo, mean, hi = (np.insert(a, gaps, np.nan) for a in (lo, mean, hi))
+                add(self.ax.fill_between(times, lo, hi, color=color, alpha=0.2, linewidth=0))
+                add(self.ax.plot(times, mean, '-', label=sig, color=color, linewidth=1)[0])
+            else:
+                add(self.ax.vlines(x[valid], lo[valid], hi[valid], color=color, alpha=0.3, linewidth=1))
+                add(self.ax.scatter(x[valid], mean[valid], s=10, label=sig, color=color, alpha=0.6))
+
+        if "Time" in mode and xlim is not None:
+            self.ax.set_xlim(*_unix_to_datenum(np.asarray(xlim, dtype=float)))
+        return True
+
+    def _finish_plot(self, prn, mode, legend_key, legend_handles):
+        # --- 更新 X 轴格式（只在模式变化时）---
+        axis_mode = "Time" if "Time" in mode else "sin" if "sin" in mode else "Elevation"
+        if axis_mode != self.axis_mode:
+            self.axis_mode = axis_mode
+            if axis_mode == "Time":
+                self.ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+                self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+                self.ax.set_xlabel("Time")
+            else:
+                self.ax.xaxis.set_major_locator(AutoLocator())
+                self.ax.xaxis.set_major_formatter(ScalarFormatter())
+                self.ax.set_xlabel("sin(Elevation)" if axis_mode == "sin" else "Elevation (°)")
+
+            # --- 更新通用属性（不重建）---
+            self.ax.set_ylabel("SNR (dB-Hz)")
+            self.ax.set_ylim(*self.YLIM)
+            # 网格只设置一次，不需要每次更新
             self.ax.grid(True, linestyle=':', alpha=0.6)
-            self._grid_initialized = True
 
-        # 更新图例
-        if self.ax.legend_:
-            self.ax.legend_.remove()
-        self.ax.legend(loc='lower center', bbox_to_anchor=(0.5, 1.02), 
-                       ncol=6, fontsize='small', frameon=False)
+        self.ax.set_title(f"Satellite: {prn}", y=1.12, fontsize=10, fontweight='bold')
+
+        # 更新图例（信号集合或模式变化时；聚合历史的 artist 每次重建，图例保存的是副本）
+        if legend_key != self.legend_key:
+            self.legend_key = legend_key
+            if self.ax.legend_:
+                self.ax.legend_.remove()
+            self.ax.legend(handles=legend_handles, loc='lower center', bbox_to_anchor=(0.5, 1.02),
+                           ncol=6, fontsize='small', frameon=False)
         
         # 性能优化：使用draw_idle而不是draw，更高效
-        self.canvas.draw_idle()
\ No newline at end of file
+        self.canvas.draw_idle()
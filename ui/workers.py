@@ -7,7 +7,11 @@ from PyQt6.QtCore import QObject, pyqtSignal
 from pyrtcm import RTCMReader
 
 from core.ntrip_client import NtripClient
+from core.replay import ReplayClient
 from core.ring_buffer import RingBuffer
+from core.instrumentation import PIPELINE, EPOCH_LATENCY
+from core.metrics_server import StreamStats
+from core.profiler import PROFILER
 
 
 class StreamSignals(QObject):
@@ -17,12 +21,15 @@ class StreamSignals(QObject):
 
 
 class IOThread(threading.Thread):
-    def __init__(self, name: str, settings: dict, ring_buffer: RingBuffer, signals: StreamSignals):
+    def __init__(self, name: str, settings: dict, ring_buffer: RingBuffer, signals: StreamSignals,
+                 recorder=None, stats=None):
         super().__init__()
         self.name = name
         self.settings = settings
         self.ring_buffer = ring_buffer
         self.signals = signals
+        self.recorder = recorder  # 可选：RtcmRecorder，原始帧落盘
+        self.stats = stats or StreamStats(name)  # 累计计数（metrics 端点）
         self.daemon = True
         self.running = True
         self.client = None
@@ -42,20 +49,32 @@ class IOThread(threading.Thread):
             except:
                 pass
         try:
-            self.client = NtripClient(
-                self.settings['host'], int(self.settings['port']),
-                self.settings['mountpoint'], self.settings['user'], self.settings['password']
-            )
+            if self.settings.get('replay'):
+                # 回放模式：用录制文件代替NTRIP连接，其余管线不变
+                self.client = ReplayClient(
+                    self.settings['replay'], speed=float(self.settings.get('speed', 1.0)),
+                    stream_name=self.settings.get('replay_stream') or None
+                )
+                source = f"replay {self.settings['replay']}"
+            else:
+                self.client = NtripClient(
+                    self.settings['host'], int(self.settings['port']),
+                    self.settings['mountpoint'], self.settings['user'], self.settings['password']
+                )
+                source = f"{self.settings['host']}:{self.settings['port']}/{self.settings['mountpoint']}"
         except Exception as e:
             self.signals.log_signal.emit(f"[{self.name}] Config Error: {e}")
             return
 
+        replay_mode = isinstance(self.client, ReplayClient)
         while self.running:
             try:
-                host_port = f"{self.settings['host']}:{self.settings['port']}"
-                mount = self.settings['mountpoint']
-                self.signals.log_signal.emit(f"[{self.name}] Connecting to {host_port}/{mount}...")
+                self.signals.log_signal.emit(f"[{self.name}] Connecting to {source}...")
                 sock = self.client.connect()
+                if getattr(self.client, 'finished', False):
+                    self.signals.log_signal.emit(f"[{self.name}] Replay finished")
+                    self.signals.status_signal.emit(self.name, False)
+                    return
                 if not sock:
                     self.signals.log_signal.emit(f"[{self.name}] Connection failed. Retry in 3s...")
                     self.signals.status_signal.emit(self.name, False)
@@ -64,18 +83,23 @@ class IOThread(threading.Thread):
                         time.sleep(0.1)
                     continue
 
-                self.signals.log_signal.emit(f"[{self.name}] Connected to {host_port}/{mount}")
+                self.signals.log_signal.emit(f"[{self.name}] Connected to {source}")
+                self.stats.on_connect()
                 self.signals.status_signal.emit(self.name, True)
                 reader = RTCMReader(sock)
+                # 计时：pyrtcm 解析（io_parse），仅在启用性能统计时记录
+                reader.parse = PIPELINE.timed("io_parse", RTCMReader.parse)
                 self.msg_count = 0
                 self.last_log_time = time.time()
 
                 # I/O线程：只负责读取原始消息并写入缓冲区，不做任何处理
                 for raw, msg in reader:
                     if not self.running: break
+                    PROFILER.checkpoint()  # 性能剖析会话期间在本线程启用 cProfile
                     if msg is None: continue
                     
                     self.msg_count += 1
+                    self.stats.on_frame(raw)
                     # 每10秒输出一次统计
                     now = time.time()
                     if now - self.last_log_time >= 10.0:
@@ -85,12 +109,23 @@ class IOThread(threading.Thread):
                         self.last_log_time = now
                     
                     # 非阻塞写入：如果缓冲区满，自动丢弃最旧的数据
-                    self.ring_buffer.put((raw, msg), block=False)
+                    # 回放模式下阻塞写入（反压），超时后重试直到写入成功或停止，保证回放不丢帧
+                    # 附带入队时间戳，用于统计缓冲区等待时间（ring_wait）
+                    item = (raw, msg, time.perf_counter())
+                    if replay_mode:
+                        while not self.ring_buffer.put(item, block=True, timeout=1.0):
+                            if not self.running or self.ring_buffer.closed:
+                                break
+                    else:
+                        self.ring_buffer.put(item)
+                    if self.recorder is not None:
+                        self.recorder.record(raw, msg)
 
             except Exception as e:
                 self.signals.log_signal.emit(f"[{self.name}] Error: {str(e)}")
                 self.signals.status_signal.emit(self.name, False)
             finally:
+                self.stats.on_disconnect()
                 if self.client: 
                     self.client.close()
                     self.signals.log_signal.emit(f"[{self.name}] Connection closed")
@@ -103,12 +138,13 @@ class IOThread(threading.Thread):
 
 
 class DataProcessingThread(threading.Thread):
-    def __init__(self, name: str, ring_buffer: RingBuffer, handler, signals: StreamSignals):
+    def __init__(self, name: str, ring_buffer: RingBuffer, handler, signals: StreamSignals, stats=None):
         super().__init__()
         self.name = name
         self.ring_buffer = ring_buffer
         self.handler = handler
         self.signals = signals
+        self.stats = stats or StreamStats(name)  # 累计计数（metrics 端点）
         self.daemon = True
         self.running = True
         self.epoch_count = 0
@@ -122,6 +158,7 @@ class DataProcessingThread(threading.Thread):
         self.signals.log_signal.emit(f"[{self.name}] Processing thread started")
         while self.running:
             try:
+                PROFILER.checkpoint()  # 性能剖析会话期间在本线程启用 cProfile
                 data = self.ring_buffer.get(block=True, timeout=0.1)
                 
                 if data is None:
@@ -130,7 +167,12 @@ class DataProcessingThread(threading.Thread):
                         break
                     continue
                 
-                raw, msg = data
+                raw, msg, t_put = data
+                # 每帧都计算（性能统计可能在处理中途被打开，之后要用到本帧的 recv_time）
+                wait = time.perf_counter() - t_put
+                recv_time = time.time() - wait  # 帧到达I/O线程时的系统时间
+                if PIPELINE.enabled:
+                    PIPELINE.record("ring_wait", wait)
                 self.msg_count += 1
                 
                 # Track message types
@@ -141,12 +183,17 @@ class DataProcessingThread(threading.Thread):
                 if msg_id in ["1019", "1020", "1042", "1045", "1046", "63"]:
                     self.eph_count += 1
                 
-                # 处理RTCM消息
+                # 处理RTCM消息（解码耗时始终累计到 metrics，启用性能统计时另记直方图）
+                t0 = time.perf_counter()
                 epoch_data = self.handler.process_message(msg)
+                decode_time = time.perf_counter() - t0
+                self.stats.on_message(msg_id, decode_time)
+                PIPELINE.record("decode", decode_time)
                 
                 # 如果处理成功，发送信号到UI线程
                 if epoch_data:
                     self.epoch_count += 1
+                    self.stats.on_epoch(epoch_data)
                     if self.first_epoch:
                         n_sats = len(epoch_data.satellites)
                         n_sigs = sum(len(sat.signals) for sat in epoch_data.satellites.values())
@@ -154,6 +201,9 @@ class DataProcessingThread(threading.Thread):
                             f"[{self.name}] First epoch received: {n_sats} satellites, {n_sigs} signals"
                         )
                         self.first_epoch = False
+                    if PIPELINE.enabled:
+                        EPOCH_LATENCY.stamp(epoch_data, msg, self.name, recv_time)
+                        epoch_data.emit_time = time.perf_counter()
                     self.signals.epoch_signal.emit(epoch_data)
                 
                 # 每30秒输出一次统计